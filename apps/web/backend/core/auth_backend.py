@@ -1,9 +1,23 @@
 import os
-from firebase_admin import auth
 from django.contrib.auth.models import User
 from rest_framework import authentication, exceptions
 from django.conf import settings
 
+def firebase_auth():
+    """
+    firebase_admin.auth, imported and initialised on first use. The SDK
+    (and google-auth, grpc, ...) is slow to import, and most workers and
+    management commands never verify a token.
+    """
+    import firebase_admin
+    from firebase_admin import auth
+
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        firebase_admin.initialize_app()  # credentials from GOOGLE_APPLICATION_CREDENTIALS
+    return auth
+
 class FirebaseAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request):
         """
@@ -19,8 +33,8 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         id_token = auth_header.split(' ').pop()
         
         try:
-            # verify_id_token uses the app initialized in settings.py
-            decoded_token = auth.verify_id_token(id_token)
+            # verify_id_token uses the default app (created on first use above)
+            decoded_token = firebase_auth().verify_id_token(id_token)
             uid = decoded_token.get('uid')
             email = decoded_token.get('email')
             
@@ -36,6 +36,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'finance.profiling.ProfilingMiddleware',  # opt-in; needs request.user from the line above
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -52,6 +53,11 @@ REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False, 
 }
 
+# Per-user, per-endpoint token bucket on the hot read endpoints (finance/throttling.py):
+# bursts of READ_THROTTLE_BURST requests, refilled at READ_THROTTLE_RATE per second. 0 disables.
+READ_THROTTLE_RATE = float(os.getenv('READ_THROTTLE_RATE', 10))
+READ_THROTTLE_BURST = 30
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
@@ -66,6 +72,18 @@ DATABASES = {
     }
 }
 
+# Per-user finance tables can be spread over N shard databases (finance/sharding.py).
+# 0 keeps everything in 'default'. After changing N run `migrate_shards` then `rebalance_shards`.
+FINANCE_SHARDS = int(os.getenv('FINANCE_SHARDS', 0))
+FINANCE_SHARD_DIR = Path(os.getenv('FINANCE_SHARD_DIR', BASE_DIR))
+FINANCE_ID_BLOCK = 1000
+for _i in range(FINANCE_SHARDS):
+    DATABASES[f'shard_{_i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': FINANCE_SHARD_DIR / f'shard_{_i}.sqlite3',
+    }
+DATABASE_ROUTERS = ['finance.routers.UserShardRouter']
+
 # 6. TEMPLATES, AUTH, & I18N
 TEMPLATES = [
     {
@@ -99,4 +117,58 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Extra API Keys
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
\ No newline at end of file
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+# Server-side advisor (finance/advisor.py). Use 'finance.advisor.StubClient' offline.
+AI_ADVISOR_CLIENT = os.getenv('AI_ADVISOR_CLIENT', 'finance.advisor.GeminiClient')
+AI_ADVICE_CACHE_SECONDS = 6 * 60 * 60
+
+# Fractions of the daily/monthly budget that raise a BudgetAlert when crossed
+BUDGET_ALERT_THRESHOLDS = (0.8, 1.0)
+
+# How long each process keeps the FxRate table in memory (finance/fx.py)
+FX_CACHE_SECONDS = 300
+
+# Net-worth history (NetWorthSnapshot): age in days after which raw snapshots are thinned
+# to one per day, day rows to one per week and week rows to one per month; and the
+# largest series net-worth-history returns
+NET_WORTH_COMPACT_AFTER_DAYS = {'raw': 7, 'day': 90, 'week': 730}
+NET_WORTH_MAX_POINTS = 1000
+
+# Forecasting (services.forecast): months of history read, Monte Carlo paths per run,
+# longest horizon, and how long a result is cached (the key changes whenever the data does)
+FORECAST_HISTORY_MONTHS = 24
+FORECAST_PATHS = 5000
+FORECAST_MAX_MONTHS = 120
+FORECAST_CACHE_SECONDS = 24 * 60 * 60
+
+# Largest batch the tax-scenarios endpoint evaluates in one request (finance/tax.py)
+TAX_MAX_SCENARIOS = 1000
+
+# Largest id list the bulk transaction endpoints accept; bigger selections go by filter
+TRANSACTION_BULK_MAX_IDS = 5000
+
+# Deferred account deletion (services.delete_account): rows removed per DELETE statement, and
+# the pause between chunks that lets other writers take SQLite's lock
+ACCOUNT_DELETE_CHUNK_SIZE = 5000
+ACCOUNT_DELETE_PAUSE_SECONDS = 0.01
+
+# Request profiling (finance/profiling.py): staff requests carrying PROFILE_HEADER, plus a random
+# PROFILE_SAMPLE_RATE share of all requests, are profiled; the newest PROFILE_KEEP are kept on disk
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', BASE_DIR / 'profiles'))
+PROFILE_KEEP = 200
+PROFILE_MAX_QUERIES = 1000
+PROFILE_STACK_INTERVAL = 0.001  # seconds between stack samples for the flamegraph
+
+# Cold-start ceilings in ms for a fresh interpreter (core/startup.py, `manage.py profile_startup`,
+# enforced by finance.tests). Measured ~470 / 450 / 715 after the lazy-SDK change.
+COLD_START_BUDGET_MS = {'wsgi': 1000, 'asgi': 1000, 'command': 1500}
+
+# 7. BACKGROUND JOBS (finance/jobs.py, run with `manage.py run_jobs`)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_PER_USER_CONCURRENCY = 1
+JOB_RETRY_DELAY_SECONDS = 30
+JOB_STALE_AFTER_SECONDS = 600
+JOB_HEARTBEAT_SECONDS = 30  # run_jobs renews in-flight jobs this often; keep well under the stale cutoff
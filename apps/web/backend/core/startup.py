@@ -0,0 +1,64 @@
+"""
+Cold-start measurement for the `profile_startup` command and the budget test.
+
+Each measurement runs in a fresh interpreter, since import caches make
+in-process timings meaningless.
+"""
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# What a new worker (or a one-off command) has to load before serving anything
+TARGETS = {
+    'wsgi': [sys.executable, '-c', 'import core.wsgi'],
+    'asgi': [sys.executable, '-c', 'import core.asgi'],
+    'command': [sys.executable, 'manage.py', 'check'],
+}
+
+# SDKs that must only be imported on first use (core.auth_backend, finance.advisor, finance.fx)
+LAZY_MODULES = ('firebase_admin', 'google.generativeai', 'numpy')
+
+
+def _run(argv, extra_flags=()):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'))
+    command = [argv[0], *extra_flags, *argv[1:]]
+    return subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def cold_start_ms(target, runs=3):
+    """Best wall-clock time of `runs` fresh starts, in milliseconds (best-of filters scheduler noise)."""
+    best = float('inf')
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        _run(TARGETS[target])
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def import_times(target):
+    """
+    Parses `python -X importtime` for one start: {module: (self_us, cumulative_us)}.
+    """
+    stderr = _run(TARGETS[target], extra_flags=('-X', 'importtime')).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def by_package(times):
+    """Sums self time per top-level package: {package: (self_us, module_count)}."""
+    totals = defaultdict(lambda: [0, 0])
+    for name, (self_us, _) in times.items():
+        package = totals[name.split('.')[0]]
+        package[0] += self_us
+        package[1] += 1
+    return {name: tuple(values) for name, values in totals.items()}
@@ -1,13 +1,83 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, Transaction, WealthItem, TaxProfile,ITRData
+from .models import UserProfile, Transaction, WealthItem, TaxProfile,ITRData, ArchivedTransaction, FinancialYearSummary, Job, SpendCounter, BudgetAlert, FxRate, NetWorthSnapshot
 import json
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 from django.utils.safestring import mark_safe
+from . import services, sharding
+
+# --- 0. SHARD-AWARE ADMIN ---
+# With FINANCE_SHARDS > 0 the per-user models live in several databases.
+# Changelists get a "shard" filter to browse each database, change pages
+# find the row on whichever shard holds it, and joins to auth_user (which
+# only exists in 'default') are switched off.
+# There is deliberately no merged "all shards" listing: the changelist's
+# paging, sorting, actions and date drill-down all run on one QuerySet,
+# which can only target one database. To find a user's rows, pick the shard
+# from sharding.db_for_user(user_id) (or `manage.py shell`).
+class ShardListFilter(admin.SimpleListFilter):
+    """One database per changelist; defaults to the first shard."""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.aliases()]
+
+    def queryset(self, request, queryset):
+        return queryset  # routing happens in ShardedAdminMixin.get_queryset
+
+    def choices(self, changelist):
+        current = self.value() or sharding.aliases()[0]
+        for alias, label in self.lookup_choices:
+            yield {
+                'selected': alias == current,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': label,
+            }
+
+class ShardedAdminMixin:
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not sharding.enabled():
+            return queryset
+        alias = request.GET.get(ShardListFilter.parameter_name)
+        return queryset.using(alias if alias in sharding.aliases() else sharding.aliases()[0])
+
+    def get_list_filter(self, request):
+        filters = super().get_list_filter(request)
+        return (ShardListFilter, *filters) if sharding.enabled() else filters
+
+    def get_list_select_related(self, request):
+        return () if sharding.enabled() else super().get_list_select_related(request)
+
+    def get_search_fields(self, request):
+        fields = super().get_search_fields(request)
+        if sharding.enabled():
+            return tuple(f for f in fields if not f.startswith('user__'))
+        return fields
+
+    def get_object(self, request, object_id, from_field=None):
+        if not sharding.enabled():
+            return super().get_object(request, object_id, from_field)
+        try:
+            return sharding.find(self.model, pk=object_id)
+        except (self.model.DoesNotExist, ValidationError, ValueError):
+            return None
+
+class ShardedInlineFormSet(BaseInlineFormSet):
+    """Loads the inline rows from the parent user's shard."""
+    def __init__(self, *args, instance=None, queryset=None, **kwargs):
+        if sharding.enabled() and instance is not None and instance.pk is not None:
+            queryset = self.model.objects.for_user(instance.pk)
+        super().__init__(*args, instance=instance, queryset=queryset, **kwargs)
+
 # --- 1. INLINES ---
 # These allow you to edit profile/tax data directly on the User page
 class TaxProfileInline(admin.StackedInline): # Corrected inheritance
     model = TaxProfile
+    formset = ShardedInlineFormSet
     can_delete = False
     verbose_name_plural = 'Tax Profile'
     # Defining fieldsets for the inline view
@@ -43,26 +113,133 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('is_business',)
     search_fields = ('user__username', 'user__email')
 
+def _spend_row(t):
+    return (t.user_id, t.date, t.amount, t.type, t.currency)
+
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('title', 'user', 'amount', 'type', 'category', 'date', 'is_recurring') 
-    list_filter = ('type', 'category', 'date', 'is_recurring', 'user')
+class TransactionAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('title', 'user', 'amount', 'currency', 'type', 'category', 'date', 'is_recurring') 
+    list_filter = ('type', 'category', 'date', 'is_recurring', 'currency', 'user')
     search_fields = ('title', 'category', 'user__username')
     date_hierarchy = 'date' # Adds a nice date drill-down at the top
 
+    # Saves and deletes go through the same spend counter helpers as the API
+    def get_readonly_fields(self, request, obj=None):
+        # Moving a row to another user could move it to another shard
+        return ('user',) if obj is not None else ()
+
+    def save_model(self, request, obj, form, change):
+        before = [_spend_row(sharding.find(Transaction, pk=obj.pk))] if change else []
+        obj.type, obj.category = obj.type.lower(), obj.category.lower()
+        with sharding.atomic_for(obj.user_id):
+            super().save_model(request, obj, form, change)
+            services.apply_spend(services.spend_deltas(added=[_spend_row(obj)], removed=before))
+
+    def delete_model(self, request, obj):
+        with sharding.atomic_for(obj.user_id):
+            super().delete_model(request, obj)
+            services.apply_spend(services.spend_deltas(removed=[_spend_row(obj)]))
+
+    def delete_queryset(self, request, queryset):
+        for user_id in set(queryset.values_list('user_id', flat=True)):
+            services.bulk_delete_transactions(user_id, queryset.filter(user_id=user_id))
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('title', 'user', 'amount', 'type', 'category', 'date', 'financial_year')
+    list_filter = ('financial_year', 'type', 'category')
+    search_fields = ('title', 'category', 'user__username')
+    # Spend counters and FY summaries are built from these; deletes rebuild both
+    readonly_fields = ('archived_at', 'user', 'amount', 'currency', 'type', 'category', 'date', 'financial_year')
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._rebuild({(obj.user_id, obj.financial_year)})
+
+    def delete_queryset(self, request, queryset):
+        affected = set(queryset.values_list('user_id', 'financial_year'))
+        super().delete_queryset(request, queryset)
+        self._rebuild(affected)
+
+    def _rebuild(self, affected):
+        for user_id in {user_id for user_id, _ in affected}:
+            services.rebuild_spend_counters(user_id)
+        for user_id, fy in affected:
+            services.rebuild_financial_year_summary(user_id, fy)
+
+@admin.register(FinancialYearSummary)
+class FinancialYearSummaryAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'financial_year', 'total_income', 'total_expense', 'transaction_count', 'updated_at')
+    list_filter = ('financial_year',)
+    search_fields = ('user__username',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('user__username', 'kind')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'updated_at')
+
+@admin.register(SpendCounter)
+class SpendCounterAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'period', 'period_start', 'currency', 'spent')
+    list_filter = ('period',)
+    search_fields = ('user__username',)
+    date_hierarchy = 'period_start'
+
+@admin.register(BudgetAlert)
+class BudgetAlertAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'period', 'period_start', 'threshold', 'spent', 'budget', 'created_at')
+    list_filter = ('period', 'threshold')
+    search_fields = ('user__username',)
+
+@admin.register(NetWorthSnapshot)
+class NetWorthSnapshotAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'taken_at', 'resolution', 'assets', 'liabilities')
+    list_filter = ('resolution',)
+    search_fields = ('user__username',)
+    date_hierarchy = 'taken_at'
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    list_display = ('currency', 'rate', 'as_of', 'updated_at')
+    search_fields = ('currency',)
+    readonly_fields = ('updated_at',)
+
 @admin.register(WealthItem)
-class WealthItemAdmin(admin.ModelAdmin):
+class WealthItemAdmin(ShardedAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'user', 'amount_formatted', 'type', 'category')
-    list_filter = ('type', 'category', 'user')
+    list_filter = ('type', 'category', 'currency', 'user')
     search_fields = ('title', 'user__username')
     readonly_fields = ('created_at',)
 
+    # Like the wealth endpoints, every change adds a net-worth snapshot
+    def get_readonly_fields(self, request, obj=None):
+        # Moving an item to another user could move it to another shard
+        return (*self.readonly_fields, 'user') if obj is not None else self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        services.record_net_worth(obj.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        services.record_net_worth(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            services.record_net_worth(user_id)
+
     def amount_formatted(self, obj):
-        return f"₹{obj.amount:,.2f}"
+        if obj.currency == 'INR':
+            return f"₹{obj.amount:,.2f}"
+        return f"{obj.currency} {obj.amount:,.2f}"
     amount_formatted.short_description = 'Amount'
 
 @admin.register(TaxProfile)
-class TaxProfileAdmin(admin.ModelAdmin):
+class TaxProfileAdmin(ShardedAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'is_business', 'annual_rent', 'updated_at')
     list_filter = ('is_business', 'updated_at')
     search_fields = ('user__username',)
@@ -83,7 +260,7 @@ class TaxProfileAdmin(admin.ModelAdmin):
     )
     
 @admin.register(ITRData)
-class ITRDataAdmin(admin.ModelAdmin):
+class ITRDataAdmin(ShardedAdminMixin, admin.ModelAdmin):
     # 1. Main List View: Added Regime and Total Deductions for quick overview
     list_display = ('user', 'get_pan', 'get_salary', 'get_total_deductions', 'tax_regime', 'updated_at')
     
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import re
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils.module_loading import import_string
+
+from .models import ITRData, Transaction, UserProfile
+from .singleflight import SingleFlight
+from . import fx, services
+
+# Same guard rails the web client used in packages/shared/services/aiService.js
+BASE_RULES = """SYSTEM RULES (NON-OVERRIDABLE):
+1. Act only as an Indian Tax/Finance Expert.
+2. Do NOT suggest illegal tax evasion.
+3. Mention specific IT Act sections where applicable.
+4. Keep responses concise and professional."""
+
+TASK = "Review this user's finances for the current financial year and give 3-5 specific, actionable suggestions."
+
+_inflight = SingleFlight()
+
+
+# --- MODEL CLIENTS ---
+# Selected with settings.AI_ADVISOR_CLIENT (a dotted path). Any class with
+# a `generate(prompt) -> str` method works.
+
+class GeminiClient:
+    model_name = 'gemini-2.0-flash'
+
+    def generate(self, prompt):
+        # Imported here so workers that never ask for advice don't pay for the SDK
+        import google.generativeai as genai
+
+        if not settings.GEMINI_API_KEY:
+            raise RuntimeError("AI Service Unavailable: Missing API Key")
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        response = genai.GenerativeModel(self.model_name).generate_content(prompt)
+        return (response.text or "No insights generated.").replace('```json', '').replace('```', '').strip()
+
+
+class StubClient:
+    """Offline stand-in for tests and benchmarks; sleeps AI_STUB_LATENCY seconds per call."""
+
+    def generate(self, prompt):
+        time.sleep(getattr(settings, 'AI_STUB_LATENCY', 0))
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        return f"[stub advice {digest}] Keep spending below your monthly budget."
+
+
+def get_client():
+    return import_string(getattr(settings, 'AI_ADVISOR_CLIENT', 'finance.advisor.GeminiClient'))()
+
+
+# --- SUMMARY ---
+
+def _rounded(value, step=100):
+    # Rounding keeps small edits from busting the cache without changing the advice
+    return int(round(float(value or 0) / step) * step)
+
+
+def build_summary(user_id):
+    """Compact, JSON-safe snapshot of the figures the advisor needs (a handful of queries)."""
+    fy = services.current_financial_year()
+    start, end = services.financial_year_bounds(fy)
+    this_year = Transaction.objects.for_user(user_id).filter(date__range=(start, end))
+
+    # Summed per currency in SQL, then converted to INR (rows without a rate are left out)
+    grouped = list(this_year.values_list('type', 'category', 'currency').annotate(total=Sum('amount')).order_by())
+    converted, _ = fx.convert([row[3] for row in grouped], [row[2] for row in grouped])
+    totals, by_category = defaultdict(float), defaultdict(float)
+    for (kind, category, _, _), value in zip(grouped, converted.tolist()):
+        if value == value:
+            totals[kind] += value
+            if kind == 'expense':
+                by_category[category] += value
+    top_categories = sorted(by_category.items(), key=lambda item: -item[1])[:5]
+    wealth = services.net_worth(user_id)  # foreign holdings converted to INR
+    profile = UserProfile.objects.filter(user_id=user_id).values(
+        'monthlyIncome', 'monthlyBudget', 'is_business').first() or {}
+    regime = ITRData.objects.for_user(user_id).values_list('tax_regime', flat=True).first()
+
+    return {
+        "financialYear": f"{fy}-{fy + 1}",
+        "income": _rounded(totals.get('income')),
+        "expense": _rounded(totals.get('expense')),
+        "topExpenseCategories": {category: _rounded(total) for category, total in top_categories},
+        "assets": _rounded(wealth['assets']),
+        "liabilities": _rounded(wealth['liabilities']),
+        "monthlyIncome": _rounded(profile.get('monthlyIncome')),
+        "monthlyBudget": _rounded(profile.get('monthlyBudget')),
+        "isBusiness": bool(profile.get('is_business')),
+        "taxRegime": regime or 'new',
+    }
+
+
+def summary_digest(summary):
+    encoded = json.dumps(summary, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def build_prompt(summary):
+    context = json.dumps(summary, sort_keys=True)
+    prompt = f"{BASE_RULES}\n\nTASK:\n{TASK}\n\nCONTEXT DATA:\n{context}"
+    # Category names are user-controlled, so strip the classic injection phrase
+    return re.sub(r"ignore previous instructions", "[REDACTED]", prompt, flags=re.IGNORECASE)
+
+
+# --- ADVICE ---
+
+def get_advice(user_id, client=None):
+    """
+    Returns {"advice", "digest", "source"} where source is 'cache', 'shared'
+    (coalesced onto a concurrent identical request) or 'model'.
+    Users with identical summaries share one cache entry.
+    """
+    summary = build_summary(user_id)
+    digest = summary_digest(summary)
+    key = f"advisor:{digest}"
+
+    advice = cache.get(key)
+    if advice is not None:
+        return {"advice": advice, "digest": digest, "source": 'cache'}
+
+    def generate():
+        # Another process may have filled the cache while we were waiting
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        text = (client or get_client()).generate(build_prompt(summary))
+        cache.set(key, text, getattr(settings, 'AI_ADVICE_CACHE_SECONDS', 6 * 3600))
+        return text
+
+    advice, shared = _inflight.do(key, generate)
+    return {"advice": advice, "digest": digest, "source": 'shared' if shared else 'model'}
@@ -0,0 +1,215 @@
+import gzip
+import json
+import os
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from . import services, sharding
+from .models import (
+    ArchivedTransaction, ITRData, NetWorthSnapshot, TaxProfile, Transaction, UserProfile, WealthItem,
+)
+
+# --- ACCOUNT DUMPS ---
+# A dump is gzip-compressed NDJSON: one header line describing the user,
+# then one {"model": ..., "fields": {...}} line per row, grouped by model.
+# Primary keys and the user id are left out so a dump can be restored onto
+# any account, on any database. Derived data (spend counters, FY summaries)
+# is rebuilt on restore rather than copied; net-worth history can't be
+# rebuilt, so it is dumped like any other table.
+
+FORMAT = 'finance-dump'
+VERSION = 1
+
+DUMP_MODELS = (
+    UserProfile, Transaction, ArchivedTransaction, WealthItem, TaxProfile, ITRData, NetWorthSnapshot,
+)
+MODELS_BY_LABEL = {model._meta.model_name: model for model in DUMP_MODELS}
+# Models whose import fingerprints hash in the owner's id (see services.fingerprint)
+FINGERPRINTED = (Transaction, ArchivedTransaction)
+
+
+def default_filename(user_id):
+    return f"user-{user_id}.ndjson.gz"
+
+
+def _fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != 'user'
+    ]
+
+
+def _queryset(model, user_id):
+    if sharding.is_sharded(model):
+        return model.objects.for_user(user_id)
+    return model.objects.filter(user_id=user_id)
+
+
+def _line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+def dump_user(user_id, path, chunk_size=2000):
+    """
+    Streams one user's finance data to `path`. Rows are read with iterator()
+    and written `chunk_size` lines at a time, so memory stays flat however
+    many transactions the user has. Returns {model_name: rows_written}.
+    """
+    user = User.objects.get(pk=user_id)
+    counts = {}
+    with gzip.open(path, 'wt', encoding='utf-8') as out:
+        out.write(_line({
+            "format": FORMAT,
+            "version": VERSION,
+            "created_at": timezone.now(),
+            "user": {
+                "id": user.pk, "username": user.username, "email": user.email,
+                "first_name": user.first_name, "last_name": user.last_name,
+            },
+        }))
+        for model in DUMP_MODELS:
+            label = model._meta.model_name
+            rows = (
+                _queryset(model, user_id).order_by('pk')
+                .values(*[field.attname for field in _fields(model)])
+                .iterator(chunk_size=chunk_size)
+            )
+            counts[label] = 0
+            batch = []
+            for row in rows:
+                batch.append(_line({"model": label, "fields": row}))
+                if len(batch) >= chunk_size:
+                    out.writelines(batch)
+                    counts[label] += len(batch)
+                    batch = []
+            out.writelines(batch)
+            counts[label] += len(batch)
+    return counts
+
+
+def dump_user_to_dir(user_id, directory, chunk_size=2000):
+    """Pool-friendly wrapper: returns (user_id, path, counts)."""
+    path = os.path.join(directory, default_filename(user_id))
+    return user_id, path, dump_user(user_id, path, chunk_size=chunk_size)
+
+
+# --- RESTORE ---
+
+def read_header(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as src:
+        header = json.loads(src.readline() or '{}')
+    if header.get('format') != FORMAT or header.get('version') != VERSION:
+        raise ValueError(f"{path} is not a {FORMAT} v{VERSION} file")
+    return header
+
+
+def _target_user(header, user_id):
+    if user_id is not None:
+        return User.objects.get(pk=user_id)
+    info = header['user']
+    user = User.objects.filter(username=info['username']).first()
+    if user is None:
+        # Restored accounts have no password until the owner resets it
+        user = User(username=info['username'], email=info['email'],
+                    first_name=info['first_name'], last_name=info['last_name'])
+        user.set_unusable_password()
+        user.save()
+    return user
+
+
+def _has_data(user_id):
+    return any(
+        _queryset(model, user_id).exists()
+        for model in DUMP_MODELS if sharding.is_sharded(model)
+    )
+
+
+def _build(model, user_id, values, seen):
+    fields = {}
+    for field in _fields(model):
+        if field.attname in values:
+            fields[field.attname] = field.to_python(values[field.attname])
+    obj = model(user_id=user_id, **fields)
+    if model in FINGERPRINTED and obj.fingerprint:
+        # Fingerprints include the owner, so they change with the target account
+        # and repeats of one line are renumbered in dump (id) order
+        obj.fingerprint = services.next_fingerprint(
+            seen, user_id, obj.date, obj.amount, obj.title, obj.type, obj.bank_reference, obj.currency)
+    return obj
+
+
+def _stamped(model):
+    """auto_now / auto_now_add fields, which every save or insert overwrites with the current time."""
+    return [
+        field for field in _fields(model)
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+
+
+def _flush(model, user_id, objs, batch_size):
+    if not objs:
+        return
+    stamped = _stamped(model)
+    dumped = [{field.attname: getattr(obj, field.attname) for field in stamped} for obj in objs]
+    if model is UserProfile:
+        # Every User already has a profile (see signals.create_user_profile)
+        values = {field.attname: getattr(objs[-1], field.attname) for field in _fields(model)}
+        UserProfile.objects.update_or_create(user_id=user_id, defaults=values)
+        restored = {name: value for name, value in dumped[-1].items() if value is not None}
+        if restored:
+            UserProfile.objects.filter(user_id=user_id).update(**restored)
+        return
+
+    model.objects.shard(user_id).bulk_create(objs, batch_size=batch_size)
+    if stamped:
+        # Put the dump's timestamps back over the ones the insert stamped
+        for obj, values in zip(objs, dumped):
+            for name, value in values.items():
+                if value is not None:
+                    setattr(obj, name, value)
+        model.objects.shard(user_id).bulk_update(objs, [field.name for field in stamped], batch_size=batch_size)
+
+
+def load_user(path, user_id=None, replace=False, batch_size=1000):
+    """
+    Restores a dump onto `user_id`, or onto the dump's username (created if
+    missing). Refuses to merge into an account that already has finance
+    data unless `replace` is set, in which case that data is deleted first.
+    Returns (user, {model_name: rows_loaded}).
+    """
+    header = read_header(path)
+    user = _target_user(header, user_id)
+    if _has_data(user.pk) and not replace:
+        raise ValueError(f"User {user.pk} already has finance data; use replace to overwrite it")
+
+    counts = {label: 0 for label in MODELS_BY_LABEL}
+    # Nested atomics: a savepoint when the user's shard is 'default' too
+    with transaction.atomic(using='default'), sharding.atomic_for(user.pk):
+        if replace:
+            for model in sharding.sharded_models():
+                model.objects.for_user(user.pk).delete()
+
+        with gzip.open(path, 'rt', encoding='utf-8') as src:
+            src.readline()  # header
+            model, pending, seen = None, [], Counter()
+            for line in src:
+                record = json.loads(line)
+                next_model = MODELS_BY_LABEL.get(record['model'])
+                if next_model is None:
+                    raise ValueError(f"Unknown model in dump: {record['model']}")
+                if next_model is not model or len(pending) >= batch_size:
+                    _flush(model, user.pk, pending, batch_size)
+                    model, pending = next_model, []
+                pending.append(_build(model, user.pk, record['fields'], seen))
+                counts[record['model']] += 1
+            _flush(model, user.pk, pending, batch_size)
+
+        services.rebuild_spend_counters(user.pk)
+        years = ArchivedTransaction.objects.for_user(user.pk).values_list('financial_year', flat=True).distinct()
+        for fy in list(years):
+            services.rebuild_financial_year_summary(user.pk, fy)
+    return user, counts
@@ -0,0 +1,63 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils.functional import cached_property
+
+CENT = Decimal('0.01')
+
+
+def to_paise(value):
+    """Rupees (str, int, float or Decimal) -> whole paise, rounded half-up. Raises ValueError."""
+    try:
+        # str() first so floats use their shortest repr (0.1 -> '0.1', not 0.1000000000000000055...)
+        rupees = Decimal(str(value).strip()).quantize(CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    return int(rupees * 100)
+
+
+def from_paise(value):
+    """Whole paise -> Decimal rupees with two places."""
+    return Decimal(int(value)).scaleb(-2)
+
+
+def to_rupees(value):
+    """Normalizes an amount from a request to Decimal rupees with two places. Raises ValueError."""
+    return from_paise(to_paise(value))
+
+
+class PaiseField(models.BigIntegerField):
+    """
+    Money stored as a 64-bit count of paise. Python code keeps seeing
+    Decimal rupees (reads, assignments, filters and Sum() all convert),
+    while the database sums and sorts plain integers - exact and cheaper
+    than NUMERIC. In F() expressions the column is in paise, so pair it
+    with to_paise(): F('spent') + to_paise(delta).
+    """
+    description = "Money in paise (64-bit integer)"
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else from_paise(value)
+
+    def to_python(self, value):
+        if value is None:
+            return value
+        try:
+            return from_paise(to_paise(value))
+        except ValueError:
+            raise ValidationError(
+                self.error_messages['invalid'], code='invalid', params={'value': value})
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        return None if value is None else to_paise(value)
+
+    @cached_property
+    def validators(self):
+        # BigIntegerField's range validators would compare rupees against paise limits
+        return [*self.default_validators, *self._validators]
+
+    def formfield(self, **kwargs):
+        from django import forms
+        return models.Field.formfield(self, **{'form_class': forms.DecimalField, 'decimal_places': 2, **kwargs})
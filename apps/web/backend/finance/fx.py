@@ -0,0 +1,77 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .lazy import numpy
+from .models import FxRate
+
+# --- FX RATES ---
+# The whole FxRate table is small (one row per currency), so each process
+# keeps it in memory as a {code: index} map plus a NumPy array of rupees
+# per unit, reloaded every FX_CACHE_SECONDS. Conversions then look rates up
+# once per distinct currency and scale every amount in one array operation.
+# NumPy comes from lazy.numpy() so it stays off the worker boot path
+# (this module is loaded by finance.signals; see `profile_startup`).
+
+BASE_CURRENCY = 'INR'
+
+_CODE = re.compile(r'^[A-Z]{3}$')
+_lock = threading.Lock()
+_table = {'codes': {}, 'rates': None, 'loaded_at': None}
+
+
+def cache_seconds():
+    return getattr(settings, 'FX_CACHE_SECONDS', 300)
+
+
+def normalize_currency(value):
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"Invalid currency code: {value!r}")
+    code = (value or BASE_CURRENCY).strip().upper()
+    if not _CODE.match(code):
+        raise ValueError(f"Invalid currency code: {value}")
+    return code
+
+
+def invalidate():
+    """Forces the next lookup in this process to re-read the table."""
+    with _lock:
+        _table['loaded_at'] = None
+
+
+def rate_table():
+    """Returns ({code: index}, rates) where rates[index] is INR per unit of code."""
+    np = numpy()
+
+    with _lock:
+        loaded_at = _table['loaded_at']
+        if loaded_at is None or time.monotonic() - loaded_at >= cache_seconds():
+            codes, rates = {BASE_CURRENCY: 0}, [1.0]
+            for code, rate in FxRate.objects.exclude(currency=BASE_CURRENCY).values_list('currency', 'rate'):
+                codes[code] = len(rates)
+                rates.append(float(rate))
+            _table.update(codes=codes, rates=np.array(rates), loaded_at=time.monotonic())
+        return _table['codes'], _table['rates']
+
+
+def convert(amounts, currencies, to=BASE_CURRENCY):
+    """
+    Converts parallel sequences of amounts and currency codes into `to`.
+    Returns (float64 array, sorted list of codes with no rate); amounts in
+    those codes come back as NaN so callers can leave them out of totals.
+    """
+    np = numpy()
+
+    codes, rates = rate_table()
+    if to not in codes:
+        raise ValueError(f"No FX rate for {to}")
+
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if not amounts.size:
+        return amounts, []
+    unique, inverse = np.unique(np.asarray(currencies, dtype=str), return_inverse=True)
+    unit = np.array([rates[codes[code]] if code in codes else np.nan for code in unique])
+    missing = [str(code) for code in unique if code not in codes]
+    return amounts * unit[inverse] / rates[codes[to]], missing
@@ -0,0 +1,240 @@
+import os
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job, Transaction
+from . import services
+
+# --- REGISTRY ---
+# Every job kind maps to a handler(job, progress) -> dict.
+# `progress(fraction)` stores 0.0-1.0 on the Job row so the status endpoint can poll it.
+
+HANDLERS = {}
+# Kinds only the server enqueues; the jobs endpoint refuses them
+INTERNAL_KINDS = {'delete_account'}
+
+
+def register(kind):
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def per_user_concurrency():
+    return getattr(settings, 'JOB_PER_USER_CONCURRENCY', 1)
+
+
+def retry_delay():
+    return getattr(settings, 'JOB_RETRY_DELAY_SECONDS', 30)
+
+
+def stale_after():
+    return getattr(settings, 'JOB_STALE_AFTER_SECONDS', 600)
+
+
+def heartbeat_interval():
+    return getattr(settings, 'JOB_HEARTBEAT_SECONDS', 30)
+
+
+# --- PRODUCER SIDE ---
+
+def enqueue(kind, user_id=None, payload=None, max_attempts=3):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(user_id=user_id, kind=kind, payload=payload or {}, max_attempts=max_attempts)
+
+
+def job_status(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# --- WORKER SIDE ---
+
+def claim(limit):
+    """
+    Atomically moves up to `limit` due jobs from queued to running, skipping
+    users that already have JOB_PER_USER_CONCURRENCY jobs in flight.
+    The conditional UPDATE makes claiming safe with several worker processes.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    cap = per_user_concurrency()
+    running = dict(
+        Job.objects.filter(status='running', user__isnull=False)
+        .values_list('user_id').annotate(n=Count('id')).order_by()
+    )
+
+    claimed = []
+    candidates = (
+        Job.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', 'user_id')[:limit * 10]
+    )
+    for job_id, user_id in candidates:
+        if len(claimed) >= limit:
+            break
+        if user_id is not None and running.get(user_id, 0) >= cap:
+            continue
+        won = Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', started_at=now, updated_at=now, attempts=F('attempts') + 1,
+        )
+        if won:
+            running[user_id] = running.get(user_id, 0) + 1
+            claimed.append(job_id)
+    return claimed
+
+
+def heartbeat(job_ids):
+    """
+    Renews the lease on running jobs. The run_jobs loop calls it every
+    JOB_HEARTBEAT_SECONDS for everything it has in flight, so a job counts
+    as stale only once its runner is gone, however rarely it reports progress.
+    """
+    return Job.objects.filter(pk__in=list(job_ids), status='running').update(updated_at=timezone.now())
+
+
+def requeue_stale():
+    """
+    Recovers jobs whose lease expired (no heartbeat for JOB_STALE_AFTER_SECONDS)
+    because their runner or worker died. Each counts as a failed attempt, so a
+    job that keeps killing its worker ends 'failed' after max_attempts.
+    Returns {'retry': n, 'failed': n}.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after())
+    outcomes = Counter({'retry': 0, 'failed': 0})
+    for job in Job.objects.filter(status='running', updated_at__lt=cutoff):
+        # Take the expired lease first: another runner may be recovering it too
+        taken = Job.objects.filter(pk=job.pk, status='running', updated_at__lt=cutoff).update(
+            updated_at=timezone.now())
+        if taken:
+            outcomes[record_failure(job, f"Lease expired: no heartbeat for {stale_after()}s")] += 1
+    return dict(outcomes)
+
+
+def run(job_id):
+    """Executes one claimed job. Runs inside a worker process."""
+    job = Job.objects.get(pk=job_id)
+
+    def progress(fraction):
+        Job.objects.filter(pk=job_id).update(
+            progress=max(0.0, min(1.0, float(fraction))), updated_at=timezone.now(),
+        )
+
+    try:
+        result = HANDLERS[job.kind](job, progress)
+    except Exception:
+        return record_failure(job, traceback.format_exc(limit=5))
+
+    now = timezone.now()
+    Job.objects.filter(pk=job_id).update(
+        status='done', progress=1.0, result=result or {}, error='', updated_at=now, finished_at=now,
+    )
+    return 'done'
+
+
+def record_failure(job, error):
+    """Re-queues with backoff while attempts remain, else marks the job failed. Returns 'retry' or 'failed'."""
+    now = timezone.now()
+    retrying = job.attempts < job.max_attempts
+    if retrying:
+        # Exponential backoff: 1x, 2x, 4x ... the base delay
+        delay = retry_delay() * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk).update(
+            status='queued', error=error, updated_at=now,
+            run_after=now + timedelta(seconds=delay),
+        )
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status='failed', error=error, updated_at=now, finished_at=now,
+        )
+    return 'retry' if retrying else 'failed'
+
+
+def record_crash(job_id, error):
+    """For a job whose worker process died (BrokenProcessPool): it must not stay 'running'."""
+    job = Job.objects.filter(pk=job_id, status='running').first()
+    return record_failure(job, error) if job else 'gone'
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer: each child needs its own Django setup and DB connections."""
+    import django
+    from django.db import connections
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    django.setup()
+    connections.close_all()  # never reuse a connection inherited through fork()
+
+
+# --- HANDLERS ---
+
+@register('import_transactions')
+def import_transactions(job, progress, chunk_size=500):
+    """
+    Payload: {"rows": [{"title", "amount", "type", "category", "date",
+    "is_recurring", "bank_reference"}, ...], "on_duplicate": "skip" | "merge"}
+    Re-importing the same statement is a no-op (see services.fingerprint).
+    """
+    rows = job.payload.get('rows', [])
+    totals = {"created": 0, "duplicates": 0}
+    seen = Counter()  # numbers repeated lines across chunks
+    for start in range(0, len(rows), chunk_size):
+        result = services.import_transactions(
+            job.user_id, rows[start:start + chunk_size], job.payload.get('on_duplicate', 'skip'), seen)
+        totals["created"] += result["created"]
+        totals["duplicates"] += result["duplicates"]
+        progress(min(start + chunk_size, len(rows)) / len(rows))
+    return totals
+
+
+@register('recategorize')
+def recategorize(job, progress):
+    """Payload: {"match": "swiggy", "category": "food"} - re-files every title containing `match`."""
+    updated = Transaction.objects.for_user(job.user_id).filter(
+        title__icontains=job.payload['match'],
+    ).update(category=job.payload['category'].lower())
+    return {"updated": updated}
+
+
+@register('archive_financial_years')
+def archive_financial_years(job, progress):
+    """Payload: {"before": 2025} (optional) - same as the management command, for one user."""
+    years = list(services.closed_financial_years(job.user_id, job.payload.get('before')))
+    moved = 0
+    for done, (user_id, fy) in enumerate(years, start=1):
+        moved += services.archive_financial_year(user_id, fy)
+        progress(done / len(years))
+    return {"archived": moved}
+
+
+@register('ai_advice')
+def ai_advice(job, progress):
+    """Warms the advisor cache so the next page visit is instant."""
+    from .advisor import get_advice
+    return get_advice(job.user_id)
+
+
+@register('delete_account')
+def delete_account(job, progress):
+    """
+    Payload: {"user_id": 7}. Enqueued with no user, so the job row (and its
+    result) outlives the account; refuses accounts that are still active.
+    """
+    return {"deleted": services.delete_account(job.payload['user_id'], progress=progress)}
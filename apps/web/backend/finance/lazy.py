@@ -0,0 +1,11 @@
+# --- LAZY IMPORTS ---
+# NumPy is slow to import and most requests never touch it, so it stays off
+# the worker boot path (see core.startup.LAZY_MODULES and `profile_startup`).
+# Code that needs it calls numpy() where it is used instead of importing it
+# at module level; after the first call that is just a sys.modules lookup.
+
+
+def numpy():
+    """The numpy module, imported on first use."""
+    import numpy
+    return numpy
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from finance import services
+
+
+class Command(BaseCommand):
+    help = "Moves transactions from closed financial years into the archive and stores per-FY summaries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only archive this user id.")
+        parser.add_argument(
+            '--before', type=int,
+            help="Archive financial years starting before this year (default: the current FY).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = 0
+        for user_id, fy in services.closed_financial_years(options['user'], options['before']):
+            moved = services.archive_financial_year(user_id, fy, chunk_size=options['chunk_size'])
+            if moved:
+                self.stdout.write(f"user {user_id}: FY {fy}-{fy + 1} -> {moved} rows archived")
+            total += moved
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} transactions."))
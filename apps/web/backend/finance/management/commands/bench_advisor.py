@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from finance import advisor
+
+
+class CountingStub(advisor.StubClient):
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return super().generate(prompt)
+
+
+class Command(BaseCommand):
+    help = "Fires concurrent identical advisor requests against a stub model and counts upstream calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=0, help="User id to summarise (0 = empty summary).")
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--latency', type=float, default=0.5, help="Simulated model latency in seconds.")
+
+    def handle(self, *args, **options):
+        client = CountingStub(options['latency'])
+        n = options['concurrency']
+
+        def request(_):
+            try:
+                return advisor.get_advice(options['user'], client=client)['source']
+            finally:
+                connection.close()  # each thread opened its own connection
+
+        for phase in ('cold', 'warm'):
+            if phase == 'cold':
+                cache.delete(f"advisor:{advisor.summary_digest(advisor.build_summary(options['user']))}")
+            before = client.calls
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                sources = list(pool.map(request, range(n)))
+            elapsed = time.perf_counter() - t0
+            counts = {s: sources.count(s) for s in sorted(set(sources))}
+            self.stdout.write(
+                f"{phase}: {n} requests in {elapsed * 1000:.0f} ms, "
+                f"{client.calls - before} upstream call(s), sources={counts}"
+            )
@@ -0,0 +1,110 @@
+import random
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from finance import services, sharding
+from finance.fields import from_paise
+from finance.models import Transaction, UserProfile
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks per-user forecast latency (series query, Monte Carlo, cold vs cached) "
+        "and the vectorized Monte Carlo against a per-path Python loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Transactions over the last 3 years.")
+        parser.add_argument('--months', type=int, default=60)
+        parser.add_argument('--paths', type=int, nargs='+', default=[1000, 5000, 20000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            # Rolled back at the end; nothing is left behind
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_forecast__')
+                UserProfile.objects.filter(user=user).update(monthlyIncome=0)
+                with sharding.atomic_for(user.id):
+                    self._seed(user, options['rows'])
+                    self._run(user, options)
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, user, rows):
+        today = timezone.localdate()
+        Transaction.objects.shard(user.id).bulk_create([
+            Transaction(
+                user=user,
+                title=f"Txn {i}",
+                amount=from_paise((i * 7919) % 500000 + 100),
+                type='income' if i % 20 == 0 else 'expense',
+                category=('food', 'rent', 'travel', 'bills', 'other')[i % 5],
+                date=today - timedelta(days=i % 1095),
+                is_recurring=i % 50 == 0,
+            ) for i in range(rows)
+        ], batch_size=2000)
+
+    def _best(self, fn, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000
+
+    def _run(self, user, options):
+        months, repeat = options['months'], options['repeat']
+        inputs = services.forecast_inputs(user.id)
+        self.stdout.write(
+            f"{options['rows']} transactions, {len(inputs['history'])} months of history, "
+            f"{months}-month horizon, best of {repeat}"
+        )
+        self.stdout.write(f"  inputs (series + net worth)   {self._best(lambda: services.forecast_inputs(user.id), repeat):8.1f} ms")
+
+        series = np.array(inputs['series'])
+        fixed = series[0, -3:].mean() - series[1, -3:].mean()
+        variable = series[2] - series[3]
+        history = variable.tolist()
+
+        def python_loop(paths):
+            rng = random.Random(0)
+            out = []
+            for _ in range(paths):
+                total, row = 0.0, []
+                for _ in range(months):
+                    total += fixed + rng.choice(history)
+                    row.append(total)
+                out.append(row)
+            return out
+
+        for paths in options['paths']:
+            vectorized = self._best(
+                lambda: services.simulate_savings(fixed, variable, months, paths, np.random.default_rng(0)), repeat)
+            looped = self._best(lambda: python_loop(paths), max(1, repeat // 2))
+            full = self._best(lambda: services.run_forecast(inputs, months, goal=1e7, paths=paths), repeat)
+            self.stdout.write(
+                f"  {paths:>6} paths  simulate {vectorized:7.1f} ms  python loop {looped:8.1f} ms  "
+                f"x{looped / vectorized:5.1f}  full run_forecast {full:7.1f} ms"
+            )
+
+        def cold():
+            cache.clear()
+            services.forecast(user.id, months, goal=1e7)
+
+        self.stdout.write(f"  forecast() cold               {self._best(cold, repeat):8.1f} ms")
+        services.forecast(user.id, months, goal=1e7)
+        warm = self._best(lambda: services.forecast(user.id, months, goal=1e7), repeat)
+        self.stdout.write(f"  forecast() cached             {warm:8.1f} ms")
@@ -0,0 +1,123 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Sum
+
+from finance import services, sharding
+from finance.fields import from_paise
+from finance.models import Transaction
+
+CENT = Decimal('0.01')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks SUM / GROUP BY over integer paise (PaiseField) against the old "
+        "NUMERIC amount column, in SQL and in NumPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            # Rolled back at the end, temp tables included
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_money__')
+                with sharding.atomic_for(user.id):
+                    self._seed(user, options['rows'])
+                    self._run(user, options['rows'], options['repeat'])
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, user, rows):
+        start = date(2024, 4, 1)
+        Transaction.objects.shard(user.id).bulk_create([
+            Transaction(
+                user=user,
+                title=f"Txn {i}",
+                amount=from_paise((i * 7919) % 5000000 + 1),  # every paise digit in play
+                type='income' if i % 7 == 0 else 'expense',
+                category=('food', 'rent', 'travel', 'bills', 'other')[i % 5],
+                date=start + timedelta(days=i % 365),
+            ) for i in range(rows)
+        ], batch_size=2000)
+
+        # Twin tables with identical layout so only the amount type differs:
+        # the pre-paise DECIMAL(12, 2) column vs a 64-bit integer
+        with connections[sharding.db_for_user(user.id)].cursor() as cursor:
+            for table, amount_type, amount in (('bench_decimal', 'decimal(12, 2)', 'amount / 100.0'),
+                                               ('bench_paise', 'bigint', 'amount')):
+                cursor.execute(
+                    f"CREATE TEMP TABLE {table} (user_id integer, category varchar(100), "
+                    f"type varchar(10), amount {amount_type})")
+                cursor.execute(
+                    f"INSERT INTO {table} SELECT user_id, category, type, {amount} "
+                    f"FROM finance_transaction WHERE user_id = %s", [user.id])
+
+    def _run(self, user, rows, repeat):
+        alias = sharding.db_for_user(user.id)
+        queryset = Transaction.objects.for_user(user.id)
+
+        def sql(query):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(query, [user.id])
+                return cursor.fetchall()
+
+        def decimal_group_by():
+            # What DecimalField's converter did to every aggregate
+            return {c: Decimal(str(v)).quantize(CENT) for c, v in sql(
+                "SELECT category, SUM(amount) FROM bench_decimal WHERE user_id = %s GROUP BY category")}
+
+        def paise_group_by():
+            return {c: from_paise(v) for c, v in sql(
+                "SELECT category, SUM(amount) FROM bench_paise WHERE user_id = %s GROUP BY category")}
+
+        def orm_group_by():
+            return dict(queryset.values_list('category').annotate(total=Sum('amount')).order_by())
+
+        def decimal_numpy():
+            amounts = [Decimal(str(v)).quantize(CENT) for (v,) in sql(
+                "SELECT amount FROM bench_decimal WHERE user_id = %s")]
+            return np.array(amounts, dtype=object).sum()
+
+        def paise_numpy():
+            amounts = np.fromiter((v for (v,) in sql("SELECT amount FROM bench_paise WHERE user_id = %s")),
+                                  dtype=np.int64)
+            return from_paise(amounts.sum())
+
+        def orm_numpy():
+            return from_paise(services.paise_array(queryset).sum())
+
+        exact = from_paise(services.paise_array(queryset).sum())
+        self.stdout.write(f"{rows} rows, best of {repeat}; exact total {exact}")
+        for label, cases in (
+            ('SUM ... GROUP BY category', (('decimal', decimal_group_by), ('paise', paise_group_by),
+                                           ('paise ORM', orm_group_by))),
+            ('total in NumPy', (('decimal', decimal_numpy), ('paise', paise_numpy), ('paise ORM', orm_numpy))),
+        ):
+            self.stdout.write(label)
+            baseline = None
+            for name, fn in cases:
+                best = float('inf')
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    result = fn()
+                    best = min(best, time.perf_counter() - t0)
+                total = sum(result.values()) if isinstance(result, dict) else result
+                baseline = baseline or best
+                self.stdout.write(
+                    f"  {name:<10} {best * 1000:8.1f} ms  x{baseline / best:.1f}  "
+                    f"total {total} ({'exact' if total == exact else f'off by {total - exact}'})"
+                )
@@ -0,0 +1,90 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from finance import services, sharding
+from finance.models import Transaction
+from finance.renderers import ORJSONRenderer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmarks history serialization (legacy vs projection + orjson), reported per 10k rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        try:
+            # Everything happens inside transactions that are rolled back,
+            # so the benchmark never leaves data behind.
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_serialization__')
+                with sharding.atomic_for(user.id):
+                    self._seed(user, rows)
+                    self._run(user, rows, repeat)
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, user, rows):
+        start = date(2024, 4, 1)
+        Transaction.objects.shard(user.id).bulk_create([
+            Transaction(
+                user=user,
+                title=f"Txn {i}",
+                amount=(i % 5000) + 0.5,
+                type='income' if i % 7 == 0 else 'expense',
+                category=('food', 'rent', 'travel', 'bills')[i % 4],
+                date=start + timedelta(days=i % 365),
+            ) for i in range(rows)
+        ], batch_size=1000)
+
+    def _run(self, user, rows, repeat):
+        queryset = Transaction.objects.for_user(user.id).order_by('-date')
+        columns = services.TRANSACTION_COLUMNS
+
+        def legacy():
+            data = [{
+                "id": t.id,
+                "title": t.title,
+                "amount": float(t.amount),
+                "type": t.type,
+                "category": t.category,
+                "date": t.date.isoformat(),
+                "is_recurring": t.is_recurring
+            } for t in queryset.all()]
+            return JSONRenderer().render(data)
+
+        def fast_records():
+            data = services.as_records(columns, services.project(queryset, columns))
+            return ORJSONRenderer().render(data)
+
+        def fast_columns():
+            data = services.as_columns(columns, services.project(queryset, columns))
+            return ORJSONRenderer().render(data)
+
+        scale = 10000 / rows
+        self.stdout.write(f"{rows} rows, best of {repeat}, normalised to 10k rows")
+        baseline = None
+        for name, fn in (('legacy', legacy), ('records', fast_records), ('columns', fast_columns)):
+            best, size = float('inf'), 0
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                size = len(fn())
+                best = min(best, time.perf_counter() - t0)
+            per_10k = best * scale * 1000
+            baseline = baseline or per_10k
+            self.stdout.write(
+                f"  {name:<8} {per_10k:8.1f} ms/10k  {size * scale / 1024:8.1f} KiB/10k  "
+                f"x{baseline / per_10k:.1f}"
+            )
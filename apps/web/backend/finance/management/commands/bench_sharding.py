@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from finance import sharding
+from finance.models import Transaction
+
+
+def _init_writer():
+    connections.close_all()  # each process opens its own shard connections
+
+
+def _write_user(user_id, rows, first_id):
+    """One committed INSERT per row, like a burst of add-transaction requests."""
+    for offset in range(rows):
+        with sharding.atomic_for(user_id):
+            Transaction.objects.shard(user_id).bulk_create([Transaction(
+                # ids are pre-assigned so the benchmark never touches the real 'default' database
+                id=first_id + offset, user_id=user_id, title="bench", amount=1, date=date(2024, 4, 1),
+            )])
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Measures concurrent write throughput for 1..N shards (each run uses throwaway SQLite files)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--writers', type=int, default=8, help="Concurrent writer processes.")
+        parser.add_argument('--users', type=int, default=64)
+        parser.add_argument('--rows', type=int, default=50, help="Rows written per user.")
+        parser.add_argument('--worker', action='store_true', help="Internal: run one measurement with the current settings.")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self._worker(options)
+
+        baseline = None
+        for shards in options['shards']:
+            with tempfile.TemporaryDirectory() as shard_dir:
+                env = dict(os.environ, FINANCE_SHARDS=str(shards), FINANCE_SHARD_DIR=shard_dir)
+                run = subprocess.run(
+                    [sys.executable, sys.argv[0], 'bench_sharding', '--worker',
+                     '--writers', str(options['writers']), '--users', str(options['users']),
+                     '--rows', str(options['rows'])],
+                    env=env, capture_output=True, text=True,
+                )
+            if run.returncode:
+                raise CommandError(f"{shards}-shard run failed:\n{run.stderr}")
+            rate = float(run.stdout.strip().splitlines()[-1])
+            baseline = baseline or rate
+            self.stdout.write(f"{shards:>3} shard(s): {rate:10.0f} rows/s  x{rate / baseline:.2f}")
+
+    def _worker(self, options):
+        for alias in sharding.aliases():
+            call_command('migrate', database=alias, interactive=False, verbosity=0)
+        connections.close_all()
+
+        users, rows = options['users'], options['rows']
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['writers'], initializer=_init_writer) as pool:
+            written = sum(pool.map(
+                _write_user, range(1, users + 1), [rows] * users,
+                [user_id * rows + 1 for user_id in range(1, users + 1)],
+            ))
+        self.stdout.write(f"{written / (time.perf_counter() - start):.1f}")
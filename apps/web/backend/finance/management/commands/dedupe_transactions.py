@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finance import services, sharding
+from finance.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Back-fills Transaction.fingerprint for imported rows (those with a bank reference) and "
+        "deletes their duplicates, keeping the oldest row, in keyset-paginated chunks. Rows "
+        "without a bank reference may be manual repeat purchases: look-alikes among them are "
+        "only reported (ids with -v 2), never changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only process this user id.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help="Report duplicates without changing anything.")
+
+    def handle(self, *args, **options):
+        if options['user']:
+            targets = [Transaction.objects.for_user(options['user'])]
+        else:
+            targets = [Transaction.objects.using(alias) for alias in sharding.aliases()]
+
+        kept = removed = candidates = 0
+        for queryset in targets:
+            k, r, c = self._dedupe(queryset, options)
+            kept, removed, candidates = kept + k, removed + r, candidates + c
+
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {removed} duplicate(s); fingerprinted {kept} row(s); "
+            f"left {candidates} look-alike(s) without a bank reference for review."
+        ))
+
+    def _dedupe(self, queryset, options):
+        """Processes one database; a user's rows never span shards, so lookups stay local."""
+        pending = queryset.filter(fingerprint__isnull=True)
+        fields = ('id', 'user_id', 'date', 'amount', 'title', 'type', 'bank_reference', 'currency')
+        last_id, seen, seen_manual, kept, removed, candidates = 0, set(), set(), 0, 0, 0
+        while True:
+            chunk = list(
+                pending.filter(id__gt=last_id).order_by('id').values_list(*fields)[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+
+            rows = {row[0]: row for row in chunk}
+            fingerprints = {
+                pk: services.fingerprint(row[1], row[2], row[3], row[4], row[5], row[6], row[7])
+                for pk, row in rows.items()
+            }
+            # One indexed lookup per chunk finds rows that already own a fingerprint
+            taken = set(
+                Transaction.objects.using(queryset.db).filter(fingerprint__in=fingerprints.values())
+                .values_list('fingerprint', flat=True)
+            )
+            survivors, duplicates, look_alikes = [], [], []
+            for pk, fp in fingerprints.items():
+                if not rows[pk][6].strip():
+                    # Manual entries stay NULL and never make another row a duplicate; only flag them
+                    if fp in taken or fp in seen or fp in seen_manual:
+                        look_alikes.append(pk)
+                    seen_manual.add(fp)
+                elif fp in taken or fp in seen:
+                    duplicates.append(pk)
+                else:
+                    seen.add(fp)
+                    survivors.append(Transaction(id=pk, fingerprint=fp))
+
+            if not options['dry_run']:
+                with transaction.atomic(using=queryset.db):
+                    Transaction.objects.using(queryset.db).filter(id__in=duplicates).delete()
+                    services.apply_spend(services.spend_deltas(removed=[
+                        (rows[pk][1], rows[pk][2], rows[pk][3], rows[pk][5], rows[pk][7]) for pk in duplicates
+                    ]))
+                    Transaction.objects.using(queryset.db).bulk_update(survivors, ['fingerprint'], batch_size=500)
+            kept += len(survivors)
+            removed += len(duplicates)
+            candidates += len(look_alikes)
+            self.stdout.write(f"  {queryset.db} up to id {last_id}: {len(duplicates)} duplicate(s)")
+            if look_alikes and options['verbosity'] >= 2:
+                self.stdout.write(f"    look-alikes without a bank reference: {look_alikes}")
+        return kept, removed, candidates
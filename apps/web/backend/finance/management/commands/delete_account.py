@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import jobs, services
+
+
+class Command(BaseCommand):
+    help = (
+        "Deactivates accounts and deletes their data in bounded chunks (services.delete_account), "
+        "printing progress. With --enqueue the deletion is left to the job worker instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', type=int, nargs='+')
+        parser.add_argument('--chunk-size', type=int, help="Rows per DELETE (default ACCOUNT_DELETE_CHUNK_SIZE).")
+        parser.add_argument('--enqueue', action='store_true', help="Queue a delete_account job per user.")
+
+    def handle(self, *args, **options):
+        missing = set(options['user_ids']) - set(
+            User.objects.filter(id__in=options['user_ids']).values_list('id', flat=True))
+        if missing:
+            raise CommandError(f"No such user(s): {', '.join(map(str, sorted(missing)))}")
+
+        for user_id in options['user_ids']:
+            services.deactivate_account(user_id)
+            if options['enqueue']:
+                job = jobs.enqueue('delete_account', payload={"user_id": user_id})
+                self.stdout.write(f"User {user_id}: deactivated, job {job.id} queued")
+                continue
+
+            reported = [-1]
+
+            def progress(fraction):
+                percent = int(fraction * 10) * 10
+                if percent > reported[0]:
+                    reported[0] = percent
+                    self.stdout.write(f"User {user_id}: {percent}%")
+
+            deleted = services.delete_account(user_id, options['chunk_size'], progress)
+            summary = ', '.join(f"{name} {count}" for name, count in deleted.items() if count) or 'no finance rows'
+            self.stdout.write(self.style.SUCCESS(f"User {user_id}: deleted ({summary})"))
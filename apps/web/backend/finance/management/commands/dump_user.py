@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from finance import backup, jobs
+
+
+class Command(BaseCommand):
+    help = "Writes users' finance data to compressed NDJSON dumps (one file per user), optionally across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int)
+        parser.add_argument('--all', action='store_true', help="Dump every user.")
+        parser.add_argument('--output', help="File to write (single user only).")
+        parser.add_argument('--output-dir', default='.', help="Directory for user-<id>.ndjson.gz files.")
+        parser.add_argument('--workers', type=int, default=1, help="Dump this many users in parallel.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if options['all']:
+            user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        if not user_ids:
+            raise CommandError("Pass one or more user ids, or --all.")
+
+        if options['output']:
+            if len(user_ids) != 1:
+                raise CommandError("--output only works with a single user; use --output-dir.")
+            counts = backup.dump_user(user_ids[0], options['output'], chunk_size=options['chunk_size'])
+            self._report(user_ids[0], options['output'], counts)
+            return
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        if options['workers'] <= 1:
+            for user_id in user_ids:
+                self._report(*backup.dump_user_to_dir(user_id, options['output_dir'], options['chunk_size']))
+            return
+
+        # Children must not inherit this process's open SQLite handle
+        connections.close_all()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=jobs.init_worker) as pool:
+            futures = {
+                pool.submit(backup.dump_user_to_dir, user_id, options['output_dir'], options['chunk_size']): user_id
+                for user_id in user_ids
+            }
+            for future in as_completed(futures):
+                try:
+                    self._report(*future.result())
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"user {futures[future]}: failed ({e})")
+        if failed:
+            raise CommandError(f"{failed} of {len(user_ids)} dump(s) failed.")
+
+    def _report(self, user_id, path, counts):
+        summary = ", ".join(f"{label}={n}" for label, n in counts.items() if n)
+        self.stdout.write(f"user {user_id}: {path} ({summary or 'no rows'})")
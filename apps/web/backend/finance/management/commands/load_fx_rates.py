@@ -0,0 +1,55 @@
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finance import fx
+from finance.models import FxRate
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads FX rates (rupees per unit) from a CSV with currency,rate[,as_of] columns "
+        "or a JSON object like {\"USD\": 83.2}, replacing existing rates for those currencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--as-of', type=date.fromisoformat, help="Date for rows without one (default: today).")
+
+    def handle(self, *args, **options):
+        as_of = options['as_of'] or timezone.localdate()
+        try:
+            rows = self._read(options['path'])
+            rates = {}
+            for row in rows:
+                code = fx.normalize_currency(row['currency'])
+                rate = Decimal(str(row['rate']))
+                if not rate.is_finite() or rate <= 0:
+                    raise ValueError(f"Invalid rate for {code}: {row['rate']}")
+                rates[code] = FxRate(
+                    currency=code, rate=rate,
+                    as_of=date.fromisoformat(row['as_of']) if row.get('as_of') else as_of,
+                )
+        except (OSError, KeyError, ValueError, InvalidOperation) as e:
+            raise CommandError(f"{options['path']}: {e}")
+        rates.pop(fx.BASE_CURRENCY, None)  # always 1
+
+        FxRate.objects.bulk_create(
+            rates.values(), update_conflicts=True,
+            unique_fields=['currency'], update_fields=['rate', 'as_of', 'updated_at'],
+        )
+        fx.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(rates)} FX rate(s)."))
+
+    def _read(self, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                data = json.load(f)
+                if isinstance(data, dict):
+                    return [{'currency': code, 'rate': rate} for code, rate in data.items()]
+                return data
+            return list(csv.DictReader(f))
@@ -0,0 +1,30 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import backup
+
+
+class Command(BaseCommand):
+    help = "Restores finance dumps written by dump_user, inserting rows with batched bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+        parser.add_argument(
+            '--user', type=int,
+            help="Restore onto this user id (single dump only). Default: the dump's username, created if missing.",
+        )
+        parser.add_argument('--replace', action='store_true', help="Delete the target's existing finance data first.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['user'] and len(options['paths']) > 1:
+            raise CommandError("--user only works with a single dump.")
+
+        for path in options['paths']:
+            try:
+                user, counts = backup.load_user(
+                    path, user_id=options['user'], replace=options['replace'], batch_size=options['batch_size'])
+            except (OSError, ValueError, ObjectDoesNotExist) as e:
+                raise CommandError(f"{path}: {e}")
+            summary = ", ".join(f"{label}={n}" for label, n in counts.items() if n)
+            self.stdout.write(f"{path} -> user {user.pk} ({user.username}): {summary or 'no rows'}")
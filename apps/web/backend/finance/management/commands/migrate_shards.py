@@ -0,0 +1,19 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from finance import sharding
+
+
+class Command(BaseCommand):
+    help = "Runs migrate on 'default' and on every shard database (shards only get the sharded finance tables)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-default', action='store_true')
+
+    def handle(self, *args, **options):
+        targets = [] if options['skip_default'] else ['default']
+        targets += [alias for alias in sharding.aliases() if alias != 'default']
+        for alias in targets:
+            self.stdout.write(f"Migrating {alias}...")
+            call_command('migrate', database=alias, interactive=False, verbosity=max(0, options['verbosity'] - 1))
+        self.stdout.write(self.style.SUCCESS(f"Migrated {len(targets)} database(s)."))
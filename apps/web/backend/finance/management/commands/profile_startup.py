@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Profiles cold start of the WSGI/ASGI app or a bare management command in a fresh "
+        "interpreter: wall time plus `-X importtime` aggregated per package or module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(startup.TARGETS), action='append',
+                            help="Repeatable; defaults to all targets.")
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--by', choices=('package', 'module'), default='package')
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--check-budget', action='store_true',
+                            help="Exit non-zero if a target is over COLD_START_BUDGET_MS.")
+
+    def handle(self, *args, **options):
+        budgets = getattr(settings, 'COLD_START_BUDGET_MS', {})
+        over = []
+        for target in options['target'] or sorted(startup.TARGETS):
+            elapsed = startup.cold_start_ms(target, runs=options['runs'])
+            budget = budgets.get(target)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{target}: {elapsed:.0f} ms (best of {options['runs']})"
+                + (f", budget {budget} ms" if budget else "")
+            ))
+            if budget and elapsed > budget:
+                over.append(f"{target} {elapsed:.0f} ms > {budget} ms")
+
+            times = startup.import_times(target)
+            loaded = [name for name in startup.LAZY_MODULES if name in times]
+            if loaded:
+                self.stdout.write(self.style.WARNING(f"  imported eagerly: {', '.join(loaded)}"))
+
+            if options['by'] == 'package':
+                rows = sorted(startup.by_package(times).items(), key=lambda item: -item[1][0])
+                self.stdout.write(f"  {'self ms':>8}  {'modules':>7}  package")
+                for name, (self_us, count) in rows[:options['top']]:
+                    self.stdout.write(f"  {self_us / 1000:8.1f}  {count:7}  {name}")
+            else:
+                rows = sorted(times.items(), key=lambda item: -item[1][0])
+                self.stdout.write(f"  {'self ms':>8}  {'cum ms':>8}  module")
+                for name, (self_us, cumulative_us) in rows[:options['top']]:
+                    self.stdout.write(f"  {self_us / 1000:8.1f}  {cumulative_us / 1000:8.1f}  {name}")
+
+        if options['check_budget'] and over:
+            raise CommandError(f"Cold start over budget: {'; '.join(over)}")
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finance import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves every user's finance rows to the shard their id hashes to. "
+        "Run after changing FINANCE_SHARDS (and migrate_shards). Safe to re-run after an interruption."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            self.stdout.write("FINANCE_SHARDS is 0; nothing to rebalance.")
+            return
+
+        # 'default' is a source too: it holds everything written before sharding was switched on
+        moved_users = moved_rows = left_rows = 0
+        for source in ['default'] + sharding.aliases():
+            user_ids = set()
+            for model in sharding.sharded_models():
+                user_ids.update(model.objects.using(source).values_list('user_id', flat=True).distinct())
+
+            for user_id in sorted(user_ids):
+                target = sharding.db_for_user(user_id)
+                if target == source:
+                    continue
+                moved_users += 1
+                if options['dry_run']:
+                    self.stdout.write(f"  user {user_id}: {source} -> {target}")
+                    continue
+                rows = left = 0
+                for model in sharding.sharded_models():
+                    moved, kept = self._move(model, user_id, source, target, options['chunk_size'])
+                    rows, left = rows + moved, left + kept
+                moved_rows += rows
+                left_rows += left
+                self.stdout.write(f"  user {user_id}: {source} -> {target} ({rows} rows)")
+                if left:
+                    self.stderr.write(f"  user {user_id}: {left} row(s) conflicted on {target}; left on {source}")
+
+        verb = "Would move" if options['dry_run'] else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved_users} user(s), {moved_rows} row(s)."))
+        if left_rows:
+            self.stderr.write(f"{left_rows} row(s) could not be copied and were left in place; resolve and re-run.")
+
+    def _move(self, model, user_id, source, target, chunk_size):
+        """
+        Copy-then-delete in chunks; ids are global, so a re-run just skips rows
+        already copied. Only rows confirmed on the target are deleted: one that
+        ignore_conflicts dropped (say, a clashing unique fingerprint) stays on
+        the source. Returns (moved, left behind).
+        """
+        moved = left = last_pk = 0
+        while True:
+            batch = list(
+                model.objects.using(source).filter(user_id=user_id, pk__gt=last_pk).order_by('pk')[:chunk_size]
+            )
+            if not batch:
+                return moved, left
+            last_pk = batch[-1].pk
+            pks = [obj.pk for obj in batch]
+            with transaction.atomic(using=target):
+                model.objects.using(target).bulk_create(batch, ignore_conflicts=True)
+            copied = list(
+                model.objects.using(target).filter(pk__in=pks, user_id=user_id).values_list('pk', flat=True)
+            )
+            model.objects.using(source).filter(pk__in=copied).delete()
+            moved += len(copied)
+            left += len(pks) - len(copied)
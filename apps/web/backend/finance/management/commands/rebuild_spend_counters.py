@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from finance import services
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-day/per-month SpendCounter rows from transactions (initial fill or drift repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only rebuild this user id.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user']:
+            users = users.filter(id=options['user'])
+
+        total = 0
+        for user_id in users.iterator():
+            total += services.rebuild_spend_counters(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} spend counter(s)."))
@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from finance import jobs
+
+
+class Command(BaseCommand):
+    help = "Runs queued finance jobs in a process pool until interrupted (or until the queue is empty with --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOB_WORKERS', 2))
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds between queue polls when idle.")
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is queued or running.")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        in_flight = {}
+        pool = self._pool(workers)
+        beat_at = 0  # recover stale jobs before the first claim
+        try:
+            while True:
+                # The runner renews the lease itself (handlers may never call progress())
+                # and recovers jobs whose runner or worker stopped renewing theirs
+                if time.monotonic() >= beat_at:
+                    jobs.heartbeat(in_flight.values())
+                    self._recover()
+                    beat_at = time.monotonic() + jobs.heartbeat_interval()
+
+                for job_id in jobs.claim(workers - len(in_flight)):
+                    try:
+                        future = pool.submit(jobs.run, job_id)
+                    except BrokenProcessPool:
+                        pool = self._restart(pool, in_flight, workers)
+                        future = pool.submit(jobs.run, job_id)
+                    in_flight[future] = job_id
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                finished, _ = wait(in_flight, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                if self._collect(finished, in_flight):
+                    pool = self._restart(pool, in_flight, workers)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; running jobs will be re-queued once stale.")
+        finally:
+            pool.shutdown()
+
+    def _recover(self):
+        outcomes = jobs.requeue_stale()
+        if any(outcomes.values()):
+            self.stdout.write(
+                f"Lease expired on {sum(outcomes.values())} job(s): "
+                f"{outcomes['retry']} re-queued, {outcomes['failed']} failed")
+
+    def _pool(self, workers):
+        # Children must not inherit this process's open SQLite handle
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=workers, initializer=jobs.init_worker)
+
+    def _collect(self, finished, in_flight):
+        """Reports finished futures; True if the pool broke (a child process died)."""
+        broken = False
+        for future in finished:
+            job_id = in_flight.pop(future)
+            try:
+                outcome = future.result()
+            except BrokenProcessPool as e:
+                broken = True
+                outcome = f"crashed, {jobs.record_crash(job_id, f'Worker process died: {e}')}"
+            except Exception as e:
+                outcome = f"crashed, {jobs.record_crash(job_id, repr(e))}"
+            self.stdout.write(f"job {job_id}: {outcome}")
+        return broken
+
+    def _restart(self, pool, in_flight, workers):
+        """A broken pool fails every job it still held; record those and start a fresh one."""
+        self._collect(wait(in_flight)[0], in_flight)
+        pool.shutdown(wait=False)
+        self.stdout.write("Worker pool restarted")
+        return self._pool(workers)
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from finance import services
+from finance.models import NetWorthSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Records a NetWorthSnapshot for every user with wealth history, then compacts old "
+        "snapshots to daily/weekly/monthly resolution. Meant to run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only this user id.")
+        parser.add_argument('--no-snapshot', action='store_true', help="Only compact.")
+        parser.add_argument('--no-compact', action='store_true', help="Only take snapshots.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user']:
+            users = users.filter(id=options['user'])
+
+        taken, deleted = 0, 0
+        for user_id in users.iterator():
+            if not options['no_snapshot']:
+                # Unchanged totals are recorded too: the daily row is what charts plot
+                # for quiet accounts. Users who never had wealth items are skipped.
+                snapshots = NetWorthSnapshot.objects.for_user(user_id)
+                if snapshots.exists():
+                    services.record_net_worth(user_id, only_if_changed=False)
+                    taken += 1
+                elif services.record_net_worth(user_id):
+                    taken += 1
+            if not options['no_compact']:
+                deleted += sum(services.compact_net_worth(user_id).values())
+        self.stdout.write(self.style.SUCCESS(f"Took {taken} snapshot(s), compacted away {deleted}."))
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_alter_itrdata_options_itrdata_deductions_data_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], default='expense', max_length=10)),
+                ('category', models.CharField(default='other', max_length=100)),
+                ('date', models.DateField()),
+                ('is_recurring', models.BooleanField(default=False)),
+                ('financial_year', models.PositiveSmallIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'financial_year'], name='finance_arc_user_id_fec13b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FinancialYearSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('financial_year', models.PositiveSmallIntegerField()),
+                ('total_income', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('total_expense', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('category_totals', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fy_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Financial Year Summaries',
+                'constraints': [models.UniqueConstraint(fields=('user', 'financial_year'), name='unique_fy_summary_per_user')],
+            },
+        ),
+    ]
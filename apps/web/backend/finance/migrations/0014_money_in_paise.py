@@ -0,0 +1,84 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+import finance.fields
+
+# Every DecimalField(decimal_places=2) money column -> PaiseField (int64 paise).
+# Each column gets a temporary `<name>_paise` twin, filled with one set-based
+# UPDATE per column, then replaces the original. The old column is made
+# nullable first so the migration can also run backwards.
+#   model: {field: (old max_digits, default)}
+MONEY_FIELDS = {
+    'userprofile': {'monthlyIncome': (15, 0), 'monthlyBudget': (15, 0), 'dailyBudget': (15, 0)},
+    'transaction': {'amount': (12, None)},
+    'archivedtransaction': {'amount': (12, None)},
+    'wealthitem': {'amount': (15, None)},
+    'taxprofile': {
+        'annual_rent': (12, 0), 'annual_epf': (12, 0), 'nps_contribution': (12, 0),
+        'health_insurance_self': (12, 0), 'health_insurance_parents': (12, 0),
+        'home_loan_interest': (12, 0), 'education_loan_interest': (12, 0),
+    },
+    'financialyearsummary': {'total_income': (15, 0), 'total_expense': (15, 0)},
+    'spendcounter': {'spent': (15, 0)},
+    'budgetalert': {'spent': (15, None), 'budget': (15, None)},
+}
+
+
+def copier(model_name, to_paise):
+    def copy(apps, schema_editor):
+        model = apps.get_model('finance', model_name)
+        quote = schema_editor.quote_name
+        for name in MONEY_FIELDS[model_name]:
+            rupees = quote(model._meta.get_field(name).column)
+            paise = quote(model._meta.get_field(f'{name}_paise').column)
+            if to_paise:
+                assignment = f"{paise} = CAST(ROUND({rupees} * 100) AS BIGINT)"
+            else:
+                assignment = f"{rupees} = {paise} / 100.0"
+            schema_editor.execute(f"UPDATE {quote(model._meta.db_table)} SET {assignment}")
+    return copy
+
+
+def nullable_decimal(max_digits, default):
+    if default is None:
+        return models.DecimalField(max_digits=max_digits, decimal_places=2, null=True)
+    return models.DecimalField(max_digits=max_digits, decimal_places=2, null=True, default=0.00)
+
+
+def paise(default):
+    if default is None:
+        return finance.fields.PaiseField()
+    return finance.fields.PaiseField(default=default)
+
+
+def _each():
+    return [(model, name, spec) for model, fields in MONEY_FIELDS.items() for name, spec in fields.items()]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0013_currency_fxrate'),
+    ]
+
+    operations = [
+        migrations.AddField(model_name=model, name=f'{name}_paise', field=finance.fields.PaiseField(null=True))
+        for model, name, _ in _each()
+    ] + [
+        migrations.AlterField(model_name=model, name=name, field=nullable_decimal(*spec))
+        for model, name, spec in _each()
+    ] + [
+        # The model_name hint lets finance.routers run this on shards for sharded tables only
+        migrations.RunPython(copier(model, True), copier(model, False), hints={'model_name': model})
+        for model in MONEY_FIELDS
+    ] + [
+        migrations.RemoveField(model_name=model, name=name)
+        for model, name, _ in _each()
+    ] + [
+        migrations.RenameField(model_name=model, old_name=f'{name}_paise', new_name=name)
+        for model, name, _ in _each()
+    ] + [
+        migrations.AlterField(model_name=model, name=name, field=paise(spec[1]))
+        for model, name, spec in _each()
+    ]
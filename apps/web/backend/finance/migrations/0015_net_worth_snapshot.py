@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:58
+
+import django.db.models.deletion
+import django.utils.timezone
+import finance.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0014_money_in_paise'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NetWorthSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolution', models.CharField(choices=[('raw', 'Raw'), ('day', 'Day'), ('week', 'Week'), ('month', 'Month')], default='raw', max_length=5)),
+                ('assets', finance.fields.PaiseField(default=0)),
+                ('liabilities', finance.fields.PaiseField(default=0)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='net_worth_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'taken_at'], name='finance_net_user_id_199900_idx')],
+            },
+        ),
+    ]
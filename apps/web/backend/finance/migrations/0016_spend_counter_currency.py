@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0015_net_worth_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='spendcounter',
+            name='unique_spend_counter',
+        ),
+        migrations.AddField(
+            model_name='spendcounter',
+            name='currency',
+            field=models.CharField(default='INR', max_length=3),
+        ),
+        migrations.AddConstraint(
+            model_name='spendcounter',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'period_start', 'currency'), name='unique_spend_counter_currency'),
+        ),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone 
 
+from .fields import PaiseField  # money: int64 paise in the DB, Decimal rupees in Python
+from .sharding import ShardedManager
+
 class UserProfile(models.Model):
     """
     Unified Profile Model.
@@ -11,9 +14,9 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     
     # Financial Goals (Matching React keys)
-    monthlyIncome = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
-    monthlyBudget = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
-    dailyBudget = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    monthlyIncome = PaiseField(default=0)
+    monthlyBudget = PaiseField(default=0)
+    dailyBudget = PaiseField(default=0)
     
     # Meta Data
     is_business = models.BooleanField(default=False)
@@ -25,13 +28,27 @@ class UserProfile(models.Model):
 class Transaction(models.Model):
     TRANSACTION_TYPES = (('income', 'Income'), ('expense', 'Expense'))
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions', db_constraint=False)
+    objects = ShardedManager()  # .for_user() / .shard() pick the user's database
     title = models.CharField(max_length=255)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = PaiseField()
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES, default='expense')
     category = models.CharField(max_length=100, default='other')
     date = models.DateField(default=timezone.now)
     is_recurring = models.BooleanField(default=False)
+    currency = models.CharField(max_length=3, default='INR')  # ISO 4217, converted via FxRate
+
+    # Import de-duplication: sha256 of user, date, type, amount, normalized title
+    # and bank reference (see services.fingerprint). Manual entries leave it NULL.
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
+    bank_reference = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        # History filters: date ranges and category pickers, always scoped to one user
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['user', 'category']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.amount}"
@@ -43,9 +60,11 @@ class WealthItem(models.Model):
         ('liability', 'Liability'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wealth_items")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wealth_items", db_constraint=False)
+    objects = ShardedManager()
     title = models.CharField(max_length=100)  # e.g., "HDFC Bank", "Car Loan"
-    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    amount = PaiseField()
+    currency = models.CharField(max_length=3, default='INR')  # e.g. a USD brokerage account
     category = models.CharField(max_length=50, default="General") # e.g., "Cash", "Investment"
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -55,19 +74,20 @@ class WealthItem(models.Model):
     
 class TaxProfile(models.Model):
     # Link to the built-in Django User
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tax_profile')
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tax_profile', db_constraint=False)
+    objects = ShardedManager()
     
     # Checkbox field
     is_business = models.BooleanField(default=False)
     
     # Numeric Input fields (from your 'fields' constant in React)
-    annual_rent = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    annual_epf = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    nps_contribution = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    health_insurance_self = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    health_insurance_parents = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    home_loan_interest = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    education_loan_interest = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    annual_rent = PaiseField(default=0)
+    annual_epf = PaiseField(default=0)
+    nps_contribution = PaiseField(default=0)
+    health_insurance_self = PaiseField(default=0)
+    health_insurance_parents = PaiseField(default=0)
+    home_loan_interest = PaiseField(default=0)
+    education_loan_interest = PaiseField(default=0)
     
     # Metadata
     updated_at = models.DateTimeField(auto_now=True)
@@ -76,7 +96,8 @@ class TaxProfile(models.Model):
         return f"Tax Profile for {self.user.username}"
     
 class ITRData(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="itr_profile")
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="itr_profile", db_constraint=False)
+    objects = ShardedManager()
     
     # Stores: salary, houseProperty, businessIncome, capitalGains, otherIncome, interestIncome
     income_data = models.JSONField(default=dict, blank=True)
@@ -98,4 +119,181 @@ class ITRData(models.Model):
 
     def __str__(self):
         return f"ITR Profile: {self.user.username} ({self.tax_regime.upper()})"
-   
\ No newline at end of file
+   
+class ArchivedTransaction(models.Model):
+    """
+    Cold storage for transactions from closed financial years.
+    Rows keep their original id so links from the client stay valid.
+    Filled by the `archive_financial_years` management command.
+    """
+    TRANSACTION_TYPES = Transaction.TRANSACTION_TYPES
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions', db_constraint=False)
+    objects = ShardedManager()
+    title = models.CharField(max_length=255)
+    amount = PaiseField()
+    type = models.CharField(max_length=10, choices=TRANSACTION_TYPES, default='expense')
+    category = models.CharField(max_length=100, default='other')
+    date = models.DateField()
+    is_recurring = models.BooleanField(default=False)
+    currency = models.CharField(max_length=3, default='INR')
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, db_index=True, editable=False)
+    bank_reference = models.CharField(max_length=100, blank=True, default='')
+
+    # Start year of the Indian FY (April-March), e.g. 2023 for FY 2023-24
+    financial_year = models.PositiveSmallIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'financial_year'])]
+
+    def __str__(self):
+        return f"{self.title} - {self.amount} (FY {self.financial_year})"
+
+class FinancialYearSummary(models.Model):
+    """Precomputed totals left behind for every archived financial year."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='fy_summaries', db_constraint=False)
+    objects = ShardedManager()
+    financial_year = models.PositiveSmallIntegerField()
+
+    total_income = PaiseField(default=0)
+    total_expense = PaiseField(default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    # Stores: {"income": {"salary": 1200000.0}, "expense": {"food": 84000.0, ...}}
+    category_totals = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Financial Year Summaries"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'financial_year'], name='unique_fy_summary_per_user'),
+        ]
+
+    def __str__(self):
+        return f"FY {self.financial_year}-{self.financial_year + 1}: {self.user.username}"
+
+class Job(models.Model):
+    """
+    A unit of heavy background work (imports, recategorization, rebuilds).
+    Enqueued by the API, executed by the `run_jobs` worker command.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=50)  # name registered in finance/jobs.py
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.FloatField(default=0.0)  # 0.0 - 1.0, reported by the handler
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # pushed back between retries
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # doubles as the worker heartbeat
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.kind} ({self.status})"
+
+class SpendCounter(models.Model):
+    """
+    Running expense total per user per day / month and currency, kept in
+    step with every expense write (see services.apply_spend) so budget
+    checks read a row per currency and convert at today's rate.
+    """
+    PERIOD_CHOICES = [('day', 'Day'), ('month', 'Month')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spend_counters', db_constraint=False)
+    objects = ShardedManager()
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()  # the day itself, or the 1st of the month
+    currency = models.CharField(max_length=3, default='INR')  # `spent` is in this currency
+    spent = PaiseField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'period', 'period_start', 'currency'], name='unique_spend_counter_currency'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.period} {self.period_start}: {self.currency} {self.spent}"
+
+class BudgetAlert(models.Model):
+    """Recorded when an expense pushes a day/month over a BUDGET_ALERT_THRESHOLDS mark."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts', db_constraint=False)
+    objects = ShardedManager()
+    period = models.CharField(max_length=5, choices=SpendCounter.PERIOD_CHOICES)
+    period_start = models.DateField()
+    threshold = models.FloatField()  # e.g. 0.8 = 80% of budget
+    spent = PaiseField()
+    budget = PaiseField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at'])]
+
+    def __str__(self):
+        return f"{self.user.username}: {int(self.threshold * 100)}% of {self.period} budget"
+
+class NetWorthSnapshot(models.Model):
+    """
+    Total assets and liabilities (converted to INR) at one moment. Written
+    when wealth items change and by `snapshot_net_worth`, which also thins
+    old rows to one per day, then week, then month (services.compact_net_worth).
+    """
+    RESOLUTION_CHOICES = [('raw', 'Raw'), ('day', 'Day'), ('week', 'Week'), ('month', 'Month')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='net_worth_snapshots', db_constraint=False)
+    objects = ShardedManager()
+    taken_at = models.DateTimeField(default=timezone.now)
+    resolution = models.CharField(max_length=5, choices=RESOLUTION_CHOICES, default='raw')
+    assets = PaiseField(default=0)
+    liabilities = PaiseField(default=0)
+
+    class Meta:
+        # Range queries and compaction both walk one user's rows in time order
+        indexes = [models.Index(fields=['user', 'taken_at'])]
+
+    def __str__(self):
+        return f"{self.user.username} {self.taken_at:%Y-%m-%d %H:%M}: {self.assets - self.liabilities}"
+
+class ShardSequence(models.Model):
+    """Global id counter for sharded tables; lives in 'default' (see sharding.allocate_ids)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+class FxRate(models.Model):
+    """
+    Local FX table: how many rupees one unit of `currency` is worth.
+    Loaded with the `load_fx_rates` command and read through finance/fx.py,
+    which keeps the whole table in memory.
+    """
+    currency = models.CharField(max_length=3, unique=True)  # ISO 4217, e.g. USD
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    as_of = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "FX Rate"
+
+    def __str__(self):
+        return f"1 {self.currency} = {self.rate} INR ({self.as_of})"
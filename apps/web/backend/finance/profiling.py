@@ -0,0 +1,247 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BasicAuthentication
+
+# --- REQUEST PROFILING ---
+# ProfilingMiddleware runs cProfile around the rest of the request (view and
+# rendering) when a staff user sends the PROFILE_HEADER header, or for a
+# random PROFILE_SAMPLE_RATE share of requests. Staff may be logged in with
+# a session or send HTTP Basic credentials, as the API accepts both. Every
+# SQL statement is timed through execute_wrapper on each database (shards
+# included). The result is stored under PROFILE_DIR as <id>.json (request,
+# SQL timings), <id>.prof (pstats) and <id>.folded (sampled stacks for
+# flamegraphs); only the newest PROFILE_KEEP profiles are kept, so the
+# directory works as a ring buffer.
+# Browse them with the staff-only `profiles/` endpoints.
+
+_ID = re.compile(r'^[0-9]{19}-[0-9a-f]{8}$')
+# One profiled request per process at a time: a profiler per thread is fine on
+# 3.11, but from 3.12 on a second active cProfile raises ValueError
+_active = threading.Lock()
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+class QueryTimer:
+    """execute_wrapper that records (alias, sql, ms) for every statement."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            t0 = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = (time.perf_counter() - t0) * 1000
+                self.count += 1
+                self.total_ms += elapsed
+                if len(self.queries) < self.limit:
+                    self.queries.append({"db": alias, "sql": sql, "ms": round(elapsed, 3), "many": many})
+        return record
+
+
+class ProfilingMiddleware:
+    """Goes after AuthenticationMiddleware, which sets request.user for the header check."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def wants_profile(self, request):
+        header = 'HTTP_' + getattr(settings, 'PROFILE_HEADER', 'X-Profile').upper().replace('-', '_')
+        if request.META.get(header):
+            user = self.staff_user(request)
+            if user is not None:
+                request.profile_user = user
+            return user is not None
+        rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
+
+    def staff_user(self, request):
+        """The session user, else the HTTP Basic one (DRF checks those only inside the view)."""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return user
+        try:
+            authenticated = BasicAuthentication().authenticate(request)
+        except exceptions.AuthenticationFailed:
+            return None
+        if authenticated is not None and authenticated[0].is_staff:
+            return authenticated[0]
+        return None
+
+    def __call__(self, request):
+        if request.path.startswith('/api/finance/profiles/') or not self.wants_profile(request):
+            return self.get_response(request)
+        if not _active.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _active.release()
+
+    def profile(self, request):
+        timer = QueryTimer(getattr(settings, 'PROFILE_MAX_QUERIES', 1000))
+        profiler = cProfile.Profile()
+        interval = getattr(settings, 'PROFILE_STACK_INTERVAL', 0.001)
+        started_at = timezone.now()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer.wrapper(alias)))
+            t0 = time.perf_counter()
+            with StackSampler(sys._getframe(), interval) as sampler:
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            elapsed = (time.perf_counter() - t0) * 1000
+
+        profiled_user = getattr(request, 'profile_user', None) or getattr(request, 'user', None)
+        profile_id = save(profiler, sampler.folded(), {
+            "method": request.method,
+            "path": request.path,
+            "query": request.META.get('QUERY_STRING', ''),
+            "status": response.status_code,
+            "user": profiled_user.pk if profiled_user and profiled_user.is_authenticated else None,
+            "startedAt": started_at.isoformat(),
+            "durationMs": round(elapsed, 3),
+            "stackSamples": sum(sampler.samples.values()),
+            "stackIntervalMs": interval * 1000,
+            "sql": {
+                "count": timer.count,
+                "totalMs": round(timer.total_ms, 3),
+                "queries": timer.queries,
+                "truncated": timer.count > len(timer.queries),
+            },
+        })
+        response['X-Profile-Id'] = profile_id
+        return response
+
+
+# --- STORAGE ---
+
+SUFFIXES = ('.json', '.prof', '.folded')
+
+
+def save(profiler, folded, meta):
+    """Writes one profile and drops the oldest beyond PROFILE_KEEP. Returns its id."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Nanosecond timestamp first so ids sort by age across processes
+    profile_id = f"{time.time_ns():019d}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+    (directory / f"{profile_id}.folded").write_text(folded, encoding='utf-8')
+    # The .json is written last and atomically: a profile is listed once it is complete
+    tmp = directory / f".{profile_id}.json.tmp"
+    tmp.write_text(json.dumps({"id": profile_id, **meta}), encoding='utf-8')
+    os.replace(tmp, directory / f"{profile_id}.json")
+    prune(directory)
+    return profile_id
+
+
+def prune(directory):
+    keep = getattr(settings, 'PROFILE_KEEP', 200)
+    ids = sorted(path.stem for path in directory.glob('*.json'))
+    for profile_id in ids[:-keep] if len(ids) > keep else ():
+        for suffix in SUFFIXES:
+            try:
+                (directory / f"{profile_id}{suffix}").unlink()
+            except FileNotFoundError:
+                pass  # pruned by another process
+
+
+def list_profiles():
+    """Newest first, without the per-query detail."""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            meta = json.loads(path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            continue  # pruned while listing
+        meta['sql'] = {key: value for key, value in meta['sql'].items() if key != 'queries'}
+        profiles.append(meta)
+    return profiles
+
+
+def paths(profile_id):
+    """{suffix: path} for a valid, complete profile id; raises FileNotFoundError."""
+    if not _ID.match(profile_id):
+        raise FileNotFoundError(profile_id)
+    found = {suffix: profile_dir() / f"{profile_id}{suffix}" for suffix in SUFFIXES}
+    if not all(path.exists() for path in found.values()):
+        raise FileNotFoundError(profile_id)
+    return found
+
+
+# --- FLAMEGRAPH OUTPUT ---
+# cProfile only keeps caller -> callee edges, and Django's middleware chain
+# re-enters the same function at every level, so whole stacks can't be
+# rebuilt from it. A sampler thread records the profiled thread's real stack
+# every PROFILE_STACK_INTERVAL seconds instead, in the folded format
+# ("frame;frame;frame samples" per line) read by flamegraph.pl, speedscope
+# and inferno.
+
+class StackSampler:
+    """
+    Samples the calling thread's Python stack below `root` (a frame on it)
+    while the `with` block runs. A busy thread only lets go of the GIL every
+    sys.getswitchinterval() (5 ms by default), so that is lowered to the
+    sampling interval for the duration; profiles run one at a time per process.
+    """
+
+    def __init__(self, root, interval):
+        self.root = root
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def __enter__(self):
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _run(self):
+        own = (StackSampler.__enter__.__code__, StackSampler.__exit__.__code__)
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack, code = [], None
+            while frame is not None and frame is not self.root:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}:{code.co_name}")
+                frame = frame.f_back
+            # Outside the profiled call, or caught entering/leaving the `with`
+            if frame is self.root and stack and code not in own:
+                self.samples[';'.join(reversed(stack)).replace(' ', '_')] += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
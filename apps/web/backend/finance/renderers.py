@@ -0,0 +1,39 @@
+import json
+from decimal import Decimal
+
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj):
+    """Handles the few types the fast encoder doesn't know natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):  # lazy translation strings in DRF errors
+        return str(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer on hot list endpoints.
+    Dates, datetimes and floats are encoded natively in C by orjson,
+    so views can hand over raw values_list() rows without formatting them.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is not None:
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, default=_default, separators=(',', ':')).encode('utf-8')
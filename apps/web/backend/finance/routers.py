@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+
+from . import sharding
+
+
+class UserShardRouter:
+    """
+    Routes the per-user finance models (sharding.SHARDED_MODELS) to the
+    user's shard whenever Django hands us an instance to go by: saves and
+    deletes of fetched rows, and related managers such as user.transactions.
+    Querysets without an instance should use Model.objects.for_user().
+    """
+
+    def _user_shard(self, model, **hints):
+        if not sharding.enabled():
+            return None
+        if not sharding.is_sharded(model):
+            # Otherwise Django would follow the hinting instance onto its shard,
+            # e.g. reading transaction.user from a database without auth_user
+            return 'default'
+        instance = hints.get('instance')
+        if isinstance(instance, User):
+            return sharding.db_for_user(instance.pk)
+        user_id = getattr(instance, 'user_id', None)
+        if user_id is not None:
+            return sharding.db_for_user(user_id)
+        return None
+
+    db_for_read = _user_shard
+    db_for_write = _user_shard
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # FKs from shard rows to auth.User cross databases by design
+        if sharding.enabled() and (sharding.is_sharded(type(obj1)) or sharding.is_sharded(type(obj2))):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not sharding.enabled() or db == 'default':
+            # 'default' keeps every table; its sharded tables stay empty once
+            # sharding is on, which lets user deletion cascade without errors
+            return None
+        return app_label == 'finance' and model_name in sharding.SHARDED_MODELS
@@ -1,26 +1,36 @@
 from rest_framework import serializers
+from .fields import PaiseField
 from .models import Transaction, WealthItem, UserProfile, TaxProfile
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class MoneyField(serializers.DecimalField):
+    """Rupees with two decimal places for PaiseField columns (the model field handles paise)."""
+    def __init__(self, **kwargs):
+        super().__init__(max_digits=None, decimal_places=2, **kwargs)
+
+class MoneyModelSerializer(serializers.ModelSerializer):
+    # Without this DRF maps PaiseField to an IntegerField (it subclasses BigIntegerField)
+    serializer_field_mapping = {**serializers.ModelSerializer.serializer_field_mapping, PaiseField: MoneyField}
+
+class UserProfileSerializer(MoneyModelSerializer):
     class Meta:
         model = UserProfile
         # Using camelCase to match your React state
         fields = ['monthlyIncome', 'monthlyBudget', 'dailyBudget', 'is_business']
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(MoneyModelSerializer):
     class Meta:
         model = Transaction
         # Added 'is_recurring' so your frontend knows which are subscriptions
         fields = ['id', 'title', 'amount', 'type', 'category', 'date', 'is_recurring']
         
-class WealthItemSerializer(serializers.ModelSerializer):
+class WealthItemSerializer(MoneyModelSerializer):
     class Meta:
         model = WealthItem
         # Changed 'name' to 'title' and 'institution' to 'category' 
         # to match your models.py
         fields = ['id', 'title', 'amount', 'type', 'category']
         
-class TaxProfileSerializer(serializers.ModelSerializer):
+class TaxProfileSerializer(MoneyModelSerializer):
     class Meta:
         model = TaxProfile
         # Keep snake_case here; the methods below handle the conversion
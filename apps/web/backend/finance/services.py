@@ -0,0 +1,1069 @@
+import hashlib
+import json
+import re
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from time import sleep
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import (
+    BigIntegerField, CharField, Count, ExpressionWrapper, F, FloatField, Min, Q, Sum, Value,
+)
+from django.db.models.functions import Cast
+from django.db.models.lookups import IContains
+from django.http import QueryDict
+from django.utils import timezone
+
+from . import fx, sharding
+from .fields import to_paise, to_rupees
+from .lazy import numpy
+from .models import (
+    ArchivedTransaction, BudgetAlert, FinancialYearSummary, NetWorthSnapshot, SpendCounter, Transaction,
+    UserProfile, WealthItem,
+)
+
+# --- FAST SERIALIZATION ---
+# List endpoints project only the columns React needs and let the database
+# do the per-row conversions (Decimal -> float, date -> ISO string), so no
+# model instances or Python-side converters run per row.
+
+TRANSACTION_COLUMNS = ('id', 'title', 'amount', 'currency', 'type', 'category', 'date', 'is_recurring')
+WEALTH_COLUMNS = ('id', 'title', 'amount', 'currency', 'type', 'category')
+
+
+def rupees(column):
+    """A PaiseField column as float rupees, computed in SQL."""
+    return ExpressionWrapper(Cast(column, FloatField()) / Value(100.0), output_field=FloatField())
+
+
+def paise_array(queryset, column='amount'):
+    """
+    A PaiseField column as a NumPy int64 array of raw paise: no Decimal
+    objects are built and sums over it stay exact.
+    """
+    np = numpy()
+
+    raw = queryset.annotate(_paise=Cast(column, BigIntegerField())).values_list('_paise', flat=True)
+    return np.fromiter(raw, dtype=np.int64)
+
+
+def search_q(search):
+    """Title or amount contains `search` (amounts compared as rupee text, e.g. '40.5')."""
+    return Q(title__icontains=search) | Q(IContains(Cast(rupees('amount'), CharField()), search))
+
+
+def project(queryset, columns):
+    """
+    Returns plain row tuples for `columns`, in order.
+    'amount' is cast to a float in SQL (Recharts needs numbers, not strings)
+    and 'date' comes back as its stored ISO text.
+    """
+    casts = {
+        'amount': ('amount_float', rupees('amount')),
+        'date': ('date_iso', Cast('date', CharField())),
+    }
+    fields = []
+    for column in columns:
+        if column in casts:
+            alias, expression = casts[column]
+            queryset = queryset.annotate(**{alias: expression})
+            column = alias
+        fields.append(column)
+    return queryset.values_list(*fields)
+
+
+def as_records(columns, rows):
+    """Row-oriented payload: [{"id": 1, "title": ...}, ...]"""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def as_columns(columns, rows):
+    """
+    Column-oriented payload: {"id": [1, 2], "title": [...], ...}
+    Parallel arrays are smaller on the wire and can be fed to charts directly.
+    """
+    rows = list(rows)
+    if not rows:
+        return {c: [] for c in columns}
+    return {c: list(values) for c, values in zip(columns, zip(*rows))}
+
+
+def serialize_rows(columns, rows, layout='records'):
+    if layout == 'columns':
+        return as_columns(columns, rows)
+    return as_records(columns, rows)
+
+
+# --- MULTI-CURRENCY ---
+# Amounts are stored in their own currency and converted on read with the
+# cached FX table (finance/fx.py), a whole column at a time.
+
+def with_converted(columns, rows, currency):
+    """Appends a 'converted' column (amount in `currency`, None without a rate) to projected rows."""
+    rows = list(rows)
+    amount, code = columns.index('amount'), columns.index('currency')
+    converted, _ = fx.convert([r[amount] for r in rows], [r[code] for r in rows], currency)
+    values = [None if v != v else round(v, 2) for v in converted.tolist()]  # v != v is NaN
+    return columns + ('converted',), [row + (value,) for row, value in zip(rows, values)]
+
+
+def net_worth(user_id, currency=fx.BASE_CURRENCY):
+    """
+    Assets, liabilities and net worth in `currency`. SQL sums each
+    (type, currency) pair first, so conversion touches a handful of values
+    however many items the user holds. Items in currencies without a rate
+    are left out and listed under missingRates.
+    """
+    grouped = list(
+        WealthItem.objects.for_user(user_id)
+        .values_list('type', 'currency').annotate(total=Sum('amount')).order_by()
+    )
+    converted, missing = fx.convert(
+        [total for _, _, total in grouped], [code for _, code, _ in grouped], currency)
+    totals = {'asset': 0.0, 'liability': 0.0}
+    for (kind, _, _), value in zip(grouped, converted.tolist()):
+        if value == value:
+            totals[kind] += value
+    return {
+        "currency": currency,
+        "assets": round(totals['asset'], 2),
+        "liabilities": round(totals['liability'], 2),
+        "netWorth": round(totals['asset'] - totals['liability'], 2),
+        "missingRates": missing,
+    }
+
+
+# --- NET WORTH HISTORY ---
+# NetWorthSnapshot rows record assets and liabilities in INR over time.
+# Old rows are thinned to the last one per day, then week, then month, so a
+# user's history stays a few hundred rows however many years it covers, and
+# range queries downsample whatever is left to a bounded number of points.
+
+RESOLUTIONS = ('raw', 'day', 'week', 'month')
+NET_WORTH_COLUMNS = ('date', 'assets', 'liabilities', 'netWorth')
+
+
+def record_net_worth(user_id, only_if_changed=True):
+    """
+    Writes a raw snapshot of the user's current totals. With only_if_changed,
+    nothing is written when they match the latest snapshot (e.g. a rename).
+    Returns the new snapshot or None.
+    """
+    totals = net_worth(user_id)
+    assets, liabilities = to_rupees(totals['assets']), to_rupees(totals['liabilities'])
+    snapshots = NetWorthSnapshot.objects.for_user(user_id)
+    if only_if_changed:
+        latest = snapshots.order_by('-taken_at', '-id').values_list('assets', 'liabilities').first()
+        if latest == (assets, liabilities) or (latest is None and not assets and not liabilities):
+            return None
+    return NetWorthSnapshot.objects.shard(user_id).create(
+        user_id=user_id, assets=assets, liabilities=liabilities)
+
+
+def bucket_start(moment, resolution):
+    """The local day, Monday or 1st of the month that `moment` falls in."""
+    day = as_date(moment)
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def compact_net_worth(user_id, now=None, batch_size=500):
+    """
+    Keeps the last snapshot per day for raw rows older than
+    NET_WORTH_COMPACT_AFTER_DAYS['raw'], per week for day rows older than
+    ['day'] and per month for week rows older than ['week']. Cutoffs are
+    rounded down to a bucket boundary so only complete buckets are merged.
+    Returns {resolution: rows_deleted}.
+    """
+    ages = getattr(settings, 'NET_WORTH_COMPACT_AFTER_DAYS', {'raw': 7, 'day': 90, 'week': 730})
+    now = now or timezone.now()
+    snapshots = NetWorthSnapshot.objects.for_user(user_id)
+    deleted = {}
+    with sharding.atomic_for(user_id):
+        for level, (finer, coarser) in enumerate(zip(RESOLUTIONS, RESOLUTIONS[1:])):
+            cutoff = timezone.make_aware(datetime.combine(
+                bucket_start(now - timedelta(days=ages[finer]), coarser), time.min))
+            rows = (
+                snapshots.filter(resolution__in=RESOLUTIONS[:level + 2], taken_at__lt=cutoff)
+                .order_by('taken_at', 'id').values_list('id', 'taken_at')
+            )
+            keep, drop = {}, []
+            for pk, taken_at in rows.iterator():
+                bucket = bucket_start(taken_at, coarser)
+                if bucket in keep:
+                    drop.append(keep[bucket])
+                keep[bucket] = pk
+            kept = list(keep.values())
+            for i in range(0, len(drop), batch_size):
+                snapshots.filter(id__in=drop[i:i + batch_size]).delete()
+            for i in range(0, len(kept), batch_size):
+                snapshots.filter(id__in=kept[i:i + batch_size]).exclude(resolution=coarser).update(resolution=coarser)
+            deleted[finer] = len(drop)
+    return deleted
+
+
+def net_worth_series(user_id, start, end, points=200, currency=fx.BASE_CURRENCY):
+    """
+    Net worth between two aware datetimes as at most `points` rows of
+    (date, assets, liabilities, netWorth). The window is cut into `points`
+    equal slices and the last snapshot in each is kept (net worth is a
+    level, so the last value is the one to plot). The latest snapshot before
+    `start` opens the series, dated `start`, so the line starts at the edge.
+    """
+    np = numpy()
+
+    snapshots = NetWorthSnapshot.objects.for_user(user_id).annotate(
+        assets_float=rupees('assets'), liabilities_float=rupees('liabilities'))
+    rows = list(
+        snapshots.filter(taken_at__gte=start, taken_at__lte=end)
+        .order_by('taken_at', 'id').values_list('taken_at', 'assets_float', 'liabilities_float')
+    )
+    opening = (
+        snapshots.filter(taken_at__lt=start).order_by('-taken_at', '-id')
+        .values_list('assets_float', 'liabilities_float').first()
+    )
+    if opening:
+        rows.insert(0, (start, *opening))
+    if not rows:
+        return []
+
+    seconds = np.array([row[0].timestamp() for row in rows])
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    if len(rows) > points:
+        span = max(end.timestamp() - start.timestamp(), 1.0)
+        slices = np.minimum(((seconds - start.timestamp()) * points // span).astype(np.int64), points - 1)
+        last = np.flatnonzero(np.append(slices[1:] != slices[:-1], True))
+        rows, values = [rows[i] for i in last], values[last]
+
+    rate, _ = fx.convert([1.0], [fx.BASE_CURRENCY], currency)
+    values = np.round(values * rate[0], 2)
+    net = np.round(values[:, 0] - values[:, 1], 2)
+    return [
+        (timezone.localtime(row[0]).isoformat(), assets, liabilities, worth)
+        for row, (assets, liabilities), worth in zip(rows, values.tolist(), net.tolist())
+    ]
+
+
+# --- HISTORY FILTERS ---
+# Query params use the names of the History page's filter state
+# (FilterModal.jsx), so the client can send its filters as they are.
+# List params accept repeats or commas: ?categories=food,rent
+
+HISTORY_ORDERINGS = {
+    'date-desc': ('-date', '-id'),
+    'date-asc': ('date', 'id'),
+    'amount-desc': ('-amount', '-id'),
+    'amount-asc': ('amount', 'id'),
+}
+
+
+# Every param history_filters reads; sortBy is accepted but never narrows rows
+HISTORY_FILTER_PARAMS = (
+    'search', 'startDate', 'endDate', 'minAmount', 'maxAmount', 'isRecurring', 'categories', 'types', 'sortBy',
+)
+
+
+def _list_param(params, name):
+    values = []
+    for raw in params.getlist(name):
+        values.extend(value.strip().lower() for value in raw.split(',') if value.strip())
+    return values
+
+
+def _decimal_param(params, name):
+    try:
+        value = Decimal(params[name])
+    except InvalidOperation:
+        value = None
+    if value is None or not value.is_finite():
+        raise ValueError(f"{name} must be a number")
+    return value
+
+
+def history_filters(params):
+    """
+    Parses History query params into (q, categories, types, ordering).
+    `q` holds every filter except categories/types, which stay separate so
+    history_facets can count each facet without its own selection applied.
+    Raises ValueError for malformed values.
+    """
+    q = Q()
+    search = params.get('search')
+    if search:
+        q &= search_q(search)
+
+    for name, lookup in (('startDate', 'date__gte'), ('endDate', 'date__lte')):
+        if params.get(name):
+            try:
+                q &= Q(**{lookup: date.fromisoformat(params[name])})
+            except ValueError:
+                raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+    if params.get('minAmount'):
+        q &= Q(amount__gte=_decimal_param(params, 'minAmount'))
+    if params.get('maxAmount'):
+        q &= Q(amount__lte=_decimal_param(params, 'maxAmount'))
+
+    recurring = params.get('isRecurring', '').lower()
+    if recurring in ('true', '1'):
+        q &= Q(is_recurring=True)
+    elif recurring in ('false', '0'):
+        q &= Q(is_recurring=False)
+    elif recurring:
+        raise ValueError("isRecurring must be true or false")
+
+    sort = params.get('sortBy') or 'date-desc'
+    if sort not in HISTORY_ORDERINGS:
+        raise ValueError(f"sortBy must be one of {', '.join(HISTORY_ORDERINGS)}")
+
+    return q, _list_param(params, 'categories'), _list_param(params, 'types'), HISTORY_ORDERINGS[sort]
+
+
+def history_facets(queryset, categories=(), types=()):
+    """
+    Facet counts for the filter UI from a single GROUP BY (category, type)
+    over `queryset` (filtered by everything except categories/types).
+    Category counts respect the selected types and vice versa, so a chip
+    shows how many results picking it would add.
+    """
+    by_category, by_type = defaultdict(int), defaultdict(int)
+    total = 0
+    for category, kind, count in queryset.values_list('category', 'type').annotate(n=Count('id')).order_by():
+        category_match = not categories or category in categories
+        type_match = not types or kind in types
+        if type_match:
+            by_category[category] += count
+        if category_match:
+            by_type[kind] += count
+        if category_match and type_match:
+            total += count
+    return {"categories": dict(by_category), "types": dict(by_type), "total": total}
+
+
+# --- FINANCIAL YEAR ARCHIVAL ---
+# Indian FY runs 1 April - 31 March and is identified by its start year,
+# matching `fiscalYear` in packages/shared/services/taxService.js.
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'title', 'amount', 'currency', 'type', 'category', 'date', 'is_recurring',
+    'fingerprint', 'bank_reference',
+)
+
+
+def financial_year_of(day):
+    return day.year if day.month >= 4 else day.year - 1
+
+
+def financial_year_bounds(fy):
+    """Inclusive (start, end) dates of financial year `fy`."""
+    return date(fy, 4, 1), date(fy + 1, 3, 31)
+
+
+def current_financial_year():
+    return financial_year_of(timezone.localdate())
+
+
+def archive_financial_year(user_id, fy, chunk_size=2000):
+    """
+    Moves one user's transactions for a closed FY into ArchivedTransaction,
+    `chunk_size` rows per database transaction so SQLite is never locked
+    for long, then rebuilds the FY summary. Safe to re-run.
+    Returns the number of rows moved.
+    """
+    start, end = financial_year_bounds(fy)
+    hot = Transaction.objects.for_user(user_id).filter(date__range=(start, end))
+    moved = 0
+
+    while True:
+        with sharding.atomic_for(user_id):
+            rows = list(hot.order_by('id').values(*ARCHIVE_FIELDS)[:chunk_size])
+            if not rows:
+                break
+            ArchivedTransaction.objects.shard(user_id).bulk_create(
+                [ArchivedTransaction(financial_year=fy, **row) for row in rows]
+            )
+            hot.filter(id__in=[row['id'] for row in rows]).delete()
+            moved += len(rows)
+
+    rebuild_financial_year_summary(user_id, fy)
+    return moved
+
+
+def rebuild_financial_year_summary(user_id, fy):
+    """
+    Recomputes a summary from the archive with one GROUP BY query. Totals
+    are in INR at the rates of the time it runs; rows in currencies
+    without a rate count towards transaction_count only.
+    """
+    grouped = list(
+        ArchivedTransaction.objects.for_user(user_id)
+        .filter(financial_year=fy)
+        .values_list('type', 'category', 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    converted, _ = fx.convert([row[3] for row in grouped], [row[2] for row in grouped])
+
+    totals = {'income': 0.0, 'expense': 0.0}
+    category_totals = defaultdict(lambda: defaultdict(float))
+    count = 0
+    for (kind, category, _, _, rows), value in zip(grouped, converted.tolist()):
+        count += rows
+        if value == value:
+            totals[kind] = totals.get(kind, 0.0) + value
+            category_totals[kind][category] += value
+    category_totals = {
+        kind: {category: round(value, 2) for category, value in categories.items()}
+        for kind, categories in category_totals.items()
+    }
+
+    if not count:
+        FinancialYearSummary.objects.for_user(user_id).filter(financial_year=fy).delete()
+        return None
+
+    summary, _ = FinancialYearSummary.objects.shard(user_id).update_or_create(
+        user_id=user_id,
+        financial_year=fy,
+        defaults={
+            'total_income': to_rupees(round(totals['income'], 2)),
+            'total_expense': to_rupees(round(totals['expense'], 2)),
+            'transaction_count': count,
+            'category_totals': category_totals,
+        },
+    )
+    return summary
+
+
+def closed_financial_years(user_id=None, before=None):
+    """
+    Yields (user_id, fy) pairs that still have rows in the hot table and
+    belong to a financial year before `before` (default: the current FY).
+    """
+    before = before or current_financial_year()
+    cutoff, _ = financial_year_bounds(before)
+    if user_id is not None:
+        querysets = [Transaction.objects.for_user(user_id)]
+    else:
+        querysets = [Transaction.objects.using(alias) for alias in sharding.aliases()]
+
+    for queryset in querysets:
+        oldest_per_user = (
+            queryset.filter(date__lt=cutoff)
+            .values_list('user_id').annotate(oldest=Min('date')).order_by('user_id')
+        )
+        for uid, oldest in oldest_per_user:
+            for fy in range(financial_year_of(oldest), before):
+                yield uid, fy
+
+
+# --- IMPORT FINGERPRINTS ---
+# A fingerprint identifies "the same bank line" across repeated or overlapping
+# statement imports. Transaction.fingerprint is unique, so duplicates are
+# detected with one index lookup per row instead of scanning history.
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_title(title):
+    """'UPI/SWIGGY-Order  #123' -> 'upi swiggy order 123'"""
+    return _NON_ALNUM.sub(' ', str(title).lower()).strip()
+
+
+def fingerprint(user_id, day, amount, title, type='expense', bank_reference='', currency=fx.BASE_CURRENCY,
+                occurrence=0):
+    """
+    `occurrence` numbers identical lines within one statement (two ₹50
+    coffees on the same day), so each stays a row of its own. The currency
+    keeps $50 and ₹50 apart. Both are hashed only when they differ from the
+    default (first occurrence, INR), which keeps older fingerprints valid.
+    """
+    amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    day = day.isoformat() if hasattr(day, 'isoformat') else str(day)
+    parts = [str(user_id), day, type.lower(), str(amount), normalize_title(title), bank_reference.strip()]
+    if currency != fx.BASE_CURRENCY:
+        parts.append(currency)
+    if occurrence:
+        parts.append(str(occurrence))
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def next_fingerprint(seen, *args):
+    """fingerprint(*args) for the next repeat of that line, counted in the `seen` Counter."""
+    base = fingerprint(*args)
+    occurrence = seen[base]
+    seen[base] += 1
+    return fingerprint(*args, occurrence=occurrence) if occurrence else base
+
+
+def import_transactions(user_id, rows, on_duplicate='skip', seen=None):
+    """
+    Bulk-inserts statement rows, skipping lines that were already imported
+    (also checks the FY archive). With on_duplicate='merge' the category and
+    is_recurring of existing hot rows are refreshed from the import instead.
+    A statement imported in several calls passes the same `seen` Counter to
+    each, so repeats are numbered across the whole statement.
+    Returns {"created": n, "duplicates": m}.
+    """
+    seen = Counter() if seen is None else seen
+    incoming = {}
+    for row in rows:
+        day = row.get('date') or timezone.localdate()
+        txn = Transaction(
+            user_id=user_id,
+            title=row.get('title', 'No Title'),
+            amount=row['amount'],
+            type=row.get('type', 'expense').lower(),
+            category=row.get('category', 'other').lower(),
+            date=day,
+            is_recurring=row.get('is_recurring', False),
+            currency=fx.normalize_currency(row.get('currency')),
+            bank_reference=row.get('bank_reference', ''),
+        )
+        txn.fingerprint = next_fingerprint(
+            seen, user_id, day, txn.amount, txn.title, txn.type, txn.bank_reference, txn.currency)
+        incoming[txn.fingerprint] = txn
+
+    hot = set(
+        Transaction.objects.for_user(user_id)
+        .filter(fingerprint__in=incoming).values_list('fingerprint', flat=True)
+    )
+    archived = set(
+        ArchivedTransaction.objects.for_user(user_id)
+        .filter(fingerprint__in=incoming).values_list('fingerprint', flat=True)
+    )
+    fresh = [txn for fp, txn in incoming.items() if fp not in hot and fp not in archived]
+
+    # ignore_conflicts covers a concurrent import racing us between the lookup and the insert
+    with sharding.atomic_for(user_id):
+        Transaction.objects.shard(user_id).bulk_create(fresh, batch_size=500, ignore_conflicts=True)
+        apply_spend(spend_deltas(added=[(t.user_id, t.date, t.amount, t.type, t.currency) for t in fresh]))
+
+    if on_duplicate == 'merge':
+        # Archived matches have no hot row to update; upserting them would insert copies
+        stale = [txn for fp, txn in incoming.items() if fp in hot]
+        Transaction.objects.shard(user_id).bulk_create(
+            stale, batch_size=500, update_conflicts=True,
+            unique_fields=['fingerprint'], update_fields=['category', 'is_recurring'],
+        )
+
+    return {"created": len(fresh), "duplicates": len(rows) - len(fresh)}
+
+
+# --- BUDGET COUNTERS ---
+# SpendCounter rows hold each user's running expense total per day and per
+# month. Every code path that writes, edits or deletes expenses passes its
+# rows through spend_deltas() + apply_spend(), so "how much is left today"
+# is a single-row read instead of a SUM over the day's transactions.
+# Counters are kept per currency in that currency, like every other amount,
+# and converted to INR on read: a rate change never leaves them out of step
+# with the rows, and budgets (in INR) compare against today's rates.
+
+BUDGET_FIELDS = {'day': 'dailyBudget', 'month': 'monthlyBudget'}
+
+
+def as_date(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def period_starts(day):
+    return (('day', day), ('month', day.replace(day=1)))
+
+
+def spend_deltas(added=(), removed=()):
+    """
+    Folds (user_id, date, amount, type, currency) rows into counter deltas:
+    {(user_id, period, period_start, currency): Decimal}. Income rows are ignored.
+    """
+    deltas = defaultdict(Decimal)
+    for rows, sign in ((added, 1), (removed, -1)):
+        for user_id, day, amount, type, currency in rows:
+            if type != 'expense':
+                continue
+            for period, start in period_starts(as_date(day)):
+                deltas[(user_id, period, start, currency)] += sign * Decimal(str(amount))
+    return deltas
+
+
+def apply_spend(deltas):
+    """
+    Applies counter deltas atomically with F() expressions and returns the
+    BudgetAlerts raised by increases in the current day/month.
+    """
+    alerts = []
+    for (user_id, period, start, currency), delta in deltas.items():
+        if not delta:
+            continue
+        with sharding.atomic_for(user_id):
+            counter = SpendCounter.objects.for_user(user_id).filter(
+                period=period, period_start=start, currency=currency)
+            if not counter.update(spent=F('spent') + to_paise(delta)):
+                _, created = SpendCounter.objects.shard(user_id).get_or_create(
+                    user_id=user_id, period=period, period_start=start, currency=currency,
+                    defaults={'spent': delta})
+                if not created:  # lost a race with a concurrent first write
+                    counter.update(spent=F('spent') + to_paise(delta))
+            if delta > 0:
+                alerts.extend(_threshold_alerts(user_id, period, start, delta, currency))
+    return alerts
+
+
+def spent_in_inr(counters):
+    """Sums (currency, spent) counter rows in INR; currencies without a rate are left out."""
+    counters = list(counters)
+    converted, _ = fx.convert([spent for _, spent in counters], [code for code, _ in counters])
+    return Decimal(str(round(float(converted[converted == converted].sum()), 2)))
+
+
+def _threshold_alerts(user_id, period, start, delta, currency):
+    today = timezone.localdate()
+    if start != dict(period_starts(today))[period]:
+        return []  # back-dated spend doesn't alert on a period that is over
+    budget = UserProfile.objects.filter(user_id=user_id).values_list(BUDGET_FIELDS[period], flat=True).first()
+    if not budget or budget <= 0:
+        return []
+
+    spent = spent_in_inr(SpendCounter.objects.for_user(user_id).filter(
+        period=period, period_start=start).values_list('currency', 'spent'))
+    before = spent - spent_in_inr([(currency, delta)])
+    crossed = [
+        t for t in getattr(settings, 'BUDGET_ALERT_THRESHOLDS', (0.8, 1.0))
+        if before < budget * Decimal(str(t)) <= spent
+    ]
+    return [
+        BudgetAlert.objects.shard(user_id).create(
+            user_id=user_id, period=period, period_start=start, threshold=t, spent=spent, budget=budget)
+        for t in crossed
+    ]
+
+
+def alert_payload(alert):
+    return {
+        "period": alert.period,
+        "threshold": alert.threshold,
+        "spent": float(alert.spent),
+        "budget": float(alert.budget),
+        "created_at": alert.created_at,
+    }
+
+
+def budget_status(user_id):
+    """Today's and this month's spend vs budget: one indexed read per table."""
+    today = timezone.localdate()
+    starts = dict(period_starts(today))
+    by_period = defaultdict(list)
+    for period, currency, amount in (
+        SpendCounter.objects.for_user(user_id)
+        .filter(Q(period='day', period_start=starts['day']) | Q(period='month', period_start=starts['month']))
+        .values_list('period', 'currency', 'spent')
+    ):
+        by_period[period].append((currency, amount))
+    spent = {period: spent_in_inr(rows) for period, rows in by_period.items()}
+    budgets = UserProfile.objects.filter(user_id=user_id).values(*BUDGET_FIELDS.values()).first() or {}
+
+    status = {}
+    for period, field in BUDGET_FIELDS.items():
+        budget = float(budgets.get(field) or 0)
+        used = float(spent.get(period, 0))
+        status[period] = {
+            "periodStart": starts[period],
+            "budget": budget,
+            "spent": used,
+            "remaining": budget - used,
+            "percentUsed": round(used / budget * 100, 1) if budget else None,
+        }
+    return status
+
+
+def rebuild_spend_counters(user_id):
+    """Recomputes one user's counters from scratch (hot and archived rows)."""
+    daily = defaultdict(Decimal)
+    for model in (Transaction, ArchivedTransaction):
+        grouped = (
+            model.objects.for_user(user_id).filter(type='expense')
+            .values_list('date', 'currency').annotate(total=Sum('amount')).order_by()
+        )
+        for day, currency, total in grouped:
+            daily[(day, currency)] += total
+
+    counters = defaultdict(Decimal)
+    for (day, currency), total in daily.items():
+        for period, start in period_starts(day):
+            counters[(period, start, currency)] += total
+
+    with sharding.atomic_for(user_id):
+        SpendCounter.objects.for_user(user_id).delete()
+        SpendCounter.objects.shard(user_id).bulk_create([
+            SpendCounter(user_id=user_id, period=period, period_start=start, currency=currency, spent=total)
+            for (period, start, currency), total in counters.items()
+        ], batch_size=500)
+    return len(counters)
+
+
+# --- BULK EDITS ---
+# The History page edits or deletes many rows at once: the selection is a
+# list of ids or the page's own filter state (see history_filters), and the
+# change is one UPDATE or DELETE scoped to the user. Spend counters are kept
+# right from a single GROUP BY (date, type, currency) over the selection taken first:
+# every row in a group moves the same way, so the groups give the deltas
+# without loading any rows.
+
+BULK_PATCH_FIELDS = ('title', 'amount', 'type', 'category', 'date', 'currency', 'is_recurring')
+SPEND_FIELDS = {'amount', 'type', 'date', 'currency'}
+
+
+def bulk_patch(data):
+    """Validates a field patch from a request into Transaction values. Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("patch must be an object")
+    data = dict(data)
+    if 'description' in data:  # the React modal's name for title
+        data['title'] = data.pop('description')
+    unknown = set(data) - set(BULK_PATCH_FIELDS)
+    if unknown:
+        raise ValueError(f"Can't bulk edit: {', '.join(sorted(unknown))}")
+    if not data:
+        raise ValueError("patch is empty")
+
+    patch = {}
+    for name, value in data.items():
+        # JSON null or numbers must not be stored as the text 'None' / '5'
+        if name in ('title', 'type', 'category', 'date', 'currency') and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+        if name == 'title':
+            patch[name] = value
+        elif name == 'amount':
+            patch[name] = to_rupees(value)
+        elif name == 'type':
+            patch[name] = value.lower()
+            if patch[name] not in ('income', 'expense'):
+                raise ValueError("type must be income or expense")
+        elif name == 'category':
+            patch[name] = value.lower()
+        elif name == 'date':
+            try:
+                patch[name] = date.fromisoformat(value)
+            except ValueError:
+                raise ValueError("date must be a YYYY-MM-DD date")
+        elif name == 'currency':
+            patch[name] = fx.normalize_currency(value)
+        elif name == 'is_recurring':
+            if not isinstance(value, bool):
+                raise ValueError("is_recurring must be true or false")
+            patch[name] = value
+    return patch
+
+
+def bulk_selection(user_id, ids=None, filters=None, everything=False):
+    """
+    The user's transactions picked by `ids`, by History filter params (a
+    dict; list values for categories/types) or, with `everything`, all of
+    them. Exactly one is required, and a filter must narrow the rows: a
+    typo'd key must not turn into "every transaction". Raises ValueError.
+    """
+    if sum((ids is not None, filters is not None, bool(everything))) != 1:
+        raise ValueError('Send one of ids, filter or "all": true')
+    queryset = Transaction.objects.for_user(user_id)
+    if everything:
+        return queryset
+    if ids is not None:
+        limit = getattr(settings, 'TRANSACTION_BULK_MAX_IDS', 5000)
+        if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise ValueError("ids must be a list of integers")
+        if len(ids) > limit:
+            raise ValueError(f"At most {limit} ids per request; use a filter for more")
+        return queryset.filter(pk__in=ids)
+
+    if not isinstance(filters, dict):
+        raise ValueError("filter must be an object of History filters")
+    unknown = set(filters) - set(HISTORY_FILTER_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    params = QueryDict(mutable=True)
+    for name, value in filters.items():
+        params.setlist(name, [str(v) for v in value] if isinstance(value, list) else [str(value)])
+    q, categories, types, _ = history_filters(params)
+    if not (q or categories or types):
+        raise ValueError('filter selects every transaction; send "all": true to mean that')
+    queryset = queryset.filter(q)
+    if categories:
+        queryset = queryset.filter(category__in=categories)
+    if types:
+        queryset = queryset.filter(type__in=types)
+    return queryset
+
+
+def _spend_groups(queryset):
+    return list(
+        queryset.values_list('date', 'type', 'currency').annotate(total=Sum('amount'), n=Count('id')).order_by()
+    )
+
+
+def bulk_update_transactions(user_id, queryset, patch):
+    """Applies a bulk_patch() to the selection. Returns (rows updated, BudgetAlerts raised)."""
+    with sharding.atomic_for(user_id):
+        groups = _spend_groups(queryset) if SPEND_FIELDS & set(patch) else []
+        updated = queryset.update(**patch)
+        removed, added = [], []
+        for day, type, currency, total, count in groups:
+            removed.append((user_id, day, total, type, currency))
+            added.append((
+                user_id,
+                patch.get('date', day),
+                patch['amount'] * count if 'amount' in patch else total,
+                patch.get('type', type),
+                patch.get('currency', currency),
+            ))
+        alerts = apply_spend(spend_deltas(added=added, removed=removed))
+    return updated, alerts
+
+
+def bulk_delete_transactions(user_id, queryset):
+    """Deletes the selection; returns the number of rows deleted."""
+    with sharding.atomic_for(user_id):
+        groups = _spend_groups(queryset.filter(type='expense'))
+        deleted, _ = queryset.delete()
+        apply_spend(spend_deltas(removed=[
+            (user_id, day, total, type, currency) for day, type, currency, total, _ in groups
+        ]))
+    return deleted
+
+
+# --- FORECASTING ---
+# A month of cash flow is a recurring part (is_recurring rows and salary
+# income, whatever its flag; a declared UserProfile.monthlyIncome replaces
+# recurring income, so the paycheck is never counted twice) plus a variable part.
+# Projections repeat the recurring part and treat each future month's
+# variable part as a randomly drawn past month, so seasonality and one-off
+# spikes carry over without fitting a distribution. The Monte Carlo draws
+# every path x month in one NumPy batch. Results are cached under a digest
+# of their inputs: any change to the user's data is a new key.
+
+FORECAST_SERIES = ('recurringIncome', 'recurringExpense', 'variableIncome', 'variableExpense')
+
+
+def month_start(day, offset=0):
+    """1st of the month `offset` months after the one `day` is in."""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def monthly_series(user_id, months=None):
+    """
+    The last `months` complete months (FORECAST_HISTORY_MONTHS by default)
+    of live and archived transactions in INR, as (month starts, array of
+    shape (4, n)) with rows in FORECAST_SERIES order. One GROUP BY per table;
+    months before the user's first transaction in the window are left out.
+    """
+    np = numpy()
+
+    months = months or getattr(settings, 'FORECAST_HISTORY_MONTHS', 24)
+    this_month = month_start(timezone.localdate())
+    first = month_start(this_month, -months)
+    grouped = []
+    for model in (Transaction, ArchivedTransaction):
+        # Grouped by day, not TruncMonth: SQLite runs date truncation as a
+        # Python callback per row, which costs more than bucketing the days here
+        grouped += (
+            model.objects.for_user(user_id).filter(date__gte=first, date__lt=this_month)
+            .annotate(salary=Q(type='income', category='salary'))
+            .values_list('date', 'type', 'is_recurring', 'salary', 'currency').annotate(total=Sum('amount'))
+            .order_by()
+        )
+    if not grouped:
+        return [], np.zeros((len(FORECAST_SERIES), 0))
+
+    converted, _ = fx.convert([row[5] for row in grouped], [row[4] for row in grouped])
+    series = np.zeros((len(FORECAST_SERIES), months))
+    for (day, kind, recurring, salary, _, _), value in zip(grouped, converted.tolist()):
+        if value == value:  # NaN: no FX rate
+            month = (day.year - first.year) * 12 + day.month - first.month
+            series[(0 if recurring or salary else 2) + (kind == 'expense'), month] += value
+    used = min((row[0].year - first.year) * 12 + row[0].month - first.month for row in grouped)
+    return [month_start(first, i) for i in range(used, months)], series[:, used:]
+
+
+def forecast_inputs(user_id):
+    """Everything a forecast depends on, JSON-safe; its digest is the cache key."""
+    months, series = monthly_series(user_id)
+    declared = UserProfile.objects.filter(user_id=user_id).values_list('monthlyIncome', flat=True).first()
+    return {
+        "from": month_start(timezone.localdate()).isoformat(),
+        "history": [month.isoformat() for month in months],
+        "series": series.round(2).tolist(),
+        "monthlyIncome": float(declared or 0),
+        "netWorth": net_worth(user_id)['netWorth'],
+    }
+
+
+def simulate_savings(fixed, variable, months, paths, rng):
+    """
+    Cumulative savings per path and month, shape (paths, months): `fixed`
+    every month plus a month drawn at random from the `variable` history.
+    """
+    np = numpy()
+
+    draws = rng.integers(0, len(variable), size=(paths, months))
+    return np.cumsum(fixed + variable[draws], axis=1)
+
+
+def run_forecast(inputs, months, goal=None, saved=None, paths=None, seed=0):
+    """Projection, percentile bands and goal odds for `forecast_inputs()` output."""
+    np = numpy()
+
+    paths = paths or getattr(settings, 'FORECAST_PATHS', 5000)
+    series = np.array(inputs['series'], dtype=np.float64).reshape(len(FORECAST_SERIES), -1)
+    if not series.shape[1]:
+        series = np.zeros((len(FORECAST_SERIES), 1))
+    recurring_income, recurring_expense, variable_income, variable_expense = series
+
+    # Recurring amounts follow the last 3 months, so a raise or a new EMI shows up quickly
+    fixed_income = inputs['monthlyIncome'] or recurring_income[-3:].mean()
+    fixed_expense = recurring_expense[-3:].mean()
+    variable = variable_income - variable_expense
+    income = fixed_income + variable_income.mean()
+    expense = fixed_expense + variable_expense.mean()
+
+    start = inputs['netWorth']
+    expected = start + (income - expense) * np.arange(1, months + 1)
+    savings = simulate_savings(fixed_income - fixed_expense, variable, months, paths, np.random.default_rng(seed))
+    bands = start + np.percentile(savings, (10, 50, 90), axis=0)
+
+    def money(values):
+        return np.round(values, 2).tolist()
+
+    first = date.fromisoformat(inputs['from'])
+    result = {
+        "months": [month_start(first, i).strftime('%Y-%m') for i in range(months)],
+        "basis": {
+            "historyMonths": len(inputs['history']),
+            "recurringIncome": round(float(fixed_income), 2),
+            "recurringExpense": round(float(fixed_expense), 2),
+            "variableIncome": round(float(variable_income.mean()), 2),
+            "variableExpense": round(float(variable_expense.mean()), 2),
+        },
+        "projection": {
+            "income": round(float(income), 2),
+            "expense": round(float(expense), 2),
+            "net": round(float(income - expense), 2),
+            "netWorth": money(expected),
+            "p10": money(bands[0]),
+            "p50": money(bands[1]),
+            "p90": money(bands[2]),
+        },
+        "goal": None,
+        "paths": paths,
+    }
+
+    if goal is not None:
+        saved = start if saved is None else saved
+        reached = np.logical_or.accumulate(saved + savings >= goal, axis=1)
+        by_month = reached.mean(axis=0)
+        # Month each path first gets there; paths that never do sort last
+        first_month = np.where(reached[:, -1], reached.argmax(axis=1) + 1, months + 1)
+        median = int(np.median(first_month))
+        result["goal"] = {
+            "target": goal,
+            "saved": round(saved, 2),
+            "probability": round(float(by_month[-1]), 4),
+            "probabilityByMonth": np.round(by_month, 4).tolist(),
+            "medianMonths": median if median <= months else None,
+        }
+    return result
+
+
+def forecast(user_id, months=12, goal=None, saved=None):
+    """
+    Cached run_forecast() for one user. Returns the result plus "cached".
+    Users with identical inputs share one entry, and the seed comes from the
+    digest, so the same inputs always give the same answer.
+    """
+    inputs = forecast_inputs(user_id)
+    params = {"months": months, "goal": goal, "saved": saved, "paths": getattr(settings, 'FORECAST_PATHS', 5000)}
+    encoded = json.dumps([inputs, params], sort_keys=True, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(encoded).hexdigest()
+    key = f"forecast:{digest}"
+
+    result = cache.get(key)
+    if result is not None:
+        return {**result, "cached": True}
+    result = run_forecast(inputs, seed=int(digest[:16], 16), **params)
+    cache.set(key, result, getattr(settings, 'FORECAST_CACHE_SECONDS', 24 * 3600))
+    return {**result, "cached": False}
+
+
+# --- ACCOUNT DELETION ---
+# User.delete() goes through Django's collector, which loads every related
+# row into memory and removes them all in one transaction, holding SQLite's
+# write lock for as long as that takes. Deleting an account is deferred
+# instead: deactivate_account() disables the login at once, and the
+# `delete_account` job (or `manage.py delete_account`) runs delete_account(),
+# which removes the per-user finance tables with raw
+# DELETE ... WHERE id IN (SELECT id ... LIMIT n) statements, one committed
+# chunk at a time, so memory is bounded by the chunk size and other writers
+# get the lock between chunks. The User row goes last.
+
+
+def deactivate_account(user_id):
+    """Blocks the login right away; returns False if there is no such user."""
+    updated = User.objects.filter(pk=user_id).update(is_active=False)
+    return bool(updated)
+
+
+def delete_account(user_id, chunk_size=None, progress=None):
+    """
+    Deletes a deactivated user and everything they own in chunks of
+    ACCOUNT_DELETE_CHUNK_SIZE rows, calling `progress(fraction)` after each.
+    Safe to re-run after a crash: finished chunks stay deleted.
+    Returns {model_name: rows deleted}. Raises ValueError for an active account.
+    """
+    if User.objects.filter(pk=user_id, is_active=True).exists():
+        raise ValueError(f"User {user_id} is still active; deactivate the account first")
+    chunk_size = chunk_size or getattr(settings, 'ACCOUNT_DELETE_CHUNK_SIZE', 5000)
+    pause = getattr(settings, 'ACCOUNT_DELETE_PAUSE_SECONDS', 0)
+    alias = sharding.db_for_user(user_id)
+    models = sharding.sharded_models()
+
+    # The counts are index-only scans and give the progress denominator
+    remaining = {model: model.objects.for_user(user_id).count() for model in models}
+    total, done = sum(remaining.values()), 0
+    deleted = {}
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    for model in models:
+        deleted[model._meta.model_name] = 0
+        if not remaining[model]:
+            continue
+        table, pk = quote(model._meta.db_table), quote(model._meta.pk.column)
+        column = quote(model._meta.get_field('user').column)
+        sql = (
+            f"DELETE FROM {table} WHERE {pk} IN "
+            f"(SELECT {pk} FROM {table} WHERE {column} = %s LIMIT %s)"
+        )
+        while True:
+            # Autocommit: each chunk is its own short transaction
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [user_id, chunk_size])
+                removed = cursor.rowcount
+            deleted[model._meta.model_name] += removed
+            done += removed
+            if progress and total:
+                progress(min(done / total, 0.99))
+            if removed < chunk_size:
+                break
+            if pause:
+                sleep(pause)
+
+    # Only the profile, jobs and auth rows are left, which the collector handles quickly
+    User.objects.filter(pk=user_id).delete()
+    return deleted
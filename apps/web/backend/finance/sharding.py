@@ -0,0 +1,168 @@
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Max
+
+# --- USER SHARDING ---
+# With settings.FINANCE_SHARDS = N > 0 every per-user finance table lives in
+# N databases (shard_0 .. shard_N-1) and a user's rows all sit on the shard
+# picked by a jump consistent hash of their id. Users, profiles and jobs stay
+# in 'default'. With FINANCE_SHARDS = 0 everything resolves to 'default'.
+#
+# Django can't route a query by the value it filters on, so code that touches
+# these models goes through `Model.objects.for_user(user_id)` / `.shard(user_id)`;
+# saves and deletes of fetched instances are routed by finance.routers.
+
+SHARDED_MODELS = {
+    'transaction', 'archivedtransaction', 'wealthitem', 'taxprofile', 'itrdata',
+    'financialyearsummary', 'spendcounter', 'budgetalert', 'networthsnapshot',
+}
+
+
+def enabled():
+    return getattr(settings, 'FINANCE_SHARDS', 0) > 0
+
+
+def aliases():
+    if not enabled():
+        return ['default']
+    return [f'shard_{i}' for i in range(settings.FINANCE_SHARDS)]
+
+
+def sharded_models():
+    from django.apps import apps
+    return [apps.get_model('finance', name) for name in sorted(SHARDED_MODELS)]
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'finance' and model._meta.model_name in SHARDED_MODELS
+
+
+def jump_hash(key, buckets):
+    """
+    Jump consistent hash (Lamping & Veach, 2014): growing from N to N+1
+    shards moves only ~1/(N+1) of users, which keeps rebalancing cheap.
+    """
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def db_for_user(user_id):
+    if not enabled():
+        return 'default'
+    # Sequential ids are mixed first so neighbouring users spread out
+    key = int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), 'big')
+    return f'shard_{jump_hash(key, settings.FINANCE_SHARDS)}'
+
+
+def atomic_for(user_id):
+    return transaction.atomic(using=db_for_user(user_id))
+
+
+def find(model, **lookup):
+    """
+    Fetches one row by a lookup that doesn't name the user (e.g. pk from a URL).
+    Ids are globally unique (see allocate_ids), so at most one shard matches.
+    """
+    for alias in aliases():
+        obj = model.objects.using(alias).filter(**lookup).first()
+        if obj is not None:
+            return obj
+    raise model.DoesNotExist(f"{model.__name__} matching {lookup} does not exist")
+
+
+# --- GLOBAL IDS ---
+# Per-shard autoincrement would hand out the same id on every shard, which
+# breaks pk-only URLs and moving users between shards. While sharding is on,
+# ids come from one counter in 'default', reserved FINANCE_ID_BLOCK at a time
+# per process (hi/lo), so the extra round trip is paid once per block.
+
+_ids_lock = threading.Lock()
+_ids = {'next': 0, 'end': 0}
+
+
+def _reserve_block(size):
+    from .models import ShardSequence
+
+    with transaction.atomic(using='default'):
+        sequence = ShardSequence.objects.using('default').filter(name='finance')
+        if not sequence.update(next_value=F('next_value') + size):
+            ShardSequence.objects.using('default').get_or_create(
+                name='finance', defaults={'next_value': _highest_existing_id() + 1})
+            sequence.update(next_value=F('next_value') + size)
+        end = sequence.values_list('next_value', flat=True).get()
+    return end - size, end
+
+
+def _highest_existing_id():
+    # Rows written before sharding was switched on (possibly rebalanced already) keep their ids
+    highest = 0
+    for alias in ['default'] + aliases():
+        for model in sharded_models():
+            highest = max(highest, model.objects.using(alias).aggregate(m=Max('pk'))['m'] or 0)
+    return highest
+
+
+def allocate_ids(count):
+    block = getattr(settings, 'FINANCE_ID_BLOCK', 1000)
+    ids = []
+    with _ids_lock:
+        while len(ids) < count:
+            if _ids['next'] >= _ids['end']:
+                _ids['next'], _ids['end'] = _reserve_block(max(block, count - len(ids)))
+            take = min(count - len(ids), _ids['end'] - _ids['next'])
+            ids.extend(range(_ids['next'], _ids['next'] + take))
+            _ids['next'] += take
+    return ids
+
+
+def assign_ids(objs):
+    if not enabled():
+        return
+    missing = [obj for obj in objs if obj.pk is None]
+    for obj, pk in zip(missing, allocate_ids(len(missing))):
+        obj.pk = pk
+
+
+# --- MANAGER ---
+
+class ShardedQuerySet(models.QuerySet):
+    def shard(self, user_id):
+        """The queryset bound to the user's shard (use for create / get_or_create)."""
+        return self.using(db_for_user(user_id))
+
+    def for_user(self, user_id):
+        return self.shard(user_id).filter(user_id=user_id)
+
+    def create(self, **kwargs):
+        # Writes that forgot .shard() still land on the right database
+        if self._db is None and enabled():
+            user = kwargs.get('user')
+            user_id = kwargs.get('user_id', getattr(user, 'pk', None))
+            if user_id is not None:
+                return self.shard(user_id).create(**kwargs)
+        return super().create(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        if self._db is None and enabled():
+            # One insert per shard; 'default' never holds sharded rows. Not atomic
+            # across shards: callers writing several users wrap each in atomic_for.
+            groups = defaultdict(list)
+            for obj in objs:
+                groups[db_for_user(obj.user_id)].append(obj)
+            for alias, group in groups.items():
+                self.using(alias).bulk_create(group, *args, **kwargs)
+            return objs
+        assign_ids(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+ShardedManager = models.Manager.from_queryset(ShardedQuerySet)
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import FxRate, UserProfile
+from . import fx, sharding
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -10,4 +11,23 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+@receiver(pre_save)
+def assign_sharded_id(sender, instance, raw=False, **kwargs):
+    # Shard rows take their ids from the global counter (bulk_create does the same)
+    if sharding.enabled() and instance.pk is None and sharding.is_sharded(sender):
+        instance.pk = sharding.allocate_ids(1)[0]
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_rows(sender, instance, **kwargs):
+    # The collector only cascades inside the User's own database
+    if not sharding.enabled():
+        return
+    for model in sharding.sharded_models():
+        model.objects.for_user(instance.pk).delete()
+
+@receiver([post_save, post_delete], sender=FxRate)
+def refresh_fx_rates(sender, **kwargs):
+    # Other processes pick up the change within FX_CACHE_SECONDS
+    fx.invalidate()
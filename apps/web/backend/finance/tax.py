@@ -0,0 +1,212 @@
+from .fields import to_rupees
+from .lazy import numpy
+from .models import ITRData, TaxProfile
+
+# --- TAX SCENARIOS ---
+# Server-side port of packages/shared/services/taxService.js, evaluated on
+# whole batches of what-if scenarios at once: every input is a NumPy column
+# with one entry per scenario, and each slab computation is a handful of
+# array operations. Keep the figures below in step with the JS service.
+# HRA (annualRent) is accepted but, as in the JS service, not computed.
+
+CESS = 0.04
+
+REGIMES = {
+    # lower bound of each slab -> rate; income up to rebate_limit pays nothing (87A)
+    'new': {
+        'slabs': ((400000, 0.05), (800000, 0.10), (1200000, 0.15), (1600000, 0.20), (2000000, 0.25), (2400000, 0.30)),
+        'rebate_limit': 1200000,
+        'marginal_relief': True,  # tax just above the limit never exceeds the income above it
+        'standard_deduction': 75000,
+    },
+    'old': {
+        'slabs': ((250000, 0.05), (500000, 0.20), (1000000, 0.30)),
+        'rebate_limit': 500000,
+        'marginal_relief': False,
+        'standard_deduction': 50000,
+    },
+}
+
+# Deduction caps (old regime only). Keys are the sections the optimizer can
+# fill, each with the scenario input that counts towards it.
+SECTIONS = {
+    '80C': ('section80C', 150000),  # plus annualEPF
+    '80CCD_1B': ('npsContribution', 50000),
+    '80D_self': ('healthInsuranceSelf', 25000),
+    '80D_parents': ('healthInsuranceParents', 50000),
+}
+TTA_CAP = 10000  # 80TTA: savings interest
+HOUSE_PROPERTY_LOSS_CAP = 200000
+PRESUMPTIVE_LIMIT = 30000000  # 44ADA: half of business receipts up to 3 crore
+
+# Scenario inputs: ITRData.income_data keys for income, TaxProfile (camelCase) for deductions
+INCOME_KEYS = ('salary', 'houseProperty', 'businessIncome', 'otherIncome', 'interestIncome')
+DEDUCTION_KEYS = (
+    'annualEPF', 'section80C', 'npsContribution', 'healthInsuranceSelf', 'healthInsuranceParents',
+    'homeLoanInterest', 'educationLoanInterest', 'annualRent',
+)
+INPUT_KEYS = INCOME_KEYS + DEDUCTION_KEYS
+
+RESULT_COLUMNS = ('taxableOld', 'taxableNew', 'taxOld', 'taxNew', 'regime', 'saving')
+OPTIMIZED_COLUMNS = (
+    'regime', 'tax', 'saving', 'extraDeduction',
+    *(key for key, _ in SECTIONS.values()),
+)
+
+
+def _amount(value):
+    if value in (None, ''):
+        return 0.0
+    amount = float(to_rupees(value))
+    if amount < 0:
+        raise ValueError(f"Amounts can't be negative: {value!r}")
+    return amount
+
+
+def base_scenario(user_id):
+    """The user's saved TaxProfile and ITR income as one scenario dict."""
+    scenario = dict.fromkeys(INPUT_KEYS, 0.0)
+    scenario['isBusiness'] = False
+    profile = TaxProfile.objects.for_user(user_id).first()
+    if profile:
+        scenario.update({
+            'isBusiness': profile.is_business,
+            'annualEPF': float(profile.annual_epf),
+            'npsContribution': float(profile.nps_contribution),
+            'healthInsuranceSelf': float(profile.health_insurance_self),
+            'healthInsuranceParents': float(profile.health_insurance_parents),
+            'homeLoanInterest': float(profile.home_loan_interest),
+            'educationLoanInterest': float(profile.education_loan_interest),
+            'annualRent': float(profile.annual_rent),
+        })
+    income = ITRData.objects.for_user(user_id).values_list('income_data', flat=True).first() or {}
+    for key in INCOME_KEYS:
+        try:
+            scenario[key] = _amount(income.get(key))
+        except ValueError:
+            pass  # free-form form state; a bad value counts as nothing
+    return scenario
+
+
+def to_arrays(scenarios):
+    """List of scenario dicts -> {input: float64 array} plus an 'isBusiness' bool array. Raises ValueError."""
+    np = numpy()
+
+    for scenario in scenarios:
+        unknown = set(scenario) - set(INPUT_KEYS) - {'isBusiness'}
+        if unknown:
+            raise ValueError(f"Unknown scenario fields: {', '.join(sorted(unknown))}")
+    arrays = {key: np.array([_amount(s.get(key)) for s in scenarios], dtype=np.float64) for key in INPUT_KEYS}
+    arrays['isBusiness'] = np.array([bool(s.get('isBusiness')) for s in scenarios])
+    return arrays
+
+
+def slab_tax(taxable, regime):
+    """Tax with cess on taxable income of any shape, for 'old' or 'new'."""
+    np = numpy()
+
+    spec = REGIMES[regime]
+    lowers = np.array([lower for lower, _ in spec['slabs']], dtype=np.float64)
+    rates = np.array([rate for _, rate in spec['slabs']])
+    widths = np.append(lowers[1:], np.inf) - lowers
+    taxable = np.asarray(taxable, dtype=np.float64)
+    tax = (np.clip(taxable[..., None] - lowers, 0, widths) * rates).sum(axis=-1)
+    limit = spec['rebate_limit']
+    if spec['marginal_relief']:
+        tax = np.where(taxable > limit, np.minimum(tax, taxable - limit), tax)
+    tax = np.where(taxable <= limit, 0.0, tax)
+    return tax * (1 + CESS)
+
+
+def taxable_income(arrays):
+    """(taxable_old, taxable_new, old-regime deduction headroom per section) for a batch."""
+    np = numpy()
+
+    salary = arrays['salary']
+    house_property = np.maximum(arrays['houseProperty'] * 0.7 - arrays['homeLoanInterest'], -HOUSE_PROPERTY_LOSS_CAP)
+    business = arrays['businessIncome']
+    business = np.where(arrays['isBusiness'] & (business <= PRESUMPTIVE_LIMIT), business * 0.5, business)
+    gross = salary + house_property + business + arrays['otherIncome'] + arrays['interestIncome']
+
+    claimed = {
+        '80C': arrays['annualEPF'] + arrays['section80C'],
+        **{section: arrays[key] for section, (key, _) in SECTIONS.items() if section != '80C'},
+    }
+    used = {section: np.minimum(claimed[section], SECTIONS[section][1]) for section in SECTIONS}
+    deductions = (
+        np.where(salary > 0, REGIMES['old']['standard_deduction'], 0)
+        + sum(used.values())
+        + arrays['educationLoanInterest']  # 80E has no cap
+        + np.minimum(arrays['interestIncome'], TTA_CAP)
+    )
+    taxable_old = np.maximum(0.0, gross - deductions)
+    taxable_new = np.maximum(0.0, gross - np.where(salary > 0, REGIMES['new']['standard_deduction'], 0))
+    headroom = {section: SECTIONS[section][1] - used[section] for section in SECTIONS}
+    return taxable_old, taxable_new, headroom
+
+
+def evaluate(arrays):
+    """Rows of RESULT_COLUMNS, one per scenario."""
+    np = numpy()
+
+    taxable_old, taxable_new, _ = taxable_income(arrays)
+    tax_old, tax_new = slab_tax(taxable_old, 'old'), slab_tax(taxable_new, 'new')
+    regime = np.where(tax_old < tax_new, 'old', 'new')
+    columns = [np.round(values, 2).tolist() for values in (
+        taxable_old, taxable_new, tax_old, tax_new)]
+    return list(zip(*columns, regime.tolist(), np.round(np.abs(tax_old - tax_new), 2).tolist()))
+
+
+def optimize(arrays, budget=None, priority=None):
+    """
+    For each scenario, the extra old-regime deduction (at most `budget`,
+    within each section's remaining cap) that minimizes tax, and the
+    smallest one that does. Old-regime tax only depends on the total
+    deducted and is piecewise linear in it, so the minimum is at 0, at
+    full headroom or where taxable income lands on a slab or rebate
+    boundary: all of those candidates are evaluated for every scenario in
+    one (scenarios x candidates) array. The amount is then split across
+    sections in `priority` order (default: SECTIONS order). Returns rows
+    of OPTIMIZED_COLUMNS.
+    """
+    np = numpy()
+
+    priority = list(priority or SECTIONS)
+    if sorted(priority) != sorted(SECTIONS):
+        raise ValueError(f"priority must list each of: {', '.join(SECTIONS)}")
+    budget = np.inf if budget is None else _amount(budget)
+
+    taxable_old, taxable_new, headroom = taxable_income(arrays)
+    tax_new = slab_tax(taxable_new, 'new')
+    current = np.minimum(slab_tax(taxable_old, 'old'), tax_new)
+    limit = np.minimum(np.minimum(sum(headroom.values()), budget), taxable_old)
+
+    boundaries = np.array(
+        [REGIMES['old']['rebate_limit']] + [lower for lower, _ in REGIMES['old']['slabs']], dtype=np.float64)
+    candidates = np.concatenate([
+        np.zeros((len(limit), 1)), limit[:, None], taxable_old[:, None] - boundaries,
+    ], axis=1)
+    candidates = np.clip(candidates, 0, limit[:, None])
+    taxes = slab_tax(taxable_old[:, None] - candidates, 'old')
+    # Lowest tax first, then the smallest deduction that reaches it
+    best = np.lexsort((candidates, np.round(taxes, 2)), axis=1)[:, 0]
+    rows = np.arange(len(limit))
+    extra, tax_old = candidates[rows, best], taxes[rows, best]
+
+    use_old = tax_old < tax_new
+    extra = np.where(use_old, extra, 0.0)
+    tax = np.where(use_old, tax_old, tax_new)
+    allocation, filled = [], np.zeros_like(extra)
+    for section in priority:
+        share = np.clip(extra - filled, 0, headroom[section])
+        allocation.append((section, share))
+        filled += share
+    by_key = {SECTIONS[section][0]: np.round(share, 2).tolist() for section, share in allocation}
+
+    return list(zip(
+        np.where(use_old, 'old', 'new').tolist(),
+        np.round(tax, 2).tolist(),
+        np.round(current - tax, 2).tolist(),
+        np.round(extra, 2).tolist(),
+        *(by_key[key] for key, _ in SECTIONS.values()),
+    ))
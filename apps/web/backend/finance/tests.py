@@ -1,3 +1,976 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from core import startup
+from finance import advisor, backup, fx, jobs, profiling, renderers, services, sharding, tax, throttling
+from finance.fields import from_paise, to_paise
+from finance.models import (
+    ArchivedTransaction, FinancialYearSummary, FxRate, Job, NetWorthSnapshot, SpendCounter, Transaction, UserProfile,
+    WealthItem,
+)
+
+
+class FinanceTestCase(TestCase):
+    # With FINANCE_SHARDS set, users' rows live on the shard databases
+    databases = '__all__'
+
+
+def spend_counters(user_id):
+    return sorted(
+        row for row in SpendCounter.objects.for_user(user_id).values_list(
+            'period', 'period_start', 'currency', 'spent')
+        if row[3]
+    )
+
+
+def assert_counters_consistent(test, user_id):
+    """The running counters must equal a rebuild from the transactions."""
+    running = spend_counters(user_id)
+    services.rebuild_spend_counters(user_id)
+    test.assertEqual(running, spend_counters(user_id))
+
+
+class ColdStartBudgetTests(SimpleTestCase):
+    """Guards worker boot time; see COLD_START_BUDGET_MS and `manage.py profile_startup`."""
+
+    def test_cold_start_within_budget(self):
+        for target, budget in settings.COLD_START_BUDGET_MS.items():
+            with self.subTest(target=target):
+                elapsed = startup.cold_start_ms(target)
+                self.assertLessEqual(
+                    elapsed, budget,
+                    f"{target} cold start took {elapsed:.0f} ms (budget {budget} ms); "
+                    f"run `manage.py profile_startup --target {target}` to see what got slower",
+                )
+
+    def test_heavy_sdks_not_imported_at_startup(self):
+        for target in ('wsgi', 'asgi'):
+            with self.subTest(target=target):
+                times = startup.import_times(target)
+                self.assertEqual([name for name in startup.LAZY_MODULES if name in times], [])
+
+
+class BulkTransactionTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulk', password='pw')
+        self.other = User.objects.create_user(username='other')
+        today = timezone.localdate()
+        for i in range(6):
+            Transaction.objects.shard(self.user.id).create(
+                user=self.user, title=f"Swiggy {i}" if i % 2 else f"Rent {i}", amount=Decimal(100 + i),
+                type='income' if i == 5 else 'expense', category='other', date=today - timedelta(days=i),
+            )
+        self.foreign = Transaction.objects.shard(self.other.id).create(
+            user=self.other, title='Swiggy', amount=50, type='expense', category='other')
+        services.rebuild_spend_counters(self.user.id)
+        self.ids = list(Transaction.objects.for_user(self.user.id).order_by('id').values_list('id', flat=True))
+
+    def patch(self, body):
+        return self.client.patch(
+            f'/api/finance/bulk-update-transactions/{self.user.id}/', body, content_type='application/json')
+
+    def delete(self, body):
+        return self.client.post(
+            f'/api/finance/bulk-delete-transactions/{self.user.id}/', body, content_type='application/json')
+
+    def test_update_by_ids_is_scoped_to_the_user(self):
+        response = self.patch({'ids': self.ids[:3] + [self.foreign.id], 'patch': {'category': 'Food'}})
+        self.assertEqual(response.json()['updated'], 3)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.category, 'other')
+
+    def test_spend_patches_keep_counters_consistent(self):
+        for body in (
+            {'filter': {'search': 'swiggy'}, 'patch': {'amount': '99.50'}},
+            {'ids': self.ids[2:], 'patch': {'type': 'Expense', 'date': str(timezone.localdate())}},
+            {'ids': self.ids[:2], 'patch': {'type': 'income'}},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.patch(body).status_code, 200)
+                assert_counters_consistent(self, self.user.id)
+
+    def test_delete_by_filter_keeps_counters_consistent(self):
+        response = self.delete({'filter': {'types': 'expense', 'maxAmount': '102'}})
+        self.assertEqual(response.json(), {'deleted': 3})
+        assert_counters_consistent(self, self.user.id)
+
+    def test_filters_that_select_everything_are_refused(self):
+        for body in ({'filter': {'category': 'food'}}, {'filter': {'sortBy': 'date-desc'}},
+                     {'filter': {'search': ''}}, {'filter': {}}):
+            with self.subTest(body=body):
+                self.assertEqual(self.delete(body).status_code, 400)
+        self.assertEqual(Transaction.objects.for_user(self.user.id).count(), 6)
+
+    def test_delete_all_needs_the_explicit_flag(self):
+        self.assertEqual(self.delete({'all': True}).json(), {'deleted': 6})
+        self.assertTrue(Transaction.objects.for_user(self.other.id).exists())
+        self.assertEqual(spend_counters(self.user.id), [])
+
+    def test_bad_patches_are_rejected(self):
+        for patch in ({'owner': 1}, {'amount': 'abc'}, {'date': '2025-13-01'}, {'type': 'gift'}, {},
+                      {'currency': 5}, {'currency': ['USD']}, {'title': None}, {'category': 7},
+                      {'type': True}, {'date': 20250101}, {'amount': None}, {'amount': True}, ['title']):
+            with self.subTest(patch=patch):
+                self.assertEqual(self.patch({'ids': self.ids, 'patch': patch}).status_code, 400)
+
+
+class SpendCounterTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='spender')
+        self.admin = admin.site._registry[Transaction]
+        self.request = RequestFactory().post('/admin/')
+
+    def test_capitalised_type_from_the_form_is_counted(self):
+        response = self.client.post('/api/finance/add-transaction/', {
+            'user_id': self.user.id, 'title': 'Lunch', 'amount': '250', 'type': 'Expense', 'category': 'Food',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        t = Transaction.objects.for_user(self.user.id).get()
+        self.assertEqual((t.type, t.category), ('expense', 'food'))
+        self.assertIn(('month', t.date.replace(day=1), 'INR', Decimal('250.00')), spend_counters(self.user.id))
+        assert_counters_consistent(self, self.user.id)
+
+    def test_admin_edits_keep_counters_consistent(self):
+        t = Transaction(user=self.user, title='Rent', amount=Decimal('1000'), type='expense')
+        self.admin.save_model(self.request, t, None, change=False)
+        assert_counters_consistent(self, self.user.id)
+
+        t.amount, t.date, t.currency = Decimal('1200'), t.date - timedelta(days=40), 'USD'
+        self.admin.save_model(self.request, t, None, change=True)
+        assert_counters_consistent(self, self.user.id)
+
+        t.type = 'income'
+        self.admin.save_model(self.request, t, None, change=True)
+        self.assertEqual(spend_counters(self.user.id), [])
+
+        t.type = 'expense'
+        self.admin.save_model(self.request, t, None, change=True)
+        self.admin.delete_model(self.request, t)
+        self.assertEqual(spend_counters(self.user.id), [])
+
+    def test_admin_bulk_delete_keeps_counters_consistent(self):
+        other = User.objects.create_user(username='other-spender')
+        for user in (self.user, self.user, other):
+            Transaction.objects.shard(user.id).create(user=user, title='Cab', amount=80)
+        for user in (self.user, other):
+            services.rebuild_spend_counters(user.id)
+        for alias in sharding.aliases():
+            self.admin.delete_queryset(self.request, Transaction.objects.using(alias).filter(title='Cab'))
+        self.assertEqual(spend_counters(self.user.id), [])
+        self.assertEqual(spend_counters(other.id), [])
+
+
+class PaiseFieldTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='paise')
+
+    def test_conversions_round_half_up_to_the_paisa(self):
+        for value, paise in (('0.1', 10), (0.1, 10), (0.105, 11), ('-0.105', -11), (12, 1200),
+                             (Decimal('99999999999.99'), 9999999999999), (' 7.5 ', 750)):
+            with self.subTest(value=value):
+                self.assertEqual(to_paise(value), paise)
+        self.assertEqual(from_paise(1999), Decimal('19.99'))
+        for value in ('abc', '', 'Infinity', None):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                to_paise(value)
+
+    def test_amounts_round_trip_through_the_database(self):
+        amounts = [Decimal('0.01'), Decimal('0.10'), Decimal('1234567.89'), Decimal('-42.50')]
+        for amount in amounts:
+            Transaction.objects.shard(self.user.id).create(user=self.user, title='t', amount=amount)
+        rows = Transaction.objects.for_user(self.user.id).order_by('id')
+        self.assertEqual(list(rows.values_list('amount', flat=True)), amounts)
+        self.assertEqual(rows.aggregate(total=Sum('amount'))['total'], sum(amounts))
+        self.assertEqual(rows.filter(amount__gte='0.10').count(), 2)
+
+        table = Transaction._meta.db_table
+        with connections[sharding.db_for_user(self.user.id)].cursor() as cursor:
+            cursor.execute(f"SELECT amount FROM {table} WHERE user_id = %s ORDER BY id", [self.user.id])
+            self.assertEqual([row[0] for row in cursor.fetchall()], [1, 10, 123456789, -4250])
+
+    def test_form_input_is_validated_and_normalised(self):
+        field = Transaction._meta.get_field('amount')
+        self.assertEqual(field.to_python('10.005'), Decimal('10.01'))
+        with self.assertRaises(ValidationError):
+            field.to_python('ten')
+
+
+class ImportTransactionsTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer')
+        self.coffee = {'title': 'Coffee', 'amount': '50', 'date': '2026-01-05'}
+
+    def hot(self):
+        return Transaction.objects.for_user(self.user.id)
+
+    def test_reimport_is_a_no_op(self):
+        rows = [self.coffee, {'title': 'Rent', 'amount': '20000', 'date': '2026-01-01'}]
+        self.assertEqual(services.import_transactions(self.user.id, rows), {"created": 2, "duplicates": 0})
+        self.assertEqual(services.import_transactions(self.user.id, rows), {"created": 0, "duplicates": 2})
+        assert_counters_consistent(self, self.user.id)
+
+    def test_repeats_inside_one_statement_are_kept(self):
+        rows = [self.coffee, self.coffee]
+        self.assertEqual(services.import_transactions(self.user.id, rows)["created"], 2)
+        # An overlapping statement with the same two lines adds nothing
+        self.assertEqual(services.import_transactions(self.user.id, rows)["created"], 0)
+        self.assertEqual(services.import_transactions(self.user.id, rows * 2)["created"], 2)
+        self.assertEqual(self.hot().count(), 4)
+
+    def test_repeats_are_numbered_across_job_chunks(self):
+        job = Job.objects.create(user=self.user, kind='import_transactions', payload={'rows': [self.coffee] * 3})
+        result = jobs.HANDLERS['import_transactions'](job, lambda fraction: None, chunk_size=1)
+        self.assertEqual(result, {"created": 3, "duplicates": 0})
+
+    def test_merge_updates_hot_rows_and_leaves_archived_matches_alone(self):
+        old = {'title': 'Old gym', 'amount': '900', 'date': '2024-06-01', 'category': 'health'}
+        services.import_transactions(self.user.id, [self.coffee, old])
+        self.assertEqual(services.archive_financial_year(self.user.id, 2024), 1)
+
+        rows = [{**self.coffee, 'category': 'food'}, {**old, 'category': 'fitness'}]
+        result = services.import_transactions(self.user.id, rows, on_duplicate='merge')
+        self.assertEqual(result, {"created": 0, "duplicates": 2})
+        self.assertEqual(list(self.hot().values_list('title', 'category')), [('Coffee', 'food')])
+        self.assertEqual(ArchivedTransaction.objects.for_user(self.user.id).get().category, 'health')
+
+
+class DedupeTransactionsTests(FinanceTestCase):
+
+    def test_only_imported_rows_are_deduplicated(self):
+        user = User.objects.create_user(username='dedupe')
+        for reference in ('', '', 'UTR1', 'UTR1'):
+            Transaction.objects.shard(user.id).create(
+                user=user, title='Coffee', amount=50, date=date(2026, 1, 5), bank_reference=reference)
+        out = StringIO()
+        call_command('dedupe_transactions', stdout=out)
+
+        rows = Transaction.objects.for_user(user.id)
+        # Both manual repeat purchases survive, unfingerprinted; one imported copy goes
+        self.assertEqual(rows.filter(bank_reference='', fingerprint__isnull=True).count(), 2)
+        self.assertEqual(rows.filter(bank_reference='UTR1').exclude(fingerprint=None).count(), 1)
+        self.assertIn("Removed 1 duplicate(s)", out.getvalue())
+        self.assertIn("left 1 look-alike(s)", out.getvalue())
+
+
+@skipUnless(sharding.enabled(), "run with FINANCE_SHARDS=3 to cover sharding")
+class ShardingTests(FinanceTestCase):
+
+    def users_on_distinct_shards(self, count):
+        users, seen = [], set()
+        for i in range(100):
+            user = User.objects.create_user(username=f'shard{i}')
+            if sharding.db_for_user(user.id) not in seen:
+                seen.add(sharding.db_for_user(user.id))
+                users.append(user)
+            if len(users) == count:
+                return users
+        self.skipTest("needs at least two shards")
+
+    def test_api_writes_and_reads_go_to_the_users_shard(self):
+        users = self.users_on_distinct_shards(2)
+        for user in users:
+            self.client.post('/api/finance/add-transaction/', {
+                'user_id': user.id, 'title': f'Lunch {user.id}', 'amount': '120', 'type': 'expense',
+            }, content_type='application/json')
+        for user in users:
+            home = sharding.db_for_user(user.id)
+            for alias in ['default'] + sharding.aliases():
+                with self.subTest(user=user.id, alias=alias):
+                    rows = Transaction.objects.using(alias).filter(user=user).count()
+                    counters = SpendCounter.objects.using(alias).filter(user=user).count()
+                    self.assertEqual((rows, bool(counters)), (1, True) if alias == home else (0, False))
+            history = self.client.get(f'/api/finance/history/{user.id}/').json()
+            self.assertEqual([row['title'] for row in history], [f'Lunch {user.id}'])
+            self.assertEqual(sharding.find(Transaction, title=f'Lunch {user.id}').user_id, user.id)
+
+    def test_bulk_create_spanning_shards_routes_each_row(self):
+        users = self.users_on_distinct_shards(2)
+        Transaction.objects.bulk_create([
+            Transaction(user=user, title='t', amount=1, date=date(2026, 1, 1)) for user in users * 2
+        ])
+        self.assertFalse(Transaction.objects.using('default').exists())
+        for user in users:
+            self.assertEqual(Transaction.objects.for_user(user.id).count(), 2)
+
+    def test_rebalance_keeps_rows_that_conflict_on_the_target(self):
+        owner, neighbour = self.users_on_distinct_shards(2)
+        source = sharding.db_for_user(neighbour.id)
+        target = sharding.db_for_user(owner.id)
+        # owner's rows sit on the wrong shard; one clashes with a fingerprint already on the target
+        Transaction.objects.using(source).bulk_create([
+            Transaction(user=owner, title=f't{i}', amount=1, date=date(2026, 1, 1), fingerprint=f'fp{i}')
+            for i in range(3)
+        ])
+        Transaction.objects.using(target).create(
+            user=owner, title='clash', amount=1, date=date(2026, 1, 1), fingerprint='fp1')
+
+        err = StringIO()
+        call_command('rebalance_shards', chunk_size=2, stdout=StringIO(), stderr=err)
+        self.assertEqual(
+            sorted(Transaction.objects.using(target).filter(user=owner).values_list('fingerprint', flat=True)),
+            ['fp0', 'fp1', 'fp2'])
+        self.assertEqual(list(Transaction.objects.using(source).values_list('fingerprint', flat=True)), ['fp1'])
+        self.assertIn("1 row(s) conflicted", err.getvalue())
+
+
+@override_settings(JOB_STALE_AFTER_SECONDS=60, JOB_RETRY_DELAY_SECONDS=0)
+class JobLeaseTests(FinanceTestCase):
+
+    def running_job(self, **fields):
+        job = Job.objects.create(kind='recategorize', status='running', attempts=1, **fields)
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        return job
+
+    def test_heartbeat_keeps_a_quiet_job_from_being_requeued(self):
+        live, dead = self.running_job(), self.running_job()
+        jobs.heartbeat([live.pk])
+        self.assertEqual(jobs.requeue_stale(), {'retry': 1, 'failed': 0})
+        self.assertEqual(Job.objects.get(pk=live.pk).status, 'running')
+        self.assertEqual(Job.objects.get(pk=dead.pk).status, 'queued')
+
+    def test_expired_leases_count_as_attempts(self):
+        job = self.running_job(max_attempts=2)
+        self.assertEqual(jobs.requeue_stale(), {'retry': 1, 'failed': 0})
+        # Claimed again and its worker dies again: the second expiry is the last attempt
+        self.assertEqual(jobs.claim(1), [job.pk])
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(), {'retry': 0, 'failed': 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIn("Lease expired", job.error)
+
+    def test_runner_recovers_stale_jobs_while_it_runs(self):
+        job = self.running_job(max_attempts=1)
+        out = StringIO()
+        call_command('run_jobs', once=True, workers=1, stdout=out)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'failed')
+        self.assertIn("1 failed", out.getvalue())
+
+    def test_crashed_worker_retries_then_fails(self):
+        retried, exhausted = self.running_job(max_attempts=3), self.running_job(max_attempts=1)
+        self.assertEqual(jobs.record_crash(retried.pk, 'Worker process died'), 'retry')
+        self.assertEqual(jobs.record_crash(exhausted.pk, 'Worker process died'), 'failed')
+        self.assertEqual(Job.objects.get(pk=retried.pk).status, 'queued')
+        failed = Job.objects.get(pk=exhausted.pk)
+        self.assertEqual((failed.status, failed.error), ('failed', 'Worker process died'))
+        self.assertIsNotNone(failed.finished_at)
+
+
+class ForecastTests(FinanceTestCase):
+
+    def setUp(self):
+        cache.clear()  # users with identical inputs share a cache entry
+        self.user = User.objects.create_user(username='forecaster')
+        this_month = services.month_start(timezone.localdate())
+        for offset in range(1, 7):
+            day = services.month_start(this_month, -offset)
+            for title, amount, kind, category in (
+                ('Payroll', 50000, 'income', 'salary'),  # not flagged recurring, as imports leave it
+                ('Freelance', 5000, 'income', 'other'),
+                ('Groceries', 20000, 'expense', 'food'),
+            ):
+                Transaction.objects.shard(self.user.id).create(
+                    user=self.user, title=title, amount=amount, type=kind, category=category, date=day)
+
+    def projection(self):
+        return services.run_forecast(services.forecast_inputs(self.user.id), months=6, paths=200)['projection']
+
+    def test_salary_rows_count_as_recurring_income(self):
+        self.assertEqual(self.projection()['income'], 55000)
+
+    def test_declared_income_replaces_salary_rows(self):
+        UserProfile.objects.filter(user=self.user).update(monthlyIncome=60000)
+        projection = self.projection()
+        self.assertEqual(projection['income'], 65000)  # 60000 declared + freelance, not + payroll again
+        self.assertEqual(projection['net'], 45000)
+
+    def test_same_inputs_give_the_same_answer(self):
+        first = services.forecast(self.user.id, months=6, goal=100000)
+        second = services.forecast(self.user.id, months=6, goal=100000)
+        self.assertFalse(first.pop('cached'))
+        self.assertTrue(second.pop('cached'))
+        self.assertEqual(first, second)
+        self.assertEqual(first['goal']['probability'], 1.0)  # 35000 a month reaches it in 3
+
+
+class CurrencyTotalsTests(FinanceTestCase):
+
+    def setUp(self):
+        FxRate.objects.create(currency='USD', rate=Decimal('80'), as_of=date(2026, 1, 1))
+        fx.invalidate()
+        self.addCleanup(fx.invalidate)
+        self.user = User.objects.create_user(username='traveller')
+        UserProfile.objects.filter(user=self.user).update(dailyBudget=1000, monthlyBudget=100000)
+
+    def add(self, amount, currency, **fields):
+        response = self.client.post('/api/finance/add-transaction/', {
+            'user_id': self.user.id, 'title': 'Lunch', 'amount': amount, 'type': 'expense',
+            'currency': currency, **fields,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_budget_counts_foreign_spend_in_inr(self):
+        self.add('200', 'INR')
+        alerts = self.add('10', 'USD')['alerts']  # 200 + 800 = the whole daily budget
+        self.assertEqual([(a['period'], a['threshold']) for a in alerts], [('day', 0.8), ('day', 1.0)])
+        self.assertEqual(services.budget_status(self.user.id)['day']['spent'], 1000.0)
+
+    def test_rate_changes_leave_counters_consistent(self):
+        self.add('10', 'USD')
+        FxRate.objects.filter(currency='USD').update(rate=Decimal('90'))
+        fx.invalidate()
+        self.assertEqual(services.budget_status(self.user.id)['day']['spent'], 900.0)
+        pk = Transaction.objects.for_user(self.user.id).get().pk
+        self.client.delete(f'/api/finance/delete-transaction/{pk}/')
+        self.assertEqual(spend_counters(self.user.id), [])
+        assert_counters_consistent(self, self.user.id)
+
+    def test_summaries_convert_foreign_amounts(self):
+        for amount, currency in (('100', 'INR'), ('10', 'USD')):
+            Transaction.objects.shard(self.user.id).create(
+                user=self.user, title='Books', amount=amount, currency=currency, category='education',
+                date=date(2024, 6, 1))
+        services.archive_financial_year(self.user.id, 2024)
+        summary = FinancialYearSummary.objects.for_user(self.user.id).get()
+        self.assertEqual(summary.total_expense, Decimal('900.00'))
+        self.assertEqual(summary.category_totals, {'expense': {'education': 900.0}})
+
+        Transaction.objects.shard(self.user.id).create(
+            user=self.user, title='Books', amount='10', currency='USD', category='education')
+        self.assertEqual(advisor.build_summary(self.user.id)['expense'], 800)
+
+    def test_same_amount_in_another_currency_is_not_a_duplicate(self):
+        rows = [{'title': 'Hotel', 'amount': '50', 'date': '2026-01-05', 'currency': code} for code in ('INR', 'USD')]
+        self.assertEqual(services.import_transactions(self.user.id, rows)['created'], 2)
+
+
+class BackupRoundTripTests(FinanceTestCase):
+
+    def setUp(self):
+        self.source = User.objects.create_user(username='saver')
+        coffee = {'title': 'Coffee', 'amount': '50', 'date': '2026-01-05', 'bank_reference': ''}
+        services.import_transactions(self.source.id, [coffee, coffee, {**coffee, 'date': '2024-05-01'}])
+        services.archive_financial_year(self.source.id, 2024)
+        WealthItem.objects.shard(self.source.id).create(
+            user=self.source, title='FD', amount='250000.50', type='asset', category='deposit')
+
+        self.then = datetime(2023, 4, 1, 9, 30, tzinfo=dt_timezone.utc)
+        WealthItem.objects.for_user(self.source.id).update(created_at=self.then)
+        ArchivedTransaction.objects.for_user(self.source.id).update(archived_at=self.then)
+
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        backup.dump_user(self.source.id, self.path)
+
+    def test_restore_onto_another_account(self):
+        target = User.objects.create_user(username='restored')
+        _, counts = backup.load_user(self.path, user_id=target.id)
+        self.assertEqual((counts['transaction'], counts['archivedtransaction'], counts['wealthitem']), (2, 1, 1))
+
+        item = WealthItem.objects.for_user(target.id).get()
+        self.assertEqual((item.amount, item.created_at), (Decimal('250000.50'), self.then))
+        self.assertEqual(ArchivedTransaction.objects.for_user(target.id).get().archived_at, self.then)
+
+        # Fingerprints are re-keyed to the new owner, repeats included, so a re-import is a no-op
+        coffee = {'title': 'Coffee', 'amount': '50', 'date': '2026-01-05'}
+        self.assertEqual(services.import_transactions(target.id, [coffee, coffee])['created'], 0)
+        archived = {**coffee, 'date': '2024-05-01'}
+        self.assertEqual(services.import_transactions(target.id, [archived])['created'], 0)
+        self.assertEqual(spend_counters(target.id), spend_counters(self.source.id))
+        self.assertTrue(FinancialYearSummary.objects.for_user(target.id).filter(financial_year=2024).exists())
+
+    def test_refuses_to_merge_into_an_account_with_data(self):
+        with self.assertRaises(ValueError):
+            backup.load_user(self.path, user_id=self.source.id)
+
+
+class ProfilingHeaderTests(FinanceTestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='ops', password='pw', is_staff=True)
+        User.objects.create_user(username='plain', password='pw')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiles = override_settings(PROFILE_DIR=directory.name, PROFILE_SAMPLE_RATE=0)
+        profiles.enable()
+        self.addCleanup(profiles.disable)
+
+    def get(self, username=None, password='pw', **extra):
+        if username:
+            token = base64.b64encode(f"{username}:{password}".encode()).decode()
+            extra['HTTP_AUTHORIZATION'] = f"Basic {token}"
+        return self.client.get('/api/finance/test/', HTTP_X_PROFILE='1', **extra)
+
+    def test_staff_basic_auth_is_profiled(self):
+        response = self.get('ops')
+        self.assertIn('X-Profile-Id', response)
+        meta = json.loads(profiling.paths(response['X-Profile-Id'])['.json'].read_text())
+        self.assertEqual(meta['user'], self.staff.pk)
+
+    def test_staff_session_is_profiled(self):
+        self.client.force_login(self.staff)
+        self.assertIn('X-Profile-Id', self.get())
+
+    def test_header_is_ignored_for_everyone_else(self):
+        for username, password in ((None, 'pw'), ('plain', 'pw'), ('ops', 'wrong')):
+            with self.subTest(username=username, password=password):
+                self.assertNotIn('X-Profile-Id', self.get(username, password))
+
+
+class TaxScenarioTests(FinanceTestCase):
+    # Expected figures worked by hand from the FY 2025-26 slabs, 87A rebate and 4% cess
+
+    def test_slab_tax_rebates_and_marginal_relief(self):
+        for regime, taxable, expected in (
+            ('new', 1200000, 0), ('new', 1210000, 10400), ('new', 1425000, 97500),
+            ('old', 500000, 0), ('old', 800000, 75400), ('old', 950000, 106600),
+        ):
+            with self.subTest(regime=regime, taxable=taxable):
+                self.assertAlmostEqual(float(tax.slab_tax(taxable, regime)), expected, places=2)
+
+    def test_evaluate_compares_regimes_per_scenario(self):
+        arrays = tax.to_arrays([
+            {'salary': 1000000, 'section80C': 150000},
+            {'salary': 1600000, 'educationLoanInterest': 600000, 'homeLoanInterest': 200000},
+        ])
+        self.assertEqual(tax.evaluate(arrays), [
+            (800000.0, 925000.0, 75400.0, 0.0, 'new', 75400.0),
+            (750000.0, 1325000.0, 65000.0, 81900.0, 'old', 16900.0),
+        ])
+
+    def test_optimizer_finds_the_smallest_deduction_for_the_lowest_tax(self):
+        arrays = tax.to_arrays([{'salary': 1600000, 'educationLoanInterest': 600000, 'homeLoanInterest': 200000}])
+        # 2.5 lakh more brings old-regime taxable income down to the 5 lakh rebate limit
+        self.assertEqual(tax.optimize(arrays), [('old', 0.0, 65000.0, 250000.0, 150000.0, 50000.0, 25000.0, 25000.0)])
+        self.assertEqual(
+            tax.optimize(arrays, budget=100000, priority=['80D_parents', '80C', '80CCD_1B', '80D_self']),
+            [('old', 44200.0, 20800.0, 100000.0, 50000.0, 0.0, 0.0, 50000.0)])
+
+    def test_endpoint_applies_scenarios_on_the_saved_base(self):
+        user = User.objects.create_user(username='taxpayer')
+        response = self.client.post(f'/api/finance/tax-scenarios/{user.id}/', {
+            'base': {'salary': 1000000},
+            'scenarios': [{}, {'section80C': 150000}],
+            'optimize': True,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([row['taxOld'] for row in body['results']], [106600.0, 75400.0])
+        self.assertEqual(len(body['optimized']), 2)
+
+        for payload in ({'scenarios': [{'bonus': 1}]}, {'scenarios': [{'salary': -1}]},
+                        {'optimize': {'priority': ['80C']}}):
+            with self.subTest(payload=payload):
+                response = self.client.post(
+                    f'/api/finance/tax-scenarios/{user.id}/', payload, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ACCOUNT_DELETE_CHUNK_SIZE=2, ACCOUNT_DELETE_PAUSE_SECONDS=0)
+class AccountDeletionTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='leaving', password='pw')
+        self.other = User.objects.create_user(username='staying')
+        for user in (self.user, self.other):
+            for i in range(5):
+                Transaction.objects.shard(user.id).create(user=user, title=f't{i}', amount=10)
+            WealthItem.objects.shard(user.id).create(user=user, title='FD', amount=1000, type='asset')
+            services.rebuild_spend_counters(user.id)
+
+    def request_deletion(self, password='pw'):
+        return self.client.post(
+            f'/api/finance/delete-account/{self.user.id}/', {'password': password}, content_type='application/json')
+
+    def test_deletion_deactivates_then_removes_everything_in_chunks(self):
+        self.assertEqual(self.request_deletion('wrong').status_code, 401)
+        response = self.request_deletion()
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(User.objects.get(pk=self.user.id).is_active)
+        # Asking again while it is pending returns the same job
+        self.assertEqual(self.request_deletion().json()['job_id'], response.json()['job_id'])
+
+        job_id = response.json()['job_id']
+        self.assertEqual(jobs.run(job_id), 'done')
+        deleted = Job.objects.get(pk=job_id).result['deleted']
+        self.assertEqual((deleted['transaction'], deleted['wealthitem']), (5, 1))
+        self.assertFalse(User.objects.filter(pk=self.user.id).exists())
+        for model in sharding.sharded_models():
+            with self.subTest(model=model.__name__):
+                self.assertFalse(model.objects.for_user(self.user.id).exists())
+        self.assertEqual(Transaction.objects.for_user(self.other.id).count(), 5)
+        self.assertTrue(spend_counters(self.other.id))
+
+    def test_active_accounts_are_refused(self):
+        with self.assertRaises(ValueError):
+            services.delete_account(self.user.id)
+        self.assertEqual(Transaction.objects.for_user(self.user.id).count(), 5)
+
+
+class ArchivalTests(FinanceTestCase):
+
+    def test_archiving_moves_one_year_and_summarises_it(self):
+        user = User.objects.create_user(username='archivist')
+        for day, amount, kind, category in (
+            (date(2024, 4, 1), 100, 'expense', 'food'), (date(2024, 9, 9), 250, 'expense', 'food'),
+            (date(2025, 3, 31), 5000, 'income', 'salary'), (date(2025, 4, 1), 70, 'expense', 'travel'),
+        ):
+            Transaction.objects.shard(user.id).create(
+                user=user, title=category, amount=amount, type=kind, category=category, date=day)
+        services.rebuild_spend_counters(user.id)
+        counters = spend_counters(user.id)
+
+        self.assertEqual(services.archive_financial_year(user.id, 2024, chunk_size=2), 3)
+        self.assertEqual(services.archive_financial_year(user.id, 2024), 0)
+        self.assertEqual(list(Transaction.objects.for_user(user.id).values_list('date', flat=True)), [date(2025, 4, 1)])
+        self.assertEqual(ArchivedTransaction.objects.for_user(user.id).filter(financial_year=2024).count(), 3)
+
+        summary = FinancialYearSummary.objects.for_user(user.id).get(financial_year=2024)
+        self.assertEqual((summary.transaction_count, float(summary.total_income), float(summary.total_expense)),
+                         (3, 5000.0, 350.0))
+        self.assertEqual(summary.category_totals['expense'], {'food': 350.0})
+        # Archived rows still count towards the spend counters
+        self.assertEqual(spend_counters(user.id), counters)
+        assert_counters_consistent(self, user.id)
+
+
+@override_settings(READ_THROTTLE_RATE=1, READ_THROTTLE_BURST=2)
+class ReadThrottleTests(FinanceTestCase):
+
+    def setUp(self):
+        # Buckets are per process; user ids repeat across rolled-back tests
+        patcher = mock.patch.object(throttling, '_buckets', throttling.TokenBuckets())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='reader')
+        self.other = User.objects.create_user(username='other-reader')
+
+    def history(self, user):
+        return self.client.get(f'/api/finance/history/{user.id}/')
+
+    def test_bucket_refills_at_the_rate(self):
+        buckets = throttling.TokenBuckets()
+        self.assertEqual([buckets.take('k', 2, 2, now=0) for _ in range(3)], [0.0, 0.0, 0.5])
+        self.assertEqual(buckets.take('k', 2, 2, now=0.5), 0.0)
+        self.assertEqual(buckets.take('k', 2, 2, now=0.5), 0.5)
+
+    def test_exhausted_bucket_returns_429_with_retry_after(self):
+        self.assertEqual([self.history(self.user).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(self.history(self.user)['Retry-After'], '1')
+
+    def test_buckets_are_per_user_and_endpoint(self):
+        for _ in range(3):
+            self.history(self.user)
+        self.assertEqual(self.history(self.user).status_code, 429)
+        self.assertEqual(self.history(self.other).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/finance/get-wealth/{self.user.id}/').status_code, 200)
+
+    def test_writes_are_not_throttled(self):
+        url = f'/api/finance/get-wealth/{self.user.id}/'
+        for _ in range(3):
+            self.client.get(url)
+        item = {'title': 'FD', 'amount': '100', 'type': 'asset', 'category': 'Cash'}
+        statuses = {self.client.post(url, item, content_type='application/json').status_code for _ in range(3)}
+        self.assertNotIn(429, statuses)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+
+class CoalesceReadsTests(SimpleTestCase):
+
+    def test_concurrent_identical_gets_run_the_view_once(self):
+        calls, release = [], threading.Event()
+
+        @api_view(['GET'])
+        @throttling.coalesce_reads
+        def view(request, user_id):
+            calls.append(user_id)
+            release.wait(5)
+            return Response({'calls': len(calls)})
+
+        factory, responses = APIRequestFactory(), []
+
+        def get():
+            responses.append(view(factory.get('/x/', {'q': 'a'}), user_id=1).data)
+
+        leader = threading.Thread(target=get)
+        leader.start()
+        while not calls:
+            time.sleep(0.001)
+        followers = [threading.Thread(target=get) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.2)  # let the followers reach the in-flight call
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(responses, [{'calls': 1}] * 4)
+        # A different query string is a different read
+        view(factory.get('/x/', {'q': 'b'}), user_id=1)
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(READ_THROTTLE_RATE=0)
+class HistoryFilterTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='historian')
+        for title, amount, kind, category, day, recurring in (
+            ('Rent', 15000, 'expense', 'rent', date(2026, 1, 1), True),
+            ('Swiggy', 300, 'expense', 'food', date(2026, 1, 10), False),
+            ('Zomato', 450, 'expense', 'food', date(2026, 2, 5), False),
+            ('Salary', 80000, 'income', 'salary', date(2026, 1, 31), True),
+            ('Refund', 120, 'income', 'food', date(2026, 2, 10), False),
+        ):
+            Transaction.objects.shard(self.user.id).create(
+                user=self.user, title=title, amount=amount, type=kind, category=category, date=day,
+                is_recurring=recurring)
+
+    def history(self, query):
+        return self.client.get(f'/api/finance/history/{self.user.id}/?{query}')
+
+    def titles(self, query):
+        response = self.history(query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['title'] for row in response.json()]
+
+    def test_filters(self):
+        for query, expected in (
+            ('startDate=2026-01-10&endDate=2026-02-05', ['Zomato', 'Salary', 'Swiggy']),
+            ('minAmount=300&maxAmount=15000&sortBy=amount-asc', ['Swiggy', 'Zomato', 'Rent']),
+            ('types=income', ['Refund', 'Salary']),
+            ('categories=food,Rent', ['Refund', 'Zomato', 'Swiggy', 'Rent']),
+            ('categories=food&categories=rent&types=expense', ['Zomato', 'Swiggy', 'Rent']),
+            ('isRecurring=true', ['Salary', 'Rent']),
+            ('isRecurring=0', ['Refund', 'Zomato', 'Swiggy']),
+            ('search=swig', ['Swiggy']),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.titles(query), expected)
+
+    def test_malformed_params_are_rejected(self):
+        for query in ('startDate=2026-13-01', 'endDate=yesterday', 'minAmount=abc', 'maxAmount=NaN',
+                      'sortBy=title', 'isRecurring=maybe'):
+            with self.subTest(query=query):
+                response = self.history(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_each_facet_ignores_its_own_selection(self):
+        body = self.history('facets=1&startDate=2026-01-05&categories=food&types=expense').json()
+        self.assertEqual([row['title'] for row in body['results']], ['Zomato', 'Swiggy'])
+        self.assertEqual(body['facets'], {
+            # categories counted within the selected types, types within the selected categories
+            'categories': {'food': 2},
+            'types': {'expense': 2, 'income': 1},
+            'total': 2,
+        })
+        body = self.history('facets=1&types=income').json()
+        self.assertEqual(body['facets']['categories'], {'salary': 1, 'food': 1})
+        self.assertEqual(body['facets']['types'], {'expense': 3, 'income': 2})
+
+
+class NetWorthHistoryTests(FinanceTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='worth')
+
+    def snapshots(self):
+        return NetWorthSnapshot.objects.for_user(self.user.id).order_by('taken_at')
+
+    def snapshot(self, *args, assets=0):
+        return NetWorthSnapshot.objects.shard(self.user.id).create(
+            user=self.user, taken_at=timezone.make_aware(datetime(*args)), assets=assets)
+
+    def test_unchanged_totals_are_not_recorded(self):
+        self.assertIsNone(services.record_net_worth(self.user.id))
+        WealthItem.objects.shard(self.user.id).create(user=self.user, title='FD', amount=1000, type='asset')
+        self.assertIsNotNone(services.record_net_worth(self.user.id))
+        self.assertIsNone(services.record_net_worth(self.user.id))
+        self.assertIsNotNone(services.record_net_worth(self.user.id, only_if_changed=False))
+        self.assertEqual(self.snapshots().count(), 2)
+
+    def test_admin_changes_are_recorded(self):
+        model_admin, request = admin.site._registry[WealthItem], RequestFactory().post('/admin/')
+        item = WealthItem(user=self.user, title='Loan', amount=Decimal('5000'), type='liability')
+        model_admin.save_model(request, item, None, change=False)
+        item.amount = Decimal('4000')
+        model_admin.save_model(request, item, None, change=True)
+        model_admin.delete_model(request, item)
+        self.assertEqual(
+            list(self.snapshots().values_list('liabilities', flat=True)),
+            [Decimal('5000.00'), Decimal('4000.00'), Decimal('0.00')])
+
+    def test_compaction_keeps_the_last_snapshot_per_bucket(self):
+        for args in (
+            (2024, 1, 3, 12), (2024, 1, 20, 12),                        # one month, past the week cutoff
+            (2026, 2, 2, 12), (2026, 2, 4, 12), (2026, 2, 8, 12),       # one week, past the day cutoff
+            (2026, 6, 1, 9), (2026, 6, 1, 18),                          # one day, past the raw cutoff
+            (2026, 6, 14, 12),                                          # recent
+        ):
+            self.snapshot(*args)
+        now = timezone.make_aware(datetime(2026, 6, 15, 12))
+        self.assertEqual(services.compact_net_worth(self.user.id, now=now), {'raw': 1, 'day': 2, 'week': 1})
+        self.assertEqual(
+            [(timezone.localtime(s.taken_at).date(), s.resolution) for s in self.snapshots()],
+            [(date(2024, 1, 20), 'month'), (date(2026, 2, 8), 'week'),
+             (date(2026, 6, 1), 'day'), (date(2026, 6, 14), 'raw')])
+        # Already compacted rows stay put on the next run
+        self.assertEqual(services.compact_net_worth(self.user.id, now=now), {'raw': 0, 'day': 0, 'week': 0})
+
+    def test_series_keeps_the_last_value_per_slice(self):
+        for day in range(1, 11):
+            self.snapshot(2026, 1, day, 12, assets=day * 100)
+        start, end = timezone.make_aware(datetime(2026, 1, 1)), timezone.make_aware(datetime(2026, 1, 11))
+        series = services.net_worth_series(self.user.id, start, end, points=5)
+        self.assertEqual([row[1] for row in series], [200.0, 400.0, 600.0, 800.0, 1000.0])
+        self.assertEqual(series[0][0], timezone.make_aware(datetime(2026, 1, 2, 12)).isoformat())
+        self.assertEqual(len(services.net_worth_series(self.user.id, start, end, points=50)), 10)
+
+        # The last snapshot before the window opens it, dated at the window's start
+        later = timezone.make_aware(datetime(2026, 1, 10, 18))
+        self.assertEqual(
+            services.net_worth_series(self.user.id, later, later + timedelta(days=1)),
+            [(later.isoformat(), 1000.0, 0.0, 1000.0)])
+
+
+class CountingStubClient(advisor.StubClient):
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return super().generate(prompt)
+
+
+@override_settings(AI_STUB_LATENCY=0)
+class AdvisorCacheTests(FinanceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='advised')
+        self.client_stub = CountingStubClient()
+        self.spend(5000)
+
+    def spend(self, amount):
+        Transaction.objects.shard(self.user.id).create(user=self.user, title='Rent', amount=amount, category='rent')
+
+    def advice(self):
+        return advisor.get_advice(self.user.id, client=self.client_stub)
+
+    def test_repeated_summary_is_served_from_the_cache(self):
+        first = self.advice()
+        self.assertEqual(first['source'], 'model')
+        # Under the rounding step: same digest, no new model call
+        self.spend(20)
+        second = self.advice()
+        self.assertEqual((second['source'], second['advice'], second['digest']),
+                         ('cache', first['advice'], first['digest']))
+        self.assertEqual(len(self.client_stub.prompts), 1)
+
+    def test_changed_inputs_miss_the_cache(self):
+        first = self.advice()
+        self.spend(1000)
+        second = self.advice()
+        self.assertEqual(second['source'], 'model')
+        self.assertNotEqual(second['digest'], first['digest'])
+        self.assertEqual(len(self.client_stub.prompts), 2)
+
+    @override_settings(AI_STUB_LATENCY=0.5)
+    def test_concurrent_callers_share_one_upstream_call(self):
+        summary = advisor.build_summary(self.user.id)
+        results = []
+
+        def ask():
+            results.append(advisor.get_advice(self.user.id, client=self.client_stub))
+
+        # Worker threads have their own DB connections, which can't see this test's rows
+        with mock.patch.object(advisor, 'build_summary', return_value=summary):
+            leader = threading.Thread(target=ask)
+            leader.start()
+            while not self.client_stub.prompts:
+                time.sleep(0.001)
+            followers = [threading.Thread(target=ask) for _ in range(3)]
+            for thread in followers:
+                thread.start()
+            for thread in [leader, *followers]:
+                thread.join()
+
+        self.assertEqual(len(self.client_stub.prompts), 1)
+        self.assertEqual(sorted(result['source'] for result in results), ['model', 'shared', 'shared', 'shared'])
+        self.assertEqual(len({result['advice'] for result in results}), 1)
+
+
+@override_settings(READ_THROTTLE_RATE=0)
+class ListPayloadTests(FinanceTestCase):
+
+    def test_records_and_columns_layouts_carry_the_same_rows(self):
+        user = User.objects.create_user(username='lister')
+        for title, amount, day in (('Rent', '15000.50', date(2026, 1, 1)), ('Tea', '12.05', date(2026, 1, 2))):
+            Transaction.objects.shard(user.id).create(user=user, title=title, amount=amount, date=day)
+
+        url = f'/api/finance/history/{user.id}/'
+        records = self.client.get(url).json()
+        columns = self.client.get(url, {'layout': 'columns'}).json()
+        self.assertEqual(list(columns), list(services.TRANSACTION_COLUMNS))
+        self.assertEqual([dict(zip(columns, row)) for row in zip(*columns.values())], records)
+        # Numbers and ISO dates straight from SQL
+        self.assertEqual([(r['title'], r['amount'], r['date']) for r in records],
+                         [('Tea', 12.05, '2026-01-02'), ('Rent', 15000.5, '2026-01-01')])
+
+        empty = Transaction.objects.for_user(user.id).none()
+        rows = services.project(empty, services.TRANSACTION_COLUMNS)
+        self.assertEqual(services.serialize_rows(services.TRANSACTION_COLUMNS, rows, 'columns'),
+                         {column: [] for column in services.TRANSACTION_COLUMNS})
+        self.assertEqual(services.serialize_rows(services.TRANSACTION_COLUMNS, rows), [])
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_renders_decimals_dates_and_lazy_strings(self):
+        data = {
+            'amount': Decimal('12.50'),
+            'day': date(2026, 1, 5),
+            'at': datetime(2026, 1, 5, 9, 30, tzinfo=dt_timezone.utc),
+            'error': gettext_lazy('Not found.'),
+            'by_id': {1: [1.5, None, True]},
+        }
+        expected = {
+            'amount': 12.5, 'day': '2026-01-05', 'at': '2026-01-05T09:30:00+00:00',
+            'error': 'Not found.', 'by_id': {'1': [1.5, None, True]},
+        }
+        self.assertEqual(json.loads(renderers.ORJSONRenderer().render(data)), expected)
+        # Same output from the stdlib fallback when orjson isn't installed
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(json.loads(renderers.ORJSONRenderer().render(data)), expected)
+        self.assertEqual(renderers.ORJSONRenderer().render(None), b'')
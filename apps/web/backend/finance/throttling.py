@@ -0,0 +1,101 @@
+import functools
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+from .singleflight import SingleFlight
+
+# --- SINGLE-FLIGHT READS ---
+# A reload storm (several tabs, a PWA reconnecting) sends the same GET for
+# the same user many times at once. Identical concurrent GETs run the view
+# once and every waiting request gets a copy of its response. Requests that
+# arrive after it finishes run again, so nothing stale is served.
+
+_reads = SingleFlight()
+
+
+def coalesce_reads(view):
+    """
+    Decorator for function views, placed under @api_view. Only GETs are
+    coalesced; the key is the view, its URL kwargs and the query string.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+
+        key = (
+            view.__name__,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted((name, tuple(values)) for name, values in request.query_params.lists())),
+        )
+        response, shared = _reads.do(key, lambda: view(request, *args, **kwargs))
+        if shared:
+            # DRF renders onto the Response object, so each request needs its own
+            return Response(response.data, status=response.status_code)
+        return response
+    return wrapper
+
+
+# --- TOKEN BUCKET THROTTLE ---
+# One bucket per (endpoint, user): READ_THROTTLE_BURST tokens, refilled at
+# READ_THROTTLE_RATE per second, one token per request. A check is a dict
+# lookup and a little arithmetic under a lock, so it can sit in front of
+# every call. Buckets are per process, like the single-flight table.
+
+class TokenBuckets:
+    def __init__(self, max_keys=50000):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, last refill time)
+        self.max_keys = max_keys
+
+    def take(self, key, rate, burst, now=None):
+        """Takes a token for `key`. Returns 0.0 if allowed, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, burst / rate)
+        return wait
+
+    def _prune(self, now, refill_seconds):
+        # A bucket idle long enough to be full again is the same as no bucket
+        self._buckets = {
+            key: (tokens, last) for key, (tokens, last) in self._buckets.items()
+            if now - last < refill_seconds
+        }
+
+
+_buckets = TokenBuckets()
+
+
+class UserEndpointThrottle(BaseThrottle):
+    """
+    DRF throttle keyed on the view name and the `user_id` URL kwarg
+    (client IP when the URL has none). Over-limit requests get DRF's
+    429 with a Retry-After header. Only reads are throttled, the same
+    scope as coalesce_reads; READ_THROTTLE_RATE = 0 turns it off.
+    """
+
+    def allow_request(self, request, view):
+        rate = getattr(settings, 'READ_THROTTLE_RATE', 10)
+        if not rate or request.method not in SAFE_METHODS:
+            return True
+        user_id = view.kwargs.get('user_id')
+        key = (type(view).__name__, user_id if user_id is not None else self.get_ident(request))
+        self._wait = _buckets.take(key, rate, getattr(settings, 'READ_THROTTLE_BURST', 30))
+        return self._wait == 0.0
+
+    def wait(self):
+        return self._wait
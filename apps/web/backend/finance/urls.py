@@ -8,6 +8,7 @@ urlpatterns = [
     # 2. Auth 
     path('register/', views.register_user, name='register'),
     path('login/', views.login_user, name='login'),
+    path('delete-account/<int:user_id>/', views.delete_account, name='delete-account'),
     
     # 3. Profile & Settings
     path('profile/<int:user_id>/', views.profile_settings, name='profile_settings'),
@@ -17,15 +18,33 @@ urlpatterns = [
     path('history/<int:user_id>/', views.get_transaction_history, name='transaction-history'),
     path('update-transaction/<int:pk>/', views.update_transaction, name='update_transaction'),
     path('delete-transaction/<int:pk>/', views.delete_transaction, name='delete_transaction'),
+    path('bulk-update-transactions/<int:user_id>/', views.bulk_update_transactions, name='bulk-update-transactions'),
+    path('bulk-delete-transactions/<int:user_id>/', views.bulk_delete_transactions, name='bulk-delete-transactions'),
+    path('budget-status/<int:user_id>/', views.budget_status, name='budget-status'),
+    path('archive/<int:user_id>/', views.archived_transactions, name='archived-transactions'),
+    path('fy-summaries/<int:user_id>/', views.financial_year_summaries, name='fy-summaries'),
     
     # 5. Wealth Page
     path('get-wealth/<int:user_id>/', views.wealth_list_create, name='wealth-list-create'),
     path('delete-wealth/<int:item_id>/', views.delete_wealth_item, name='delete-wealth'),
     path('update-wealth/<int:item_id>/', views.update_wealth_item, name='update-wealth'),
+    path('net-worth/<int:user_id>/', views.net_worth, name='net-worth'),
+    path('net-worth-history/<int:user_id>/', views.net_worth_history, name='net-worth-history'),
+    path('forecast/<int:user_id>/', views.forecast, name='forecast'),
     
     # 6. Tax & ITR
     path('tax-profile/<int:user_id>/', views.manage_tax_profile, name='manage_tax_profile'),
+    path('tax-scenarios/<int:user_id>/', views.tax_scenarios, name='tax-scenarios'),
     
     # FIXED: Removed 'api/finance/' prefix because it's already handled in core/urls.py
     path('itr-data/<int:user_id>/', views.itr_data_handler, name='itr-handler'),
+    path('advisor/<int:user_id>/', views.ai_advice, name='ai-advice'),
+
+    # 7. Background Jobs
+    path('jobs/<int:user_id>/', views.job_list_create, name='job-list-create'),
+    path('job-status/<int:job_id>/', views.job_detail, name='job-detail'),
+
+    # 8. Request Profiles (staff)
+    path('profiles/', views.profile_list, name='profile-list'),
+    path('profiles/<str:profile_id>/', views.profile_download, name='profile-download'),
 ]
\ No newline at end of file
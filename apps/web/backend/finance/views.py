@@ -2,16 +2,25 @@
 # --------------------------------
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
-
-from .models import Transaction, WealthItem, UserProfile, TaxProfile, ITRData
+from django.conf import settings
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+
+from .models import (
+    Transaction, WealthItem, UserProfile, TaxProfile, ITRData,
+    ArchivedTransaction, FinancialYearSummary, Job, BudgetAlert,
+)
 from .serializers import TaxProfileSerializer
+from .renderers import ORJSONRenderer
+from .throttling import UserEndpointThrottle, coalesce_reads
+from .fields import to_rupees
+from . import advisor, fx, jobs, profiling, services, sharding, tax
 from django.views.decorators.csrf import csrf_exempt # Add this import
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse
 import json
 from django.shortcuts import get_object_or_404
 # --- AUTH ENDPOINTS ---
@@ -47,6 +56,31 @@ def login_user(request):
         }, status=status.HTTP_200_OK)
     return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def delete_account(request, user_id):
+    """
+    Expects JSON: {"password": "..."}. Deactivates the account at once and
+    deletes its data in the background; poll job-status/<job_id>/.
+    Asking again while the deletion is pending returns the same job.
+    """
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        return Response({"error": "User does not exist"}, status=status.HTTP_404_NOT_FOUND)
+    if not user.check_password(request.data.get('password') or ''):
+        return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    pending = Job.objects.filter(
+        kind='delete_account', payload__user_id=user.id, status__in=['queued', 'running'],
+    ).first()
+    if pending is None:
+        services.deactivate_account(user.id)
+        # No job user: the job row must survive the account it deletes
+        pending = jobs.enqueue('delete_account', payload={"user_id": user.id})
+    return Response({"job_id": pending.id, "status": pending.status}, status=status.HTTP_202_ACCEPTED)
+
 # --- PROFILE & SETTINGS ---
 
 @api_view(['GET', 'POST'])
@@ -88,38 +122,54 @@ def add_transaction(request):
         user_id = request.data.get('user_id')
         user = User.objects.get(id=user_id)
         
-        Transaction.objects.create(
-            user=user,
-            title=request.data.get('title', 'No Title'),
-            amount=request.data.get('amount'),
-            type=request.data.get('type', 'expense'),
-            category=request.data.get('category', 'other'),
-            is_recurring=request.data.get('is_recurring', False) 
-        )
-        return Response({"message": "Transaction saved"}, status=status.HTTP_201_CREATED)
+        with sharding.atomic_for(user.id):
+            t = Transaction.objects.shard(user.id).create(
+                user=user,
+                title=request.data.get('title', 'No Title'),
+                amount=request.data.get('amount'),
+                # 'Expense' from the React form must match the counters' 'expense'
+                type=(request.data.get('type') or 'expense').lower(),
+                category=(request.data.get('category') or 'other').lower(),
+                is_recurring=request.data.get('is_recurring', False),
+                currency=fx.normalize_currency(request.data.get('currency')),
+            )
+            # Keep the day/month spend counters in step and surface budget alerts
+            alerts = services.apply_spend(services.spend_deltas(
+                added=[(t.user_id, t.date, t.amount, t.type, t.currency)]))
+        return Response({
+            "message": "Transaction saved",
+            "alerts": [services.alert_payload(a) for a in alerts],
+        }, status=status.HTTP_201_CREATED)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+@throttle_classes([UserEndpointThrottle])
+@coalesce_reads
 def get_transaction_history(request, user_id):
-    queryset = Transaction.objects.filter(user_id=user_id)
+    # Search, Date, Amount, Type, Category and Recurring filters (see services.history_filters)
+    try:
+        q, categories, types, ordering = services.history_filters(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Search, Date, Amount filters...
-    search = request.query_params.get('search')
-    if search:
-        queryset = queryset.filter(Q(title__icontains=search) | Q(amount__icontains=search))
+    base = Transaction.objects.for_user(user_id).filter(q)
+    queryset = base
+    if categories:
+        queryset = queryset.filter(category__in=categories)
+    if types:
+        queryset = queryset.filter(type__in=types)
 
-    # Formatting for React
-    data = [{
-        "id": t.id,
-        "title": t.title,
-        "amount": float(t.amount),
-        "type": t.type,
-        "category": t.category,
-        "date": t.date.isoformat(),
-        "is_recurring": t.is_recurring
-    } for t in queryset.order_by('-date')]
+    # Formatting for React (?layout=columns returns parallel arrays for charts)
+    rows = services.project(queryset.order_by(*ordering), services.TRANSACTION_COLUMNS)
+    data = services.serialize_rows(
+        services.TRANSACTION_COLUMNS, rows, request.query_params.get('layout'))
+
+    # ?facets=1 wraps the rows with per-category/per-type counts for the filter chips
+    if request.query_params.get('facets'):
+        data = {"results": data, "facets": services.history_facets(base, categories, types)}
 
     return Response(data)
 
@@ -127,7 +177,11 @@ def get_transaction_history(request, user_id):
 @permission_classes([AllowAny])
 def delete_transaction(request, pk):
     try:
-        Transaction.objects.get(pk=pk).delete()
+        t = sharding.find(Transaction, pk=pk)
+        with sharding.atomic_for(t.user_id):
+            t.delete()
+            services.apply_spend(services.spend_deltas(
+                removed=[(t.user_id, t.date, t.amount, t.type, t.currency)]))
         return Response(status=status.HTTP_204_NO_CONTENT)
     except Transaction.DoesNotExist:
         return Response({"error": "Not found"}, status=404)
@@ -137,7 +191,8 @@ def delete_transaction(request, pk):
 @permission_classes([AllowAny]) # Keep this consistent with your history view for now
 def update_transaction(request, pk):
     try:
-        transaction = Transaction.objects.get(pk=pk)
+        transaction = sharding.find(Transaction, pk=pk)
+        before = (transaction.user_id, transaction.date, transaction.amount, transaction.type, transaction.currency)
         
         # 1. Map 'description' from the React Modal to 'title' in Django
         if 'description' in request.data:
@@ -159,13 +214,24 @@ def update_transaction(request, pk):
         if 'date' in request.data:
             transaction.date = request.data.get('date')
 
-        # 3. Save and Return updated data
-        transaction.save()
+        if 'currency' in request.data:
+            transaction.currency = fx.normalize_currency(request.data.get('currency'))
+
+        # 3. Save, move the spend counters from the old values to the new ones
+        with sharding.atomic_for(transaction.user_id):
+            transaction.save()
+            alerts = services.apply_spend(services.spend_deltas(
+                added=[(
+                    transaction.user_id, transaction.date, transaction.amount, transaction.type, transaction.currency,
+                )],
+                removed=[before],
+            ))
         
         return Response({
             "message": "Updated successfully",
             "id": transaction.id,
-            "title": transaction.title
+            "title": transaction.title,
+            "alerts": [services.alert_payload(a) for a in alerts],
         }, status=200)
 
     except Transaction.DoesNotExist:
@@ -173,24 +239,114 @@ def update_transaction(request, pk):
     except Exception as e:
         return Response({"error": str(e)}, status=400)
     
+# --- BULK EDITS ---
+# One request for many rows, e.g. re-filing or removing a batch of imported
+# rows from the History page. Select with exactly one of "ids", "filter"
+# (the History filter state: search, startDate, categories, ...) or
+# "all": true; a filter that narrows nothing is refused.
+
+@api_view(['PATCH'])
+@permission_classes([AllowAny])
+def bulk_update_transactions(request, user_id):
+    """Expects JSON: {"ids": [1, 2]}, {"filter": {...}} or {"all": true}, plus {"patch": {"category": "food"}}."""
+    try:
+        patch = services.bulk_patch(request.data.get('patch') or {})
+        queryset = services.bulk_selection(
+            user_id, request.data.get('ids'), request.data.get('filter'), request.data.get('all') is True)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    updated, alerts = services.bulk_update_transactions(user_id, queryset, patch)
+    return Response({
+        "updated": updated,
+        "alerts": [services.alert_payload(a) for a in alerts],
+    })
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def bulk_delete_transactions(request, user_id):
+    """Expects JSON: {"ids": [1, 2]}, {"filter": {...}} or {"all": true}."""
+    try:
+        queryset = services.bulk_selection(
+            user_id, request.data.get('ids'), request.data.get('filter'), request.data.get('all') is True)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"deleted": services.bulk_delete_transactions(user_id, queryset)})
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def budget_status(request, user_id):
+    # Reads the running counters only; no SUM over transactions
+    recent = BudgetAlert.objects.for_user(user_id).order_by('-created_at')[:10]
+    return Response({
+        **services.budget_status(user_id),
+        "alerts": [services.alert_payload(a) for a in recent],
+    })
+
+# --- ARCHIVE ENDPOINTS ---
+# Closed financial years live in ArchivedTransaction (see archive_financial_years),
+# so the history endpoint above only ever scans the current year's rows.
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+def archived_transactions(request, user_id):
+    queryset = ArchivedTransaction.objects.for_user(user_id)
+
+    fy = request.query_params.get('fy')
+    if fy:
+        try:
+            queryset = queryset.filter(financial_year=int(fy))
+        except ValueError:
+            return Response({"error": "fy must be a start year, e.g. 2023"}, status=status.HTTP_400_BAD_REQUEST)
+
+    search = request.query_params.get('search')
+    if search:
+        queryset = queryset.filter(services.search_q(search))
+
+    rows = services.project(queryset.order_by('-date'), services.TRANSACTION_COLUMNS)
+    data = services.serialize_rows(
+        services.TRANSACTION_COLUMNS, rows, request.query_params.get('layout'))
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+def financial_year_summaries(request, user_id):
+    summaries = FinancialYearSummary.objects.for_user(user_id).order_by('-financial_year')
+    data = [{
+        "financialYear": f"{s.financial_year}-{s.financial_year + 1}",
+        "totalIncome": s.total_income,
+        "totalExpense": s.total_expense,
+        "transactionCount": s.transaction_count,
+        "categoryTotals": s.category_totals,
+    } for s in summaries]
+    return Response(data)
+
 # --- WEALTH ENDPOINTS ---
 
 @csrf_exempt
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny]) # Ensures the frontend can access without JWT tokens for now
+@renderer_classes([ORJSONRenderer])
+@throttle_classes([UserEndpointThrottle])
+@coalesce_reads
 def wealth_list_create(request, user_id):
     # --- 1. GET: Fetch all assets and liabilities ---
     if request.method == 'GET':
         try:
-            items = WealthItem.objects.filter(user_id=user_id).order_by('-created_at')
-            data = [{
-                "id": item.id,
-                "title": item.title,
-                "amount": float(item.amount), # Ensure it's a number for Recharts
-                "type": item.type,
-                "category": item.category
-            } for item in items]
+            items = WealthItem.objects.for_user(user_id).order_by('-created_at')
+            # Amount is cast to float in SQL so it's a number for Recharts
+            columns = services.WEALTH_COLUMNS
+            rows = services.project(items, columns)
+            # ?currency=USD adds each item's value in that currency as 'converted'
+            if request.query_params.get('currency'):
+                columns, rows = services.with_converted(
+                    columns, rows, fx.normalize_currency(request.query_params['currency']))
+            data = services.serialize_rows(columns, rows, request.query_params.get('layout'))
             return Response(data, status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -202,21 +358,29 @@ def wealth_list_create(request, user_id):
             if not User.objects.filter(id=user_id).exists():
                 return Response({"error": "User does not exist"}, status=status.HTTP_404_NOT_FOUND)
 
+            try:
+                currency = fx.normalize_currency(data.get('currency'))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             # Create the item with explicit type casting
-            item = WealthItem.objects.create(
+            item = WealthItem.objects.shard(user_id).create(
                 user_id=user_id,
                 title=data.get('title', 'Untitled'),
-                amount=float(data.get('amount', 0)), # Cast to float to handle strings from JSON
+                amount=to_rupees(data.get('amount', 0)),  # Decimal, not float: stored exactly in paise
                 type=data.get('type', 'asset').lower(), # Ensure lowercase (asset/liability)
-                category=data.get('category', 'General')
+                category=data.get('category', 'General'),
+                currency=currency,
             )
-            
+            services.record_net_worth(user_id)
+
             return Response({
                 "message": "Item added successfully", 
                 "id": item.id,
                 "item": {
                     "title": item.title,
-                    "amount": float(item.amount)
+                    "amount": float(item.amount),
+                    "currency": item.currency,
                 }
             }, status=status.HTTP_201_CREATED)
 
@@ -225,12 +389,79 @@ def wealth_list_create(request, user_id):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+def net_worth(request, user_id):
+    # Every item converted into one currency (?currency=, default INR) with the cached FX table
+    try:
+        currency = fx.normalize_currency(request.query_params.get('currency'))
+        return Response(services.net_worth(user_id, currency))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+def net_worth_history(request, user_id):
+    """
+    Net worth over time for the WealthPage chart, downsampled to at most
+    ?points= rows (default 200, capped at NET_WORTH_MAX_POINTS).
+    ?start= / ?end= are YYYY-MM-DD, both inclusive (default: the last year).
+    Also takes ?currency= and ?layout=columns.
+    """
+    params = request.query_params
+    try:
+        end_day = date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+        start_day = date.fromisoformat(params['start']) if params.get('start') else end_day - timedelta(days=365)
+        if start_day > end_day:
+            raise ValueError("start must not be after end")
+        points = int(params.get('points', 200))
+        if points < 1:
+            raise ValueError("points must be positive")
+        points = min(points, getattr(settings, 'NET_WORTH_MAX_POINTS', 1000))
+        currency = fx.normalize_currency(params.get('currency'))
+
+        start = timezone.make_aware(datetime.combine(start_day, time.min))
+        end = timezone.make_aware(datetime.combine(end_day, time.max))
+        rows = services.net_worth_series(user_id, start, end, points, currency)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "currency": currency,
+        "start": start_day.isoformat(),
+        "end": end_day.isoformat(),
+        "points": services.serialize_rows(services.NET_WORTH_COLUMNS, rows, params.get('layout')),
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+def forecast(request, user_id):
+    """
+    Cash flow and net worth projected ?months= ahead (default 12, max
+    FORECAST_MAX_MONTHS) with 10/50/90th percentile bands. ?goal= adds the
+    odds of reaching that amount, starting from ?saved= (default: net worth).
+    """
+    params = request.query_params
+    try:
+        months = int(params.get('months', 12))
+        if not 1 <= months <= getattr(settings, 'FORECAST_MAX_MONTHS', 120):
+            raise ValueError("months out of range")
+        goal = float(to_rupees(params['goal'])) if params.get('goal') else None
+        saved = float(to_rupees(params['saved'])) if params.get('saved') else None
+    except (TypeError, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(services.forecast(user_id, months, goal, saved))
+
 @csrf_exempt # Add this decorator
 @api_view(['DELETE'])
 def delete_wealth_item(request, item_id):
     try:
-        item = WealthItem.objects.get(id=item_id)
+        item = sharding.find(WealthItem, id=item_id)
         item.delete()
+        services.record_net_worth(item.user_id)
         return Response({"status": "deleted"}, status=status.HTTP_200_OK)
     except WealthItem.DoesNotExist:
         return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -244,7 +475,7 @@ def update_wealth_item(request, item_id):
     Expects JSON: { "title": "car", "amount": 1500000 }
     """
     try:
-        item = WealthItem.objects.get(id=item_id)
+        item = sharding.find(WealthItem, id=item_id)
         data = request.data
 
         # Support both 'title' and 'name' keys to be safe
@@ -252,9 +483,13 @@ def update_wealth_item(request, item_id):
         
         # Ensure amount is treated as a number
         if 'amount' in data:
-            item.amount = float(data.get('amount'))
+            item.amount = to_rupees(data.get('amount'))
+
+        if 'currency' in data:
+            item.currency = fx.normalize_currency(data.get('currency'))
             
         item.save()
+        services.record_net_worth(item.user_id)
         
         return Response({
             "status": "success",
@@ -262,7 +497,8 @@ def update_wealth_item(request, item_id):
             "item": {
                 "id": item.id,
                 "title": item.title,
-                "amount": float(item.amount)
+                "amount": float(item.amount),
+                "currency": item.currency,
             }
         }, status=status.HTTP_200_OK)
     except WealthItem.DoesNotExist:
@@ -280,7 +516,7 @@ def manage_tax_profile(request, user_id):
         
         # This is the key: if profile doesn't exist, it creates it 
         # instead of returning a 404.
-        profile, created = TaxProfile.objects.get_or_create(user=user)
+        profile, created = TaxProfile.objects.shard(user.id).get_or_create(user=user)
 
         if request.method == 'POST':
             # partial=True allows updating just a few fields if needed
@@ -298,12 +534,53 @@ def manage_tax_profile(request, user_id):
         return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
+
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer])
+def tax_scenarios(request, user_id):
+    """
+    What-if tax comparison for many scenarios in one call.
+    Expects JSON: {
+        "base": {...},               # optional overrides of the saved tax profile / ITR income
+        "scenarios": [{...}, ...],   # each applied on top of base (default: just base)
+        "optimize": {"budget": 100000, "priority": ["80C", ...]}   # or true; optional
+    }
+    Fields use the TaxProfile / ITR names (salary, annualEPF, npsContribution, ...).
+    """
+    data = request.data
+    scenarios = data.get('scenarios') or [{}]
+    if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+        return Response({"error": "scenarios must be a list of objects"}, status=status.HTTP_400_BAD_REQUEST)
+    limit = getattr(settings, 'TAX_MAX_SCENARIOS', 1000)
+    if len(scenarios) > limit:
+        return Response({"error": f"At most {limit} scenarios per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        base = {**tax.base_scenario(user_id), **(data.get('base') or {})}
+        arrays = tax.to_arrays([{**base, **scenario} for scenario in scenarios])
+        layout = request.query_params.get('layout')
+        result = {
+            "base": base,
+            "results": services.serialize_rows(tax.RESULT_COLUMNS, tax.evaluate(arrays), layout),
+        }
+        options = data.get('optimize')
+        if options:
+            options = options if isinstance(options, dict) else {}
+            rows = tax.optimize(arrays, options.get('budget'), options.get('priority'))
+            result["optimized"] = services.serialize_rows(tax.OPTIMIZED_COLUMNS, rows, layout)
+    except (TypeError, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
+
 @csrf_exempt
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
+@throttle_classes([UserEndpointThrottle])
+@coalesce_reads
 def itr_data_handler(request, user_id):
-    obj, created = ITRData.objects.get_or_create(user_id=user_id)
+    obj, created = ITRData.objects.shard(user_id).get_or_create(user_id=user_id)
 
     if request.method == 'POST':
         # Update JSON fields directly from React state
@@ -321,6 +598,47 @@ def itr_data_handler(request, user_id):
         "filing_details": obj.filing_details,
         "tax_regime": obj.tax_regime
     })
+# --- AI ADVISOR ---
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ai_advice(request, user_id):
+    if not User.objects.filter(id=user_id).exists():
+        return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        return Response(advisor.get_advice(user_id))
+    except Exception as e:
+        return Response({"error": f"AI Service temporarily unavailable: {e}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+# --- BACKGROUND JOBS ---
+# Heavy work (imports, recategorization, archive rebuilds) is queued and
+# executed by `manage.py run_jobs`; the client polls the status endpoint.
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def job_list_create(request, user_id):
+    if request.method == 'POST':
+        if not User.objects.filter(id=user_id).exists():
+            return Response({"error": "User does not exist"}, status=status.HTTP_404_NOT_FOUND)
+        if request.data.get('kind') in jobs.INTERNAL_KINDS:
+            return Response({"error": "This job kind can't be enqueued directly"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            job = jobs.enqueue(request.data.get('kind'), user_id, request.data.get('payload', {}))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"job_id": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+    recent = Job.objects.filter(user_id=user_id).order_by('-created_at')[:50]
+    return Response([jobs.job_status(job) for job in recent])
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def job_detail(request, job_id):
+    try:
+        return Response(jobs.job_status(Job.objects.get(id=job_id)))
+    except Job.DoesNotExist:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
 # Health Check Endpoint
 
 @api_view(['GET'])
@@ -328,3 +646,33 @@ def itr_data_handler(request, user_id):
 def health_check(request):
     return Response({"message": "Finance app is working :)"})
 
+# --- REQUEST PROFILES (staff only) ---
+# Written by finance.profiling.ProfilingMiddleware for requests sent with the
+# PROFILE_HEADER header by a staff user (session or HTTP Basic login), or
+# sampled at PROFILE_SAMPLE_RATE.
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    return Response(profiling.list_profiles())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_download(request, profile_id):
+    """
+    ?output=folded (default): sampled stacks for flamegraph.pl / speedscope.
+    ?output=pstats: the cProfile dump (pstats, snakeviz). ?output=json: request details and SQL timings.
+    (Not ?format=, which DRF keeps for picking a renderer.)
+    """
+    try:
+        files = profiling.paths(profile_id)
+    except FileNotFoundError:
+        return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    output = request.query_params.get('output', 'folded')
+    if output == 'json':
+        return Response(json.loads(files['.json'].read_text(encoding='utf-8')))
+    if output in ('folded', 'pstats'):
+        path = files['.folded' if output == 'folded' else '.prof']
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+    return Response({"error": "output must be folded, pstats or json"}, status=status.HTTP_400_BAD_REQUEST)